@@ -0,0 +1,103 @@
+"""Admin-only profiling endpoints, mounted when PROFILING_ENABLED is set."""
+import hmac
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response
+
+from app.config import settings
+from app.models.profiling import RouteProfile, RouteProfileRequest
+from app.services import profiling
+from app.services.profiling import ProfilingError, RouteCapture
+
+
+def require_admin(x_admin_token: str = Header(default="")) -> None:
+    if not settings.admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="A valid X-Admin-Token header is required.")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+def _summary(capture: RouteCapture) -> RouteProfile:
+    return RouteProfile(
+        id=capture.id,
+        path=capture.path,
+        method=capture.method,
+        requested=capture.requested,
+        captured=capture.captured,
+        status=capture.status,
+        created_at=capture.created_at,
+        finished_at=capture.finished_at,
+    )
+
+
+def _capture(capture_id: str) -> RouteCapture:
+    try:
+        return profiling.get_capture(capture_id)
+    except ProfilingError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.message)
+
+
+@router.post("/profiling/routes", response_model=RouteProfile, status_code=201)
+def start_route_profile(body: RouteProfileRequest, request: Request):
+    """Profile the next N requests to a route with cProfile."""
+    try:
+        capture = profiling.start_route_capture(request.app, body.path, body.method, body.requests)
+    except ProfilingError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.message)
+    return _summary(capture)
+
+
+@router.get("/profiling/routes", response_model=List[RouteProfile])
+def list_route_profiles():
+    return [_summary(c) for c in profiling.list_captures()]
+
+
+@router.get("/profiling/routes/{capture_id}", response_model=RouteProfile)
+def get_route_profile(capture_id: str):
+    return _summary(_capture(capture_id))
+
+
+@router.delete("/profiling/routes/{capture_id}", response_model=RouteProfile)
+def cancel_route_profile(capture_id: str):
+    """Stop profiling and restore the route; requests captured so far stay downloadable."""
+    capture = _capture(capture_id)
+    profiling.cancel_route_capture(capture)
+    return _summary(capture)
+
+
+@router.get("/profiling/routes/{capture_id}/stats")
+def download_route_profile(
+    capture_id: str,
+    format: Literal["pstats", "text"] = Query(
+        default="pstats", description="pstats: binary .prof for pstats/snakeviz; text: top functions by cumulative time",
+    ),
+):
+    """The merged profile of the captured requests (partial while the capture is still armed)."""
+    capture = _capture(capture_id)
+    if capture.stats is None:
+        raise HTTPException(status_code=409, detail="No requests captured yet.")
+    if format == "text":
+        return PlainTextResponse(capture.text_report())
+    return Response(
+        content=capture.pstats_bytes(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{capture.id}.prof"'},
+    )
+
+
+@router.get("/profiling/sample", response_class=PlainTextResponse)
+def sample_process(
+    seconds: float = Query(default=10.0, gt=0, le=60),
+    interval_ms: float = Query(default=10.0, ge=1, le=1000),
+):
+    """Sample every thread's stack for a while; returns collapsed stacks for flame graph tools."""
+    try:
+        stacks = profiling.sample_process(seconds, interval_ms / 1000)
+    except ProfilingError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.message)
+    return PlainTextResponse(
+        stacks,
+        headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'},
+    )
@@ -1,20 +1,74 @@
-"""Cash flow summary endpoints."""
+"""Cash flow summary endpoints.
+
+Each route loads the ledger without blocking (on first use), then runs the
+aggregation on the CPU executor, since a cold cache means a pass over every
+payment.
+"""
 from datetime import date, timedelta
-from typing import Optional
+from typing import Literal, Optional
 
 from fastapi import APIRouter, Query
 
-from app.models.cashflow import CashFlowSummary
-from app.services.cashflow_service import get_cashflow_summary
+from app.concurrency import run_cpu
+from app.models.cashflow import CashFlowAnomalies, CashFlowForecast, CashFlowSummary, CounterpartyRanking
+from app.services.cashflow_service import (
+    get_cashflow_anomalies,
+    get_cashflow_forecast,
+    get_cashflow_summary,
+    get_top_counterparties,
+)
+from app.services.payment_store import ledger_async
 
 router = APIRouter()
 
 
 @router.get("/cashflow/summary", response_model=CashFlowSummary)
-def cashflow_summary(
+async def cashflow_summary(
+    start_date: Optional[date] = Query(default=None, description="Start of range"),
+    end_date: Optional[date] = Query(default=None, description="End of range"),
+):
+    end = end_date or date.today()
+    start = start_date or (end - timedelta(days=90))
+    await ledger_async()
+    return await run_cpu(get_cashflow_summary, start=start, end=end)
+
+
+@router.get("/cashflow/counterparties", response_model=CounterpartyRanking)
+async def top_counterparties(
+    direction: Optional[Literal["inbound", "outbound"]] = Query(
+        default=None, description="Rank by inflow (inbound) or outflow (outbound); total volume if omitted",
+    ),
+    start_date: Optional[date] = Query(default=None, description="Start of range"),
+    end_date: Optional[date] = Query(default=None, description="End of range"),
+    top: int = Query(default=10, ge=1, le=100),
+):
+    """Top counterparties (e.g. biggest vendors by outflow this quarter)."""
+    end = end_date or date.today()
+    start = start_date or (end - timedelta(days=90))
+    await ledger_async()
+    return await run_cpu(get_top_counterparties, start=start, end=end, direction=direction, top=top)
+
+
+@router.get("/cashflow/anomalies", response_model=CashFlowAnomalies)
+async def cashflow_anomalies(
     start_date: Optional[date] = Query(default=None, description="Start of range"),
     end_date: Optional[date] = Query(default=None, description="End of range"),
+    limit: int = Query(default=100, ge=1, le=1000),
 ):
+    """Unusual days: spikes or drops in daily flows, counterparty spikes, missed recurring payments."""
     end = end_date or date.today()
     start = start_date or (end - timedelta(days=90))
-    return get_cashflow_summary(start=start, end=end)
+    await ledger_async()
+    return await run_cpu(get_cashflow_anomalies, start=start, end=end, limit=limit)
+
+
+@router.get("/cashflow/forecast", response_model=CashFlowForecast)
+async def cashflow_forecast(
+    horizon_days: int = Query(default=90, ge=1, le=730),
+    starting_balance_cents: Optional[int] = Query(
+        default=None, description="Current cash balance; defaults to OPENING_BALANCE_CENTS plus the ledger's net flow",
+    ),
+):
+    """Projected daily balance and runway from recurring payments and seasonal run rates."""
+    await ledger_async()
+    return await run_cpu(get_cashflow_forecast, horizon_days=horizon_days, starting_balance_cents=starting_balance_cents)
@@ -1,7 +1,10 @@
-"""Health check and app settings endpoints."""
+"""Health check, readiness, metrics and app settings endpoints."""
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from app import metrics
 from app.config import settings
+from app.services import warmup
 
 router = APIRouter()
 
@@ -11,6 +14,19 @@ def health():
     return {"status": "ok", "service": "cash-flow-copilot"}
 
 
+@router.get("/ready")
+def ready():
+    """200 once startup warm-up has finished, 503 while warming (or if it failed)."""
+    state = warmup.status()
+    return JSONResponse(state, status_code=200 if state["status"] == warmup.READY else 503)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """Request and hot-path metrics in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @router.get("/api/v1/settings")
 def app_settings():
     """Return public, read-only application settings (no secrets)."""
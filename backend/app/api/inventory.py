@@ -1,22 +1,77 @@
 """Inventory endpoints for pickleball clothing and equipment."""
-from typing import List, Optional
+import asyncio
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Literal, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
-from app.models.inventory import InventoryItem, InventoryTransaction, InventoryTransactionResponse
-from app.services.inventory_store import get_inventory_store
+from app.concurrency import run_cpu
+from app.models.inventory import (
+    InventoryItem,
+    InventoryOrder,
+    InventoryOrderResponse,
+    InventoryTransaction,
+    InventoryTransactionResponse,
+    SalesRevenueDay,
+    SkuSalesStats,
+)
+from app.serialization import inventory_response
+from app.services.inventory_store import InsufficientStockError, get_inventory_store, get_inventory_store_async
+from app.services.inventory_wal import WALError
+from app.services.payment_store import ledger_async
+from app.services.sales_analytics import get_sales_revenue_by_day, get_sku_stats, get_top_sellers
+from app.services.low_stock_alerts import broadcaster
 
 router = APIRouter()
 
+# Seconds between SSE keep-alive comments so proxies don't drop idle streams.
+_STREAM_KEEPALIVE = 15.0
+
 
 @router.get("/inventory", response_model=List[InventoryItem])
-def list_inventory(
+async def list_inventory(
     category: Optional[str] = Query(default=None, description="Filter by category"),
 ):
     """List all inventory items (pickleball clothing and equipment)."""
-    store = get_inventory_store()
-    return store.list(category=category)
+    store = await get_inventory_store_async()
+    return inventory_response(store.list(category=category))
+
+
+@router.get("/inventory/low-stock", response_model=List[InventoryItem])
+async def list_low_stock():
+    """List items at or below their low-stock threshold."""
+    store = await get_inventory_store_async()
+    return inventory_response(store.low_stock())
+
+
+@router.get("/inventory/low-stock/stream")
+async def stream_low_stock(request: Request):
+    """Server-sent events stream of low-stock alerts, pushed as sales leave items at or below threshold."""
+
+    async def events():
+        # Subscribed inside the generator so the finally below always pairs with it,
+        # even when the response body is never iterated (client gone before it starts).
+        queue = broadcaster.subscribe()
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    alert = await asyncio.wait_for(queue.get(), timeout=_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: low_stock\ndata: {json.dumps(alert)}\n\n"
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/inventory/transaction", response_model=InventoryTransactionResponse)
@@ -24,13 +79,88 @@ def record_transaction(tx: InventoryTransaction):
     """Record a sale (transaction) that reduces inventory. Returns low_stock_alert if quantity falls at or below threshold."""
     store = get_inventory_store()
     try:
-        updated, alert = store.record_sale(tx.item_id, tx.quantity)
+        item, new_quantity, alert = store.record_sale(tx.item_id, tx.quantity)
         return InventoryTransactionResponse(
-            item_id=updated.id,
-            item_name=updated.name,
+            item_id=item.id,
+            item_name=item.name,
             quantity_sold=tx.quantity,
-            new_quantity=updated.quantity,
+            new_quantity=new_quantity,
             low_stock_alert=alert,
         )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except WALError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+
+@router.post("/inventory/order", response_model=InventoryOrderResponse)
+def record_order(order: InventoryOrder):
+    """Record a multi-line sale atomically: either every line is applied or none is.
+
+    Returns the new quantity after each line and every low-stock alert raised by the order;
+    an order with any line asking for more than is in stock is rejected whole with 409.
+    """
+    store = get_inventory_store()
+    try:
+        updated, alerts = store.record_sales([(line.item_id, line.quantity) for line in order.lines])
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except WALError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    return InventoryOrderResponse(
+        lines=[
+            InventoryTransactionResponse(
+                item_id=item.id,
+                item_name=item.name,
+                quantity_sold=line.quantity,
+                new_quantity=new_quantity,
+            )
+            for line, (item, new_quantity) in zip(order.lines, updated)
+        ],
+        low_stock_alerts=alerts,
+    )
+
+
+def _sales_range(start_date: Optional[date], end_date: Optional[date]) -> tuple:
+    end = end_date or datetime.now(timezone.utc).date()  # sales ledger days are UTC
+    start = start_date or (end - timedelta(days=30))
+    return start, end
+
+
+@router.get("/inventory/analytics/top-sellers", response_model=List[SkuSalesStats])
+async def top_sellers(
+    start_date: Optional[date] = Query(default=None, description="Start of range (default: 30 days before end)"),
+    end_date: Optional[date] = Query(default=None, description="End of range (default: today)"),
+    limit: int = Query(default=10, ge=1, le=100),
+    by: Literal["units", "revenue"] = Query(default="units", description="Rank by units or revenue"),
+    category: Optional[str] = Query(default=None, description="Filter by category"),
+):
+    """Best-selling items over the range, from the daily sales rollups."""
+    start, end = _sales_range(start_date, end_date)
+    await get_inventory_store_async()
+    return await run_cpu(get_top_sellers, start, end, limit=limit, by=by, category=category)
+
+
+@router.get("/inventory/analytics/sell-through", response_model=List[SkuSalesStats])
+async def sell_through(
+    start_date: Optional[date] = Query(default=None, description="Start of range (default: 30 days before end)"),
+    end_date: Optional[date] = Query(default=None, description="End of range (default: today)"),
+    category: Optional[str] = Query(default=None, description="Filter by category"),
+):
+    """Sell-through rate and days of stock remaining for every item at the current sales pace."""
+    start, end = _sales_range(start_date, end_date)
+    await get_inventory_store_async()
+    return await run_cpu(get_sku_stats, start, end, category=category)
+
+
+@router.get("/inventory/analytics/revenue", response_model=List[SalesRevenueDay])
+async def sales_revenue(
+    start_date: Optional[date] = Query(default=None, description="Start of range (default: 30 days before end)"),
+    end_date: Optional[date] = Query(default=None, description="End of range (default: today)"),
+):
+    """Daily inventory sales revenue next to the cash inflow recorded in payments."""
+    start, end = _sales_range(start_date, end_date)
+    await ledger_async()
+    return await run_cpu(get_sales_revenue_by_day, start, end)
@@ -1,32 +1,74 @@
 """Payment list and CRUD (stub with sample data)."""
+from datetime import date
 from typing import List, Optional
 
 from fastapi import APIRouter, Query
 
+from app.concurrency import run_cpu
 from app.models.payment import Payment, PaymentStatus
-from app.services.payment_store import get_payment_store, regenerate_payments
+from app.serialization import payments_response
+from app.services.payment_search import search_payments
+from app.services.payment_store import (
+    direction_totals,
+    get_payment_store_async,
+    ledger_async,
+    regenerate_payments,
+)
 
 router = APIRouter()
 
 
+def _payments_page(store, limit: int, direction: Optional[str], status: Optional[PaymentStatus]):
+    return payments_response(store.list(limit=limit, direction=direction, status=status))
+
+
+def _search_page(q: str, **kwargs):
+    return payments_response(search_payments(q, **kwargs))
+
+
 @router.get("/payments", response_model=List[Payment])
-def list_payments(
+async def list_payments(
+    limit: int = Query(default=50, ge=1, le=500),
+    direction: Optional[str] = Query(default=None, description="inbound | outbound"),
+    status: Optional[PaymentStatus] = None,
+):
+    store = await get_payment_store_async()
+    # Filters scan the ledger and uncached rows are encoded here; neither belongs on the event loop.
+    return await run_cpu(_payments_page, store, limit, direction, status)
+
+
+@router.get("/payments/search", response_model=List[Payment])
+async def search(
+    q: str = Query(..., min_length=1, description="Words or prefixes matched against counterparty, description and external id"),
     limit: int = Query(default=50, ge=1, le=500),
     direction: Optional[str] = Query(default=None, description="inbound | outbound"),
     status: Optional[PaymentStatus] = None,
+    start_date: Optional[date] = Query(default=None, description="Earliest payment date"),
+    end_date: Optional[date] = Query(default=None, description="Latest payment date"),
 ):
-    store = get_payment_store()
-    return store.list(limit=limit, direction=direction, status=status)
+    """Payments matching every word of ``q`` (as a prefix, or inside words of 3+ letters), newest first."""
+    await ledger_async()
+    return await run_cpu(
+        _search_page, q, limit=limit, direction=direction, status=status, start=start_date, end=end_date,
+    )
+
+
+# Generation runs on the request's worker thread (~1s per 50k rows here); larger
+# ledgers belong in a file from ``python -m scripts.generate_data`` (DATASOURCE=file).
+_REGENERATE_MAX = 50_000
 
 
 @router.post("/payments/regenerate")
 def regenerate_data(
-    count: int = Query(default=28, ge=5, le=100, description="Number of payments to generate"),
+    count: int = Query(default=28, ge=5, le=_REGENERATE_MAX, description="Number of payments to generate"),
+    seed: Optional[int] = Query(default=None, description="Generator seed (random if omitted)"),
+    end_date: Optional[date] = Query(
+        default=None, description="Last day of the ledger (default: now); with a seed, the same date gives the same ledger",
+    ),
 ):
-    """Replace the in-memory payment store with freshly randomised test data."""
-    payments = regenerate_payments(count)
-    total_in = sum(p.amount_cents for p in payments if p.direction == "inbound")
-    total_out = sum(p.amount_cents for p in payments if p.direction == "outbound")
+    """Replace the in-memory payment store with freshly generated synthetic data."""
+    payments = regenerate_payments(count, seed=seed, end=end_date)
+    total_in, total_out = direction_totals(payments)
     return {
         "message": f"Regenerated {len(payments)} test payments",
         "count": len(payments),
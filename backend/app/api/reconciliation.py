@@ -0,0 +1,27 @@
+"""Stripe reconciliation endpoint."""
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.models.reconciliation import ReconciliationReport
+from app.services.reconciliation import ReconciliationError, get_reconciliation_report
+
+router = APIRouter()
+
+
+@router.get("/reconciliation", response_model=ReconciliationReport)
+def reconciliation_report(
+    object: Optional[Literal["charge", "balance_transaction", "payout"]] = Query(
+        default=None, description="Only list unmatched items of this Stripe object type",
+    ),
+    limit: int = Query(default=100, ge=1, le=1000, description="Max payouts and unmatched items listed"),
+    refresh: bool = Query(default=False, description="Re-fetch from Stripe instead of using the last load"),
+):
+    """Charges joined to balance transactions and payouts, with fees, per-payout totals and unmatched items."""
+    try:
+        report = get_reconciliation_report(refresh=refresh, object_type=object, limit=limit)
+    except ReconciliationError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.message)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Reconciliation needs DATASOURCE=stripe")
+    return report
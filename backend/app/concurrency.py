@@ -0,0 +1,41 @@
+"""Executor for CPU-bound work called from async routes.
+
+Aggregation over a large ledger (rollups, anomaly detection, forecasting,
+search, page encoding) holds the GIL for milliseconds to seconds when its
+cache is cold. Async routes hand that work to a small dedicated pool so the
+event loop keeps accepting connections and serving cached responses, and so
+CPU work never takes every slot of the threadpool that sync routes share.
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from app.config import settings
+from app.services.profiling import run_profiled
+
+T = TypeVar("T")
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+def executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=settings.cpu_workers, thread_name_prefix="cpu")
+    return _EXECUTOR
+
+
+async def run_cpu(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run ``fn(*args, **kwargs)`` on the CPU executor, with the caller's context variables."""
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, run_profiled, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(executor(), call)
+
+
+def shutdown() -> None:
+    global _EXECUTOR
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _EXECUTOR = None
@@ -22,8 +22,30 @@ class Settings(BaseSettings):
     openai_base_url: str = "https://api.openai.com/v1"
     openai_model: str = "gpt-4o-mini"
 
-    datasource: str = "sample"  # "sample" | "stripe" | "stripe_seed"
+    datasource: str = "sample"  # "sample" | "stripe" | "stripe_seed" | "file"
     stripe_mock_url: str = "http://localhost:12111"
+    payments_file: str = ""  # used when datasource == "file"
+    # Cash on hand before the first ledger payment; the forecast's current balance
+    # is this plus the ledger's net flow.
+    opening_balance_cents: int = 0
+    # Share one memory-mapped ledger across uvicorn workers (e.g. /dev/shm/cashflow); empty = per-process.
+    payments_shared_dir: str = ""
+
+    # Durable inventory: empty keeps stock in memory only (reset on restart).
+    inventory_data_dir: str = ""
+    inventory_wal_flush_ms: int = 5  # group-commit window before each fsync
+    inventory_snapshot_every: int = 10_000  # log records between compacted snapshots
+
+    # Threads for CPU-heavy aggregation handed off by async routes (see app/concurrency.py).
+    cpu_workers: int = 4
+
+    # Load stores and pre-render caches in the background at boot; /ready gates on it.
+    warmup_on_startup: bool = True
+
+    # On-demand profiling under /api/v1/admin (requires the X-Admin-Token header);
+    # off = the admin routes are not mounted at all.
+    profiling_enabled: bool = False
+    admin_token: str = ""
 
     @property
     def copilot_available(self) -> bool:
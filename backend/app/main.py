@@ -1,18 +1,35 @@
 """FastAPI application entrypoint for the cash flow copilot."""
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import copilot, health, payments, cashflow, inventory
+from app.api import admin, copilot, health, payments, cashflow, inventory, reconciliation
+from app import concurrency
 from app.config import settings
+from app.metrics import MetricsMiddleware
+from app.services import warmup
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background; /ready stays 503 until it finishes.
+    if settings.warmup_on_startup:
+        warmup.start()
+    else:
+        warmup.mark_ready()
+    yield
+    concurrency.shutdown()
+
+
 app = FastAPI(
     title="Cash Flow Copilot API",
     description="AI-powered cash flow visibility and Q&A for payments systems",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 logger.info("Copilot configured: %s", settings.copilot_available)
@@ -24,12 +41,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added last so it is outermost and times the whole middleware stack.
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(health.router, tags=["health"])
 app.include_router(payments.router, prefix="/api/v1", tags=["payments"])
 app.include_router(cashflow.router, prefix="/api/v1", tags=["cashflow"])
 app.include_router(copilot.router, prefix="/api/v1/copilot", tags=["copilot"])
 app.include_router(inventory.router, prefix="/api/v1", tags=["inventory"])
+app.include_router(reconciliation.router, prefix="/api/v1", tags=["reconciliation"])
+if settings.profiling_enabled:
+    if not settings.admin_token:
+        logger.warning("PROFILING_ENABLED is set without ADMIN_TOKEN; the profiling endpoints will refuse every request")
+    app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
 
 
 @app.get("/")
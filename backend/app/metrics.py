@@ -0,0 +1,203 @@
+"""In-process request and hot-path metrics, exposed in Prometheus text format.
+
+Histograms use fixed buckets and a single lock per metric family, so recording
+an observation is a dict lookup, a bisect and a few integer increments.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Seconds. Covers sub-millisecond cache hits up to slow LLM calls.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Bytes.
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][idx] += 1
+            series[1][0] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = [(labels, list(counts), total[0]) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(snapshot):
+            base = _format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_with_le(base, _format_float(bound))} {cumulative}"
+            cumulative += counts[-1]
+            yield f"{self.name}_bucket{_with_le(base, '+Inf')} {cumulative}"
+            yield f"{self.name}_sum{base} {total}"
+            yield f"{self.name}_count{base} {cumulative}"
+
+
+class Gauge:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {self._value}"
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _with_le(base: str, le: str) -> str:
+    if not base:
+        return f'{{le="{le}"}}'
+    return f'{base[:-1]},le="{le}"}}'
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "HTTP response body size by route template.",
+    ("method", "route"),
+    SIZE_BUCKETS,
+)
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+OPERATION_LATENCY = Histogram(
+    "operation_duration_seconds",
+    "Latency of instrumented internal operations (store loads, aggregation, LLM calls).",
+    ("operation",),
+    LATENCY_BUCKETS,
+)
+
+_REGISTRY = (REQUEST_LATENCY, RESPONSE_SIZE, IN_FLIGHT, OPERATION_LATENCY)
+
+
+@contextmanager
+def timed(operation: str):
+    """Record the wall time of the enclosed block under ``operation``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        OPERATION_LATENCY.observe((operation,), time.perf_counter() - started)
+
+
+def timed_function(operation: str):
+    """Decorator form of :func:`timed`."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(operation):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _route_template(scope) -> str:
+    """Full route template for a handled request, or ``<unmatched>``.
+
+    Depending on the FastAPI version, ``scope["route"].path`` may omit the
+    ``include_router`` prefix; the prefix is then recovered from the leading
+    segments of the request path, which are static by construction.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return "<unmatched>"
+    path = scope["path"]
+    if path == template:
+        return template
+    depth = template.count("/")
+    prefix = path.rsplit("/", depth)[0] if path.count("/") > depth else ""
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, response size and in-flight requests.
+
+    Requests are labelled by route template (e.g. ``/api/v1/payments``) rather
+    than raw path so label cardinality stays bounded; unmatched paths share
+    one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            route_path = _route_template(scope)
+            method = scope["method"]
+            REQUEST_LATENCY.observe((method, route_path, str(status)), elapsed)
+            RESPONSE_SIZE.observe((method, route_path), size)
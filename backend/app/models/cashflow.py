@@ -1,6 +1,6 @@
 """Cash flow summary and period models."""
 from datetime import date
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -23,3 +23,67 @@ class CashFlowSummary(BaseModel):
     total_outflow_cents: int = 0
     net_cents: int = 0
     periods: List[CashFlowPeriod] = Field(default_factory=list)
+
+
+class CounterpartyTotal(BaseModel):
+    """Cash moved to or from one counterparty over a date range."""
+    counterparty: Optional[str] = None
+    inflow_cents: int = 0
+    outflow_cents: int = 0
+    net_cents: int = 0
+    transaction_count: int = 0
+
+
+class CounterpartyRanking(BaseModel):
+    """Top counterparties by inflow, outflow or total volume over a date range."""
+    start_date: date
+    end_date: date
+    direction: Optional[str] = None
+    counterparties: List[CounterpartyTotal] = Field(default_factory=list)
+
+
+class CashFlowAnomaly(BaseModel):
+    """An unusual day: a spike or drop in daily flows, or a recurring payment that did not arrive."""
+    day: date
+    series: str = Field(..., description="inflow | outflow")
+    counterparty: Optional[str] = Field(default=None, description="Set for per-counterparty anomalies")
+    kind: str = Field(..., description="spike | drop | missing")
+    value_cents: int = 0
+    expected_cents: int = 0
+    score: float = Field(..., description="Robust z-score for spikes and drops; gap length in cadences for missing")
+
+
+class CashFlowAnomalies(BaseModel):
+    start_date: date
+    end_date: date
+    anomalies: List[CashFlowAnomaly] = Field(default_factory=list)
+
+
+class ForecastDay(BaseModel):
+    day: date
+    inflow_cents: int = 0
+    outflow_cents: int = 0
+    net_cents: int = 0
+    balance_cents: int = 0
+
+
+class RecurringFlow(BaseModel):
+    """A counterparty paid or paying on a regular cadence, as projected by the forecast."""
+    counterparty: Optional[str] = None
+    direction: str = Field(..., description="inbound | outbound")
+    interval_days: float
+    amount_cents: int
+    next_date: date
+
+
+class CashFlowForecast(BaseModel):
+    """Projected daily cash flow and balance after the last ledger day."""
+    as_of: date
+    horizon_days: int
+    starting_balance_cents: int
+    ending_balance_cents: int
+    average_daily_net_cents: int
+    runway_days: Optional[int] = Field(default=None, description="Days until the balance goes negative; null if not within the horizon")
+    runway_date: Optional[date] = None
+    recurring: List[RecurringFlow] = Field(default_factory=list)
+    days: List[ForecastDay] = Field(default_factory=list)
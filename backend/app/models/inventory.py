@@ -1,5 +1,6 @@
 """Inventory models for pickleball clothing and equipment."""
-from typing import Optional
+from datetime import date
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field
@@ -12,6 +13,7 @@ class InventoryItem(BaseModel):
     sku: Optional[str] = None
     quantity: int = Field(..., ge=0, description="Current stock count")
     low_stock_threshold: int = Field(default=10, ge=0, description="Alert when quantity falls at or below")
+    unit_price_cents: int = Field(default=0, ge=0, description="Selling price per unit in cents")
 
 
 class InventoryTransaction(BaseModel):
@@ -27,3 +29,35 @@ class InventoryTransactionResponse(BaseModel):
     quantity_sold: int
     new_quantity: int
     low_stock_alert: Optional[dict] = None  # { "item_name": str, "quantity": int } when new_quantity <= threshold
+
+
+class InventoryOrder(BaseModel):
+    """Payload for recording a multi-line sale (e.g. a checkout cart) atomically."""
+    lines: List[InventoryTransaction] = Field(..., min_length=1, description="Order lines to apply all-or-nothing")
+
+
+class InventoryOrderResponse(BaseModel):
+    """Response after recording a multi-line sale."""
+    lines: List[InventoryTransactionResponse]
+    low_stock_alerts: List[dict] = Field(default_factory=list)  # one per item at or below threshold after the order
+
+
+class SkuSalesStats(BaseModel):
+    """Sales performance of one item over a date range, from the daily sales rollups."""
+    item_id: UUID
+    name: str
+    category: str
+    sku: Optional[str] = None
+    units_sold: int = 0
+    revenue_cents: int = 0
+    on_hand: int = 0
+    sell_through_rate: float = Field(0.0, description="units_sold / (units_sold + on_hand)")
+    days_of_stock_remaining: Optional[float] = Field(None, description="on_hand / average daily units sold; null when nothing sold")
+
+
+class SalesRevenueDay(BaseModel):
+    """Inventory sales for one day next to the cash inflow recorded in payments that day."""
+    day: date
+    units_sold: int = 0
+    revenue_cents: int = 0
+    cash_inflow_cents: int = 0
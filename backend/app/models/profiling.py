@@ -0,0 +1,23 @@
+"""Profiling capture models."""
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class RouteProfileRequest(BaseModel):
+    """Profile the next ``requests`` calls to one route."""
+    path: str = Field(..., description="Route template, e.g. /api/v1/cashflow/summary")
+    method: str = "GET"
+    requests: int = Field(default=10, ge=1, le=1000)
+
+
+class RouteProfile(BaseModel):
+    id: str
+    path: str
+    method: str
+    requested: int
+    captured: int = 0
+    status: str = Field(..., description="armed | complete | cancelled")
+    created_at: datetime
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,46 @@
+"""Stripe reconciliation report models."""
+from datetime import date, datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class PayoutReconciliation(BaseModel):
+    """A payout and the balance transactions it paid out."""
+    payout_id: str
+    status: str
+    currency: str = "USD"
+    amount_cents: int = 0
+    arrival_date: Optional[date] = None
+    transaction_count: int = Field(0, description="Member balance transactions, excluding the payout's own")
+    gross_cents: int = 0
+    fee_cents: int = 0
+    net_cents: int = 0
+    difference_cents: Optional[int] = Field(
+        default=None, description="Payout amount minus the members' net; unset when no members were listed",
+    )
+
+
+class UnmatchedItem(BaseModel):
+    """A Stripe object that did not join to its counterpart."""
+    object: str = Field(..., description="charge | balance_transaction | payout")
+    id: str
+    reason: str
+    amount_cents: int = 0
+    currency: str = "USD"
+    created_at: Optional[datetime] = None
+
+
+class ReconciliationReport(BaseModel):
+    """Charges joined to balance transactions and payouts, with fees and everything left unmatched."""
+    fetched_at: datetime
+    charge_count: int = 0
+    matched_charge_count: int = 0
+    duplicates_collapsed: int = Field(0, description="Balance transactions folded into their charge")
+    gross_cents: int = 0
+    fee_cents: int = 0
+    net_cents: int = 0
+    payout_count: int = 0
+    payouts: List[PayoutReconciliation] = Field(default_factory=list)
+    unmatched_count: int = 0
+    unmatched: List[UnmatchedItem] = Field(default_factory=list)
@@ -0,0 +1,123 @@
+"""Fast JSON encoding for large list responses.
+
+Routes returning hundreds of rows spend most of their time letting FastAPI
+re-validate and re-serialize each model field by field. These helpers encode
+store rows straight to JSON bytes instead, producing output byte-for-byte
+identical to the ``response_model`` path:
+
+- payments are immutable once loaded, so each row is encoded once and cached
+  by id; a page is then a join of cached byte strings. The cache is an LRU of
+  ``_PAYMENT_ROWS_MAX`` rows, enough for the pages actually being served
+  without holding an encoded copy of a million-row ledger
+- inventory quantities change, so each record caches the encoded JSON before
+  and after its ``quantity`` field and only the number is rendered per request
+
+orjson is used when installed; otherwise the stdlib encoder with the same
+compact, non-ASCII-preserving settings.
+"""
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Optional
+from uuid import UUID
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def dumps(value) -> bytes:
+    """Compact JSON bytes, matching FastAPI's own rendering of plain JSON types."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+def render_datetime(value: Optional[datetime]) -> Optional[str]:
+    """ISO 8601 the way Pydantic renders it (UTC as ``Z``)."""
+    if value is None:
+        return None
+    text = value.isoformat()
+    if text.endswith("+00:00"):
+        text = text[:-6] + "Z"
+    return text
+
+
+def json_response(rows: Iterable[bytes]) -> Response:
+    """A JSON array response from already-encoded rows."""
+    return Response(content=b"[" + b",".join(rows) + b"]", media_type=JSON_MEDIA_TYPE)
+
+
+# ── Payments ──
+
+_PAYMENT_ROWS: "OrderedDict[UUID, bytes]" = OrderedDict()  # least recently served first
+_PAYMENT_ROWS_MAX = 20_000
+_PAYMENT_ROWS_LOCK = threading.Lock()
+
+
+def encode_payment(p) -> bytes:
+    """One payment as JSON bytes, cached by id. Field order follows the Payment model."""
+    with _PAYMENT_ROWS_LOCK:
+        return _encode_payment(p)
+
+
+def _encode_payment(p) -> bytes:
+    # Under _PAYMENT_ROWS_LOCK.
+    cached = _PAYMENT_ROWS.get(p.id)
+    if cached is not None:
+        _PAYMENT_ROWS.move_to_end(p.id)
+    else:
+        cached = _PAYMENT_ROWS[p.id] = dumps({
+            "amount_cents": p.amount_cents,
+            "currency": p.currency,
+            "direction": p.direction,
+            "counterparty": p.counterparty,
+            "description": p.description,
+            "status": p.status.value,
+            "id": str(p.id),
+            "created_at": render_datetime(p.created_at),
+            "updated_at": render_datetime(p.updated_at),
+            "external_id": p.external_id,
+        })
+        if len(_PAYMENT_ROWS) > _PAYMENT_ROWS_MAX:
+            _PAYMENT_ROWS.popitem(last=False)
+    return cached
+
+
+def clear_payment_cache() -> None:
+    """Forget encoded payments, e.g. after the ledger is replaced."""
+    with _PAYMENT_ROWS_LOCK:
+        _PAYMENT_ROWS.clear()
+
+
+def payments_response(payments: Iterable) -> Response:
+    # One lock acquisition per page rather than per row.
+    with _PAYMENT_ROWS_LOCK:
+        rows = [_encode_payment(p) for p in payments]
+    return json_response(rows)
+
+
+# ── Inventory ──
+
+def encode_inventory_item(record) -> bytes:
+    """One inventory record as JSON bytes; only ``quantity`` is rendered per call."""
+    parts = record.json_parts
+    if parts is None:
+        parts = record.json_parts = _inventory_parts(record)
+    return parts[0] + str(record.quantity).encode() + parts[1]
+
+
+def _inventory_parts(record) -> tuple:
+    head = dumps({"id": str(record.id), "name": record.name, "category": record.category, "sku": record.sku})
+    tail = dumps({"low_stock_threshold": record.low_stock_threshold, "unit_price_cents": record.unit_price_cents})
+    return head[:-1] + b',"quantity":', b"," + tail[1:]
+
+
+def inventory_response(records: Iterable) -> Response:
+    return json_response(encode_inventory_item(r) for r in records)
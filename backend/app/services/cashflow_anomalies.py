@@ -0,0 +1,262 @@
+"""Anomaly detection over the daily cash flow rollups.
+
+Scores use the robust z-score ``(x - median) / (MAD / 0.6745)`` against a
+trailing window, so the heavy tails of payment amounts do not drag the
+baseline. Every series is scored in one vectorized pass with sliding windows.
+
+- Recurring counterparties (rent, payroll, payouts: a regular cadence of a
+  week or more) are checked for gaps. A missed payroll or a payout that never
+  arrived shows up as ``missing`` at the date it was due.
+- Daily inflow and outflow, excluding those recurring counterparties, are
+  scored against the same weekday in the previous weeks, so quiet weekends
+  and scheduled bills are not flagged.
+- Each counterparty's daily amount is scored against its own previous active
+  days, on a log scale because amounts vary multiplicatively. Only spikes are
+  reported here; a counterparty going quiet is a cadence question.
+
+Results cover the whole ledger, are computed once per ledger version and are
+filtered per request.
+"""
+import threading
+from datetime import date
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.services.cashflow_rollups import CashFlowRollups, Series, get_rollups
+
+THRESHOLD = 3.5  # |robust z| above which a value is anomalous (Iglewicz and Hoaglin)
+_DAILY_WINDOW = 12  # same-weekday observations (weeks) in the daily baseline
+_COUNTERPARTY_WINDOW = 20  # previous active days in a counterparty's baseline
+_CHUNK = 65_536  # windows per median call, bounding temporary memory
+_MAD_TO_SIGMA = 0.6745
+
+# Cadence detection: at least this many intervals, a median interval of at least
+# a week-ish, and most intervals within tolerance of the median.
+_MIN_INTERVALS = 3
+_MIN_CADENCE_DAYS = 5
+_CADENCE_TOLERANCE = 0.2
+_CADENCE_REGULARITY = 0.75
+_MISSING_FACTOR = 1.5  # a gap this many cadences long means a payment was skipped
+
+
+class Recurring(NamedTuple):
+    counterparty: Optional[str]
+    direction: str  # "inbound" | "outbound"
+    interval_days: float
+    typical_cents: int
+    first_day: int  # date ordinals
+    last_day: int
+    occurrences: int
+
+
+class Anomaly(NamedTuple):
+    day: date
+    series: str  # "inflow" | "outflow"
+    counterparty: Optional[str]
+    kind: str  # "spike" | "drop" | "missing"
+    value_cents: int
+    expected_cents: int
+    score: float  # robust z for spikes and drops; gap length in cadences for missing
+
+
+def rolling_robust(x: np.ndarray, window: int, floor: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Trailing-window median of each value's ``window`` predecessors, and its robust z-score.
+
+    Both are NaN until a full window is available. ``floor`` bounds the scale
+    from below so flat baselines (all zero, all identical) do not turn tiny
+    deviations into huge scores.
+    """
+    n = len(x)
+    expected = np.full(n, np.nan)
+    score = np.full(n, np.nan)
+    if n <= window:
+        return expected, score
+    windows = sliding_window_view(x[:-1], window)  # windows[i] is the baseline for x[i + window]
+    median = np.empty(len(windows))
+    mad = np.empty(len(windows))
+    for lo in range(0, len(windows), _CHUNK):
+        chunk = windows[lo:lo + _CHUNK]
+        median[lo:lo + _CHUNK] = m = np.median(chunk, axis=1)
+        mad[lo:lo + _CHUNK] = np.median(np.abs(chunk - m[:, None]), axis=1)
+    scale = np.maximum(mad / _MAD_TO_SIGMA, floor)
+    expected[window:] = median
+    score[window:] = (x[window:] - median) / scale
+    return expected, score
+
+
+def _series_direction(series: Series) -> Tuple[str, np.ndarray]:
+    inflow = np.frombuffer(series.inflow, dtype=np.int64)
+    outflow = np.frombuffer(series.outflow, dtype=np.int64)
+    if inflow.sum() >= outflow.sum():
+        return "inbound", inflow
+    return "outbound", outflow
+
+
+def find_recurring(rollups: CashFlowRollups) -> List[Recurring]:
+    """Counterparties paid or paying on a regular cadence of ``_MIN_CADENCE_DAYS`` or more."""
+    out = []
+    for name, series in rollups.counterparties.items():
+        if len(series.days) <= _MIN_INTERVALS:
+            continue
+        days = np.frombuffer(series.days, dtype=np.int64)
+        intervals = np.diff(days)
+        interval = float(np.median(intervals))
+        if interval < _MIN_CADENCE_DAYS:
+            continue
+        tolerance = max(2.0, _CADENCE_TOLERANCE * interval)
+        if np.mean(np.abs(intervals - interval) <= tolerance) < _CADENCE_REGULARITY:
+            continue
+        direction, amounts = _series_direction(series)
+        out.append(Recurring(
+            counterparty=name,
+            direction=direction,
+            interval_days=interval,
+            typical_cents=int(np.median(amounts)),
+            first_day=int(days[0]),
+            last_day=int(days[-1]),
+            occurrences=len(days),
+        ))
+    return out
+
+
+def _label(direction: str) -> str:
+    return "inflow" if direction == "inbound" else "outflow"
+
+
+def _missing(rollups: CashFlowRollups, recurring: List[Recurring], as_of: int) -> List[Anomaly]:
+    out = []
+    for r in recurring:
+        days = np.frombuffer(rollups.counterparties[r.counterparty].days, dtype=np.int64)
+        # Gaps between occurrences, plus the open gap up to the end of the ledger.
+        starts = days
+        gaps = np.append(np.diff(days), as_of - days[-1])
+        late = np.nonzero(gaps > _MISSING_FACTOR * r.interval_days)[0]
+        for i in late:
+            out.append(Anomaly(
+                day=date.fromordinal(int(starts[i] + round(r.interval_days))),
+                series=_label(r.direction),
+                counterparty=r.counterparty,
+                kind="missing",
+                value_cents=0,
+                expected_cents=r.typical_cents,
+                score=round(float(gaps[i] / r.interval_days), 2),
+            ))
+    return out
+
+
+def _scored(
+    days: np.ndarray,
+    values: np.ndarray,
+    expected: np.ndarray,
+    score: np.ndarray,
+    series,
+    counterparty,
+    log_scale: bool = False,
+    spikes_only: bool = False,
+) -> List[Anomaly]:
+    score = np.nan_to_num(score)
+    flagged = np.nonzero((score if spikes_only else np.abs(score)) >= THRESHOLD)[0]
+    if log_scale:
+        expected = np.expm1(expected)
+    return [
+        Anomaly(
+            day=date.fromordinal(int(days[i])),
+            series=series if isinstance(series, str) else series[i],
+            counterparty=counterparty if counterparty is None or isinstance(counterparty, str) else counterparty[i],
+            kind="spike" if score[i] > 0 else "drop",
+            value_cents=int(values[i]),
+            expected_cents=int(round(expected[i])),
+            score=round(float(score[i]), 2),
+        )
+        for i in flagged
+    ]
+
+
+def organic_daily(rollups: CashFlowRollups, recurring: List[Recurring]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Day ordinals over the ledger's span with daily inflow and outflow, minus the recurring counterparties."""
+    if not len(rollups.daily.days):
+        empty = np.zeros(0, np.int64)
+        return empty, empty, empty
+    first, last = rollups.daily.days[0], rollups.daily.days[-1]
+    inflow, outflow, _ = rollups.daily.dense(first, last)
+    for r in recurring:
+        cp_in, cp_out, _ = rollups.counterparties[r.counterparty].dense(first, last)
+        inflow = inflow - cp_in
+        outflow = outflow - cp_out
+    return np.arange(first, last + 1), inflow, outflow
+
+
+def _daily(rollups: CashFlowRollups, recurring: List[Recurring]) -> List[Anomaly]:
+    # Scheduled payments are judged by their cadence, not as daily spikes.
+    days, inflow, outflow = organic_daily(rollups, recurring)
+    out = []
+    for label, values in (("inflow", inflow), ("outflow", outflow)):
+        x = values.astype(np.float64)
+        positive = x[x > 0]
+        floor = 0.25 * float(np.median(positive)) if len(positive) else 1.0
+        expected = np.full(len(x), np.nan)
+        score = np.full(len(x), np.nan)
+        # One sub-series per weekday, each scored against its own previous weeks.
+        for offset in range(7):
+            expected[offset::7], score[offset::7] = rolling_robust(x[offset::7], _DAILY_WINDOW, floor)
+        # A weekday that is usually quiet says nothing about a busy one (sparse or new ledgers).
+        score[expected == 0] = np.nan
+        out.extend(_scored(days, values, expected, score, label, None))
+    return out
+
+
+def _per_counterparty(rollups: CashFlowRollups) -> List[Anomaly]:
+    """Spikes in each counterparty's daily amount, all counterparties scored in one pass.
+
+    Every eligible series is concatenated; windows that reach back into the
+    previous counterparty are computed with the rest and then discarded.
+    """
+    names, labels, days, amounts, valid = [], [], [], [], []
+    for name, series in rollups.counterparties.items():
+        n = len(series.days)
+        if n <= _COUNTERPARTY_WINDOW:
+            continue
+        direction, values = _series_direction(series)
+        names.extend([name] * n)
+        labels.extend([_label(direction)] * n)
+        days.append(np.frombuffer(series.days, dtype=np.int64))
+        amounts.append(values)
+        own = np.ones(n, dtype=bool)
+        own[:_COUNTERPARTY_WINDOW] = False
+        valid.append(own)
+    if not days:
+        return []
+    amounts_all = np.concatenate(amounts)
+    expected, score = rolling_robust(np.log1p(amounts_all.astype(np.float64)), _COUNTERPARTY_WINDOW, 0.1)
+    score[~np.concatenate(valid)] = np.nan
+    return _scored(np.concatenate(days), amounts_all, expected, score, labels, names, log_scale=True, spikes_only=True)
+
+
+def detect(rollups: CashFlowRollups) -> List[Anomaly]:
+    """Every anomaly in the ledger, most recent first."""
+    recurring = find_recurring(rollups)
+    as_of = rollups.daily.days[-1] if len(rollups.daily.days) else 0
+    anomalies = _missing(rollups, recurring, as_of) + _daily(rollups, recurring) + _per_counterparty(rollups)
+    anomalies.sort(key=lambda a: (a.day, abs(a.score)), reverse=True)
+    return anomalies
+
+
+_ANOMALIES: Tuple[Optional[int], List[Anomaly]] = (None, [])
+_ANOMALIES_LOCK = threading.Lock()
+
+
+def get_anomalies(start: Optional[date] = None, end: Optional[date] = None, limit: Optional[int] = None) -> List[Anomaly]:
+    """Anomalies dated within ``[start, end]``, most recent first; detection runs once per ledger version."""
+    global _ANOMALIES
+    rollups = get_rollups()
+    version, anomalies = _ANOMALIES
+    if version != rollups.version:
+        with _ANOMALIES_LOCK:
+            version, anomalies = _ANOMALIES
+            if version != rollups.version:
+                anomalies = detect(rollups)
+                _ANOMALIES = (rollups.version, anomalies)
+    selected = [a for a in anomalies if (start is None or a.day >= start) and (end is None or a.day <= end)]
+    return selected[:limit] if limit is not None else selected
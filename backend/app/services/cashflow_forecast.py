@@ -0,0 +1,202 @@
+"""Forward cash flow projection and runway from the daily and per-counterparty rollups.
+
+The ledger is split into two parts, each projected its own way:
+
+- Recurring counterparties (see ``cashflow_anomalies.find_recurring``) are
+  projected forward on their own cadence at their typical amount. Cadences
+  close to a whole number of months step by calendar month, on the same day
+  of the month. A counterparty silent for more than two cadences is treated
+  as ended.
+- The remaining ("organic") daily inflow and outflow are projected as a
+  recent level times weekday and month-of-year factors. The level is the
+  mean of the last ``_LEVEL_DAYS`` days with seasonality divided out. The
+  factors come from the whole history; month factors are used only once a
+  full year is available.
+
+Everything after recurring detection is numpy over the dense daily series.
+Forecasts are cached per ledger version, horizon and starting balance.
+"""
+import calendar
+import threading
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.cashflow_anomalies import Recurring, find_recurring, organic_daily
+from app.services.cashflow_rollups import CashFlowRollups, get_rollups
+
+_LEVEL_DAYS = 56  # recent window that sets the organic run rate
+_SEASONAL_MIN_DAYS = 365  # history needed before month-of-year factors are used
+_ENDED_AFTER_CADENCES = 2.0
+_DAYS_PER_MONTH = 30.44
+_MONTH_TOLERANCE_DAYS = 3.0
+_UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class ProjectedRecurring(NamedTuple):
+    counterparty: Optional[str]
+    direction: str
+    interval_days: float
+    amount_cents: int
+    next_date: date
+
+
+class Forecast(NamedTuple):
+    as_of: date
+    starting_balance_cents: int
+    recurring: List[ProjectedRecurring]
+    days: np.ndarray  # date ordinals
+    inflow: np.ndarray
+    outflow: np.ndarray
+    balance: np.ndarray
+
+
+def _weekdays(ordinals: np.ndarray) -> np.ndarray:
+    return (ordinals - 1) % 7  # ordinal 1 (0001-01-01) was a Monday
+
+
+def _months(ordinals: np.ndarray) -> np.ndarray:
+    days = (ordinals - _UNIX_EPOCH_ORDINAL).astype("datetime64[D]")
+    return days.astype("datetime64[M]").astype(np.int64) % 12
+
+
+def _factors(values: np.ndarray, keys: np.ndarray, size: int) -> np.ndarray:
+    """Mean of ``values`` per key relative to the overall mean; 1 where there is no data."""
+    overall = values.mean() if len(values) else 0.0
+    if overall <= 0:
+        return np.ones(size)
+    sums = np.bincount(keys, weights=values, minlength=size)
+    counts = np.bincount(keys, minlength=size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factors = sums / counts / overall
+    factors[(counts == 0) | ~np.isfinite(factors) | (factors <= 0)] = 1.0
+    return factors
+
+
+def _project_organic(history_days: np.ndarray, values: np.ndarray, future_days: np.ndarray) -> np.ndarray:
+    x = values.astype(np.float64)
+    weekday = _factors(x, _weekdays(history_days), 7)
+    if len(history_days) >= _SEASONAL_MIN_DAYS:
+        month = _factors(x, _months(history_days), 12)
+    else:
+        month = np.ones(12)
+
+    def seasonal(ordinals: np.ndarray) -> np.ndarray:
+        return weekday[_weekdays(ordinals)] * month[_months(ordinals)]
+
+    recent = slice(max(0, len(x) - _LEVEL_DAYS), len(x))
+    level = float(np.mean(x[recent] / seasonal(history_days[recent]))) if len(x) else 0.0
+    return np.maximum(level * seasonal(future_days), 0.0)
+
+
+def _add_months(day: date, months: int, day_of_month: int) -> date:
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(day_of_month, calendar.monthrange(year, month)[1]))
+
+
+def _due_dates(r: Recurring, start: int, end: int) -> List[int]:
+    """Ordinals in ``[start, end]`` on which ``r`` is next due, continuing from its last occurrence."""
+    months = round(r.interval_days / _DAYS_PER_MONTH)
+    last = date.fromordinal(r.last_day)
+    due = []
+    if months >= 1 and abs(r.interval_days - months * _DAYS_PER_MONTH) <= _MONTH_TOLERANCE_DAYS:
+        step = 1
+        while True:
+            day = _add_months(last, months * step, last.day).toordinal()
+            if day > end:
+                break
+            if day >= start:
+                due.append(day)
+            step += 1
+    else:
+        interval = max(1, round(r.interval_days))
+        day = r.last_day + interval
+        while day <= end:
+            if day >= start:
+                due.append(day)
+            day += interval
+    return due
+
+
+def build_forecast(rollups: CashFlowRollups, horizon_days: int, starting_balance: Optional[int]) -> Forecast:
+    recurring = find_recurring(rollups)
+    history_days, organic_in, organic_out = organic_daily(rollups, recurring)
+    as_of = int(history_days[-1]) if len(history_days) else date.today().toordinal()
+    future = np.arange(as_of + 1, as_of + horizon_days + 1)
+
+    if len(history_days):
+        inflow = _project_organic(history_days, organic_in, future)
+        outflow = _project_organic(history_days, organic_out, future)
+    else:
+        inflow = np.zeros(horizon_days)
+        outflow = np.zeros(horizon_days)
+
+    projected = []
+    for r in recurring:
+        if as_of - r.last_day > _ENDED_AFTER_CADENCES * r.interval_days:
+            continue
+        due = _due_dates(r, as_of + 1, as_of + horizon_days)
+        if not due:
+            continue
+        target = inflow if r.direction == "inbound" else outflow
+        np.add.at(target, np.asarray(due) - (as_of + 1), r.typical_cents)
+        projected.append(ProjectedRecurring(
+            counterparty=r.counterparty,
+            direction=r.direction,
+            interval_days=r.interval_days,
+            amount_cents=r.typical_cents,
+            next_date=date.fromordinal(due[0]),
+        ))
+    projected.sort(key=lambda p: p.next_date)
+
+    if starting_balance is None:
+        total_in, total_out, _ = rollups.daily.totals()
+        starting_balance = settings.opening_balance_cents + total_in - total_out
+    inflow = np.rint(inflow).astype(np.int64)
+    outflow = np.rint(outflow).astype(np.int64)
+    balance = starting_balance + np.cumsum(inflow - outflow)
+    return Forecast(
+        as_of=date.fromordinal(as_of),
+        starting_balance_cents=int(starting_balance),
+        recurring=projected,
+        days=future,
+        inflow=inflow,
+        outflow=outflow,
+        balance=balance,
+    )
+
+
+def runway(forecast: Forecast) -> Tuple[Optional[int], Optional[date]]:
+    """Days until the projected balance first goes negative, and that date; ``(None, None)`` if it never does."""
+    below = np.nonzero(forecast.balance < 0)[0]
+    if not len(below):
+        return None, None
+    i = int(below[0])
+    return i + 1, date.fromordinal(int(forecast.days[i]))
+
+
+_CACHE: Dict[Tuple[int, int, Optional[int]], Forecast] = {}
+_CACHE_VERSION: Optional[int] = None
+_CACHE_LOCK = threading.Lock()
+_CACHE_SIZE = 64
+
+
+def get_forecast(horizon_days: int, starting_balance: Optional[int] = None) -> Forecast:
+    """Forecast for the current ledger, cached per (ledger version, horizon, starting balance)."""
+    global _CACHE_VERSION
+    rollups = get_rollups()
+    key = (rollups.version, horizon_days, starting_balance)
+    forecast = _CACHE.get(key)
+    if forecast is not None:
+        return forecast
+    with _CACHE_LOCK:
+        if _CACHE_VERSION != rollups.version or len(_CACHE) >= _CACHE_SIZE:
+            _CACHE.clear()
+            _CACHE_VERSION = rollups.version
+        forecast = _CACHE.get(key)
+        if forecast is None:
+            forecast = _CACHE[key] = build_forecast(rollups, horizon_days, starting_balance)
+        return forecast
@@ -0,0 +1,208 @@
+"""Daily and per-(counterparty, day) cash flow aggregates, built once per ledger version.
+
+One pass over the ledger folds every payment into ``day -> [inflow, outflow,
+count]``, both overall and per counterparty: positive inbound amounts are
+inflow and outbound amounts count by absolute value. Each series is then
+frozen into sorted day ordinals with prefix sums, so the totals for any date
+range are two bisects and a subtraction, and ranking counterparties costs one
+lookup each rather than a pass over their payments. The cash flow summary,
+counterparty ranking, anomalies and forecast all read these series, so they
+agree on the same ledger.
+
+A shared, memory-mapped ledger (``PAYMENTS_SHARED_DIR``) is folded straight
+from its columns with numpy, without building a Payment per row. The
+rollups themselves are per worker, but small: one entry per (counterparty,
+day) that had payments.
+"""
+import bisect
+import heapq
+import threading
+from array import array
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.payment import Payment
+from app.services.payment_files import DIRECTIONS, LedgerColumns
+from app.services.payment_store import ledger
+
+Totals = Tuple[int, int, int]  # inflow_cents, outflow_cents, transaction_count
+ByDay = Dict[int, List[int]]  # day ordinal -> [inflow, outflow, count]
+
+_MICROS_PER_DAY = 86_400_000_000
+_UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class Series:
+    """Per-day inflow, outflow and count over the days that had payments, with prefix sums."""
+
+    __slots__ = ("days", "inflow", "outflow", "count", "_cum_inflow", "_cum_outflow", "_cum_count")
+
+    def __init__(self, by_day: Dict[int, List[int]]):
+        ordinals = sorted(by_day)
+        self.days = array("q", ordinals)
+        self.inflow = array("q", (by_day[d][0] for d in ordinals))
+        self.outflow = array("q", (by_day[d][1] for d in ordinals))
+        self.count = array("q", (by_day[d][2] for d in ordinals))
+        self._cum_inflow = _prefix_sums(self.inflow)
+        self._cum_outflow = _prefix_sums(self.outflow)
+        self._cum_count = _prefix_sums(self.count)
+
+    def _bounds(self, start: Optional[date], end: Optional[date]) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self.days, start.toordinal()) if start else 0
+        hi = bisect.bisect_right(self.days, end.toordinal()) if end else len(self.days)
+        return lo, max(lo, hi)
+
+    def totals(self, start: Optional[date] = None, end: Optional[date] = None) -> Totals:
+        lo, hi = self._bounds(start, end)
+        return (
+            self._cum_inflow[hi] - self._cum_inflow[lo],
+            self._cum_outflow[hi] - self._cum_outflow[lo],
+            self._cum_count[hi] - self._cum_count[lo],
+        )
+
+    def days_between(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterable[Tuple[int, int, int, int]]:
+        """(day ordinal, inflow, outflow, count) for each day with payments in the range, oldest first."""
+        lo, hi = self._bounds(start, end)
+        return zip(self.days[lo:hi], self.inflow[lo:hi], self.outflow[lo:hi], self.count[lo:hi])
+
+    def dense(self, first: int, last: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Inflow, outflow and count for every day ordinal in ``[first, last]``, zero on quiet days."""
+        size = last - first + 1
+        inflow, outflow, count = np.zeros(size, np.int64), np.zeros(size, np.int64), np.zeros(size, np.int64)
+        lo, hi = bisect.bisect_left(self.days, first), bisect.bisect_right(self.days, last)
+        if hi > lo:
+            idx = np.frombuffer(self.days, dtype=np.int64)[lo:hi] - first
+            inflow[idx] = np.frombuffer(self.inflow, dtype=np.int64)[lo:hi]
+            outflow[idx] = np.frombuffer(self.outflow, dtype=np.int64)[lo:hi]
+            count[idx] = np.frombuffer(self.count, dtype=np.int64)[lo:hi]
+        return inflow, outflow, count
+
+
+def _prefix_sums(values: Iterable[int]) -> array:
+    out = array("q", [0])
+    total = 0
+    for v in values:
+        total += v
+        out.append(total)
+    return out
+
+
+def _fold_payments(payments: Iterable[Payment]) -> Tuple[ByDay, Dict[Optional[str], ByDay]]:
+    daily: ByDay = {}
+    by_counterparty: Dict[Optional[str], ByDay] = {}
+    for p in payments:
+        day = p.created_at.date().toordinal()
+        if p.direction == "inbound" and p.amount_cents > 0:
+            inflow, outflow = p.amount_cents, 0
+        elif p.direction == "outbound":
+            inflow, outflow = 0, abs(p.amount_cents)
+        else:
+            inflow = outflow = 0
+        for bucket in (daily, by_counterparty.setdefault(p.counterparty, {})):
+            entry = bucket.get(day)
+            if entry is None:
+                bucket[day] = [inflow, outflow, 1]
+            else:
+                entry[0] += inflow
+                entry[1] += outflow
+                entry[2] += 1
+    return daily, by_counterparty
+
+
+def _fold_columns(columns: LedgerColumns) -> Tuple[ByDay, Dict[Optional[str], ByDay]]:
+    """:func:`_fold_payments` over ledger columns: group rows by (counterparty string, UTC day) with numpy."""
+    daily: ByDay = {}
+    by_counterparty: Dict[Optional[str], ByDay] = {}
+    n = columns.row_count
+    if not n:
+        return daily, by_counterparty
+    days = np.frombuffer(columns.created_at, dtype=np.int64) // _MICROS_PER_DAY + _UNIX_EPOCH_ORDINAL
+    amounts = np.frombuffer(columns.amount_cents, dtype=np.int64)
+    directions = np.frombuffer(columns.direction, dtype=np.uint8)
+    inflow = np.where((directions == DIRECTIONS.index("inbound")) & (amounts > 0), amounts, 0)
+    outflow = np.where(directions == DIRECTIONS.index("outbound"), np.abs(amounts), 0)
+
+    first_day = int(days.min())
+    span = int(days.max()) - first_day + 1
+    keys = np.frombuffer(columns.counterparty, dtype=np.uint32).astype(np.int64) * span + (days - first_day)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    group_keys = keys[starts]
+    group_in = np.add.reduceat(inflow[order], starts)
+    group_out = np.add.reduceat(outflow[order], starts)
+    group_count = np.diff(np.append(starts, n))
+
+    names: Dict[int, Optional[str]] = {}
+    for key, inc, out, count in zip(group_keys.tolist(), group_in.tolist(), group_out.tolist(), group_count.tolist()):
+        string_index, day = divmod(key, span)
+        day += first_day
+        if string_index not in names:
+            names[string_index] = columns.string(string_index)
+        for bucket in (daily, by_counterparty.setdefault(names[string_index], {})):
+            entry = bucket.get(day)
+            if entry is None:
+                bucket[day] = [inc, out, count]
+            else:
+                entry[0] += inc
+                entry[1] += out
+                entry[2] += count
+    return daily, by_counterparty
+
+
+class CashFlowRollups:
+    def __init__(self, version: int, payments: Iterable[Payment]):
+        self.version = version
+        columns = getattr(payments, "columns", None)  # a shared ledger's LedgerPayments
+        if columns is not None:
+            daily, by_counterparty = _fold_columns(columns)
+        else:
+            daily, by_counterparty = _fold_payments(payments)
+        self.daily = Series(daily)
+        self.counterparties: Dict[Optional[str], Series] = {
+            name: Series(days) for name, days in by_counterparty.items()
+        }
+
+    def top_counterparties(
+        self,
+        start: Optional[date],
+        end: Optional[date],
+        direction: Optional[str] = None,
+        top: int = 10,
+    ) -> List[Tuple[Optional[str], Totals]]:
+        """The ``top`` counterparties by inflow, outflow or (no direction) total volume in the range."""
+        ranked = []
+        for name, series in self.counterparties.items():
+            totals = series.totals(start, end)
+            volume = _volume(totals, direction)
+            if volume > 0:
+                ranked.append((volume, name, totals))
+        return [(name, totals) for _, name, totals in heapq.nlargest(top, ranked, key=lambda e: e[0])]
+
+
+def _volume(totals: Totals, direction: Optional[str]) -> int:
+    if direction == "inbound":
+        return totals[0]
+    if direction == "outbound":
+        return totals[1]
+    return totals[0] + totals[1]
+
+
+_ROLLUPS: Optional[CashFlowRollups] = None
+_ROLLUPS_LOCK = threading.Lock()
+
+
+def get_rollups() -> CashFlowRollups:
+    """Rollups for the current ledger, rebuilt when the ledger version changes."""
+    global _ROLLUPS
+    version, _ = ledger()
+    rollups = _ROLLUPS
+    if rollups is not None and rollups.version == version:
+        return rollups
+    with _ROLLUPS_LOCK:
+        version, payments = ledger()
+        if _ROLLUPS is None or _ROLLUPS.version != version:
+            _ROLLUPS = CashFlowRollups(version, payments)
+        return _ROLLUPS
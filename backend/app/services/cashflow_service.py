@@ -1,43 +1,40 @@
 """Cash flow aggregation from payments."""
 from datetime import date
-from collections import defaultdict
+from typing import Optional
 
-from app.models.cashflow import CashFlowSummary, CashFlowPeriod
-from app.services.payment_store import get_payment_store
+from app.metrics import timed_function
+from app.models.cashflow import (
+    CashFlowAnomalies,
+    CashFlowAnomaly,
+    CashFlowForecast,
+    CashFlowSummary,
+    CashFlowPeriod,
+    CounterpartyRanking,
+    CounterpartyTotal,
+    ForecastDay,
+    RecurringFlow,
+)
+from app.services.cashflow_anomalies import get_anomalies
+from app.services.cashflow_forecast import get_forecast, runway
+from app.services.cashflow_rollups import get_rollups
 
 
+@timed_function("get_cashflow_summary")
 def get_cashflow_summary(start: date, end: date) -> CashFlowSummary:
-    store = get_payment_store()
-    payments = store.list(limit=500)
-    by_period: dict[date, tuple[int, int, int]] = defaultdict(lambda: (0, 0, 0))
-
-    total_in = 0
-    total_out = 0
-    for p in payments:
-        created = p.created_at.date()
-        if created < start or created > end:
-            continue
-        inc, out, count = by_period[created]
-        if p.direction == "inbound" and p.amount_cents > 0:
-            inc += p.amount_cents
-            total_in += p.amount_cents
-        elif p.direction == "outbound":
-            out += abs(p.amount_cents)
-            total_out += abs(p.amount_cents)
-        count += 1
-        by_period[created] = (inc, out, count)
-
+    """Daily periods and totals over the whole ledger in ``[start, end]``, from the daily rollup."""
+    daily = get_rollups().daily
+    total_in, total_out, _ = daily.totals(start, end)
     periods = [
         CashFlowPeriod(
-            period_start=d,
-            period_end=d,
+            period_start=day,
+            period_end=day,
             inflow_cents=inc,
             outflow_cents=out,
             net_cents=inc - out,
             transaction_count=count,
         )
-        for d in sorted(by_period.keys())
-        for inc, out, count in [by_period[d]]
+        for ordinal, inc, out, count in daily.days_between(start, end)
+        for day in [date.fromordinal(ordinal)]
     ]
 
     return CashFlowSummary(
@@ -48,3 +45,69 @@ def get_cashflow_summary(start: date, end: date) -> CashFlowSummary:
         net_cents=total_in - total_out,
         periods=periods,
     )
+
+
+@timed_function("get_top_counterparties")
+def get_top_counterparties(
+    start: date,
+    end: date,
+    direction: Optional[str] = None,
+    top: int = 10,
+) -> CounterpartyRanking:
+    """Top counterparties over the range, from the per-(counterparty, day) rollups."""
+    ranked = get_rollups().top_counterparties(start, end, direction=direction, top=top)
+    return CounterpartyRanking(
+        start_date=start,
+        end_date=end,
+        direction=direction,
+        counterparties=[
+            CounterpartyTotal(
+                counterparty=name,
+                inflow_cents=inflow,
+                outflow_cents=outflow,
+                net_cents=inflow - outflow,
+                transaction_count=count,
+            )
+            for name, (inflow, outflow, count) in ranked
+        ],
+    )
+
+
+@timed_function("get_cashflow_anomalies")
+def get_cashflow_anomalies(start: date, end: date, limit: int = 100) -> CashFlowAnomalies:
+    """Anomalies dated within the range, most recent first."""
+    return CashFlowAnomalies(
+        start_date=start,
+        end_date=end,
+        anomalies=[CashFlowAnomaly(**a._asdict()) for a in get_anomalies(start, end, limit=limit)],
+    )
+
+
+@timed_function("get_cashflow_forecast")
+def get_cashflow_forecast(horizon_days: int, starting_balance_cents: Optional[int] = None) -> CashFlowForecast:
+    """Projected daily flows, balance and runway for ``horizon_days`` after the last ledger day."""
+    forecast = get_forecast(horizon_days, starting_balance_cents)
+    runway_days, runway_date = runway(forecast)
+    ending = int(forecast.balance[-1]) if len(forecast.balance) else forecast.starting_balance_cents
+    return CashFlowForecast(
+        as_of=forecast.as_of,
+        horizon_days=horizon_days,
+        starting_balance_cents=forecast.starting_balance_cents,
+        ending_balance_cents=ending,
+        average_daily_net_cents=(ending - forecast.starting_balance_cents) // max(1, horizon_days),
+        runway_days=runway_days,
+        runway_date=runway_date,
+        recurring=[RecurringFlow(**r._asdict()) for r in forecast.recurring],
+        days=[
+            ForecastDay(
+                day=date.fromordinal(d),
+                inflow_cents=i,
+                outflow_cents=o,
+                net_cents=i - o,
+                balance_cents=b,
+            )
+            for d, i, o, b in zip(
+                forecast.days.tolist(), forecast.inflow.tolist(), forecast.outflow.tolist(), forecast.balance.tolist(),
+            )
+        ],
+    )
@@ -5,13 +5,22 @@ from datetime import date
 from openai import OpenAI, APIError, APIConnectionError, APITimeoutError
 
 from app.config import settings
+from app.metrics import timed, timed_function
 from app.models.copilot import CopilotAskResponse
-from app.services.cashflow_service import get_cashflow_summary
-from app.services.payment_store import get_payment_store
+from app.services.cashflow_anomalies import get_anomalies
+from app.services.cashflow_forecast import get_forecast, runway
+from app.services.cashflow_rollups import get_rollups
+from app.services.payment_store import data_version, get_payment_store
 from app.services.inventory_store import get_inventory_store
 
 logger = logging.getLogger(__name__)
 
+# Payments context size: counterparties listed per direction, anomalies, and individual recent payments.
+_CONTEXT_TOP_COUNTERPARTIES = 10
+_CONTEXT_ANOMALIES = 10
+_CONTEXT_RECENT_PAYMENTS = 50
+_CONTEXT_FORECAST_DAYS = 90
+
 
 class CopilotError(Exception):
     """Raised when the LLM call fails for any reason."""
@@ -22,32 +31,76 @@ class CopilotError(Exception):
         super().__init__(message)
 
 
+# (ledger version, rendered payments context). The context depends only on the
+# ledger, so it is rendered once per version instead of once per question.
+_PAYMENTS_CONTEXT: tuple = (None, "")
+
+
 def _build_payments_context() -> str:
+    """Payments context for the LLM, cached per ledger version."""
+    global _PAYMENTS_CONTEXT
+    get_payment_store()  # seeds the ledger before its version is read
+    version = data_version()
+    cached_version, text = _PAYMENTS_CONTEXT
+    if cached_version != version:
+        text = _render_payments_context()
+        _PAYMENTS_CONTEXT = (version, text)
+    return text
+
+
+@timed_function("build_payments_context")
+def _render_payments_context() -> str:
     """Build a detailed data context from all payments for the LLM."""
-    store = get_payment_store()
-    payments = store.list(limit=500)
-
-    if not payments:
+    rollups = get_rollups()
+    daily = rollups.daily
+    if not len(daily.days):
         return "No payment data available."
 
-    # Find actual date range of the data
-    dates = [p.created_at.date() for p in payments]
-    earliest = min(dates)
-    latest = max(dates)
-
-    # Get summary over the actual data range
-    summary = get_cashflow_summary(start=earliest, end=latest)
+    # Date range and totals cover the whole ledger, from the daily rollup.
+    earliest = date.fromordinal(daily.days[0])
+    latest = date.fromordinal(daily.days[-1])
+    total_in, total_out, payment_count = daily.totals()
 
     lines = [
-        f"Data range: {earliest} to {latest} ({len(payments)} payments)",
-        f"Total inflows: ${summary.total_inflow_cents / 100:,.2f}",
-        f"Total outflows: ${summary.total_outflow_cents / 100:,.2f}",
-        f"Net cash flow: ${summary.net_cents / 100:,.2f}",
-        "",
-        "Individual payments:",
+        f"Data range: {earliest} to {latest} ({payment_count} payments)",
+        f"Total inflows: ${total_in / 100:,.2f}",
+        f"Total outflows: ${total_out / 100:,.2f}",
+        f"Net cash flow: ${(total_in - total_out) / 100:,.2f}",
     ]
 
-    for p in sorted(payments, key=lambda x: x.created_at, reverse=True):
+    forecast = get_forecast(_CONTEXT_FORECAST_DAYS)
+    if len(forecast.balance):
+        runway_days, runway_date = runway(forecast)
+        lines.extend([
+            "",
+            f"Forecast for the {_CONTEXT_FORECAST_DAYS} days after {forecast.as_of}: "
+            f"balance ${forecast.starting_balance_cents / 100:,.2f} -> ${int(forecast.balance[-1]) / 100:,.2f}; "
+            + (f"runway {runway_days} days (cash runs out {runway_date})" if runway_days
+               else f"no cash shortfall projected within {_CONTEXT_FORECAST_DAYS} days"),
+        ])
+
+    # Per-counterparty totals come from the rollups, so the prompt carries one
+    # line per top counterparty rather than every payment.
+    for direction, label in (("inbound", "Top payers (inflow)"), ("outbound", "Top payees (outflow)")):
+        ranked = rollups.top_counterparties(earliest, latest, direction=direction, top=_CONTEXT_TOP_COUNTERPARTIES)
+        if ranked:
+            lines.extend(["", f"{label}:"])
+            for name, (inflow, outflow, count) in ranked:
+                amount = inflow if direction == "inbound" else outflow
+                lines.append(f"  {name or 'N/A'} | ${amount / 100:,.2f} | {count} payments")
+
+    anomalies = get_anomalies(earliest, latest, limit=_CONTEXT_ANOMALIES)
+    if anomalies:
+        lines.extend(["", "Anomalies (most recent first; expected = typical value):"])
+        for a in anomalies:
+            who = f"{a.counterparty} " if a.counterparty else "daily total "
+            lines.append(
+                f"  {a.day} | {who}{a.series} {a.kind} | ${a.value_cents / 100:,.2f} "
+                f"(expected ${a.expected_cents / 100:,.2f}) | score {a.score}"
+            )
+
+    lines.extend(["", "Most recent payments:"])
+    for p in get_payment_store().list(limit=_CONTEXT_RECENT_PAYMENTS):  # the ledger is newest first
         sign = "+" if p.direction == "inbound" else "-"
         amt = abs(p.amount_cents) / 100
         lines.append(
@@ -58,6 +111,7 @@ def _build_payments_context() -> str:
     return "\n".join(lines)
 
 
+@timed_function("build_inventory_context")
 def _build_inventory_context() -> str:
     """Build a detailed data context from inventory for the LLM."""
     store = get_inventory_store()
@@ -66,7 +120,7 @@ def _build_inventory_context() -> str:
     if not items:
         return "No inventory data available."
 
-    low_stock = [i for i in items if i.quantity <= i.low_stock_threshold]
+    low_stock = store.low_stock()
     by_category: dict[str, list] = {}
     for i in items:
         by_category.setdefault(i.category, []).append(i)
@@ -124,14 +178,15 @@ Inventory data:
 Question: {question}"""
 
     try:
-        response = client.chat.completions.create(
-            model=settings.openai_model,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user_content},
-            ],
-            max_tokens=500,
-        )
+        with timed("copilot_llm_call"):
+            response = client.chat.completions.create(
+                model=settings.openai_model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user_content},
+                ],
+                max_tokens=500,
+            )
     except APITimeoutError:
         logger.exception("OpenAI request timed out")
         raise CopilotError("Copilot request timed out. Please try again.", status_code=504)
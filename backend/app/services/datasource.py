@@ -1,12 +1,14 @@
 """Load payments from the configured datasource."""
-import json
 import logging
+import random
 from pathlib import Path
-from typing import List
-from uuid import uuid4
-from datetime import datetime
+from typing import Iterable, List, Optional
+from uuid import UUID, uuid4
 
+from app.concurrency import run_cpu
+from app.metrics import timed, timed_function
 from app.models.payment import Payment, PaymentStatus
+from app.services.payment_files import LEDGER_SUFFIXES, PaymentRow, read_payment_rows
 
 logger = logging.getLogger(__name__)
 
@@ -16,39 +18,67 @@ _SAMPLE_FILE = _DATA_DIR / "sample_payments.json"
 _STRIPE_SEED_FILE = _DATA_DIR / "stripe_payments.json"
 
 
+def _rows_to_payments(rows: Iterable[PaymentRow], validate: bool = True, seed: Optional[int] = None) -> List[Payment]:
+    """Build Payment models from file rows, newest first.
+
+    ``validate=False`` skips Pydantic validation for typed sources (the binary
+    ledger, the synthetic generator) whose fields are already well-formed.
+    With ``seed`` the ids are drawn from a seeded RNG in row order, so the same
+    seeded rows always get the same ids; otherwise they are random.
+    """
+    build = Payment if validate else Payment.model_construct
+    if seed is None:
+        new_id = uuid4
+    else:
+        rng = random.Random(f"payment-ids-{seed}")  # its own stream, independent of the generator's
+
+        def new_id() -> UUID:
+            return UUID(int=rng.getrandbits(128), version=4)
+
+    out = [
+        build(
+            id=new_id(),
+            amount_cents=r.amount_cents,
+            currency=r.currency,
+            direction=r.direction,
+            counterparty=r.counterparty,
+            description=r.description,
+            status=PaymentStatus(r.status),
+            created_at=r.created_at,
+            updated_at=None,
+            external_id=r.external_id,
+        )
+        for r in rows
+    ]
+    out.sort(key=lambda p: p.created_at, reverse=True)
+    return out
+
+
 def _load_json_payments(filepath: Path) -> List[Payment]:
     """Load payments from a JSON file. Returns empty list if file not found."""
     if not filepath.exists():
         logger.warning("Data file not found: %s", filepath)
         return []
-    raw = json.loads(filepath.read_text())
-    out = []
-    for r in raw:
-        created = datetime.fromisoformat(r["created_at"].replace("Z", "+00:00"))
-        out.append(
-            Payment(
-                id=uuid4(),
-                amount_cents=r["amount_cents"],
-                currency=r.get("currency", "USD"),
-                direction=r["direction"],
-                counterparty=r.get("counterparty"),
-                description=r.get("description"),
-                status=PaymentStatus(r.get("status", "completed")),
-                created_at=created,
-                updated_at=None,
-                external_id=r.get("external_id"),
-            )
-        )
-    out.sort(key=lambda p: p.created_at, reverse=True)
-    return out
+    return _rows_to_payments(read_payment_rows(filepath))
+
+
+def _load_file_payments(filepath: Path) -> List[Payment]:
+    """Load payments from a JSON, NDJSON or binary ledger file, chosen by suffix."""
+    if not filepath.is_file():
+        logger.warning("Data file not found: %s", filepath)
+        return []
+    typed = filepath.suffix.lower() in LEDGER_SUFFIXES
+    return _rows_to_payments(read_payment_rows(filepath), validate=not typed)
 
 
+@timed_function("load_payments_from_datasource")
 def load_payments_from_datasource() -> List[Payment]:
     """Load payments based on the DATASOURCE setting.
 
     - "sample":      backend/data/sample_payments.json (default)
     - "stripe":      live from stripe-mock via HTTP
     - "stripe_seed": backend/data/stripe_payments.json (generated by seed script)
+    - "file":        PAYMENTS_FILE (.json, .ndjson or .ledger, e.g. from scripts.generate_data)
     """
     from app.config import settings
 
@@ -71,5 +101,35 @@ def load_payments_from_datasource() -> List[Payment]:
         logger.warning("Stripe seed file not found, falling back to sample")
         return _load_json_payments(_SAMPLE_FILE)
 
+    if ds == "file":
+        payments = _load_file_payments(Path(settings.payments_file))
+        if payments:
+            logger.info("Loaded %d payments from %s", len(payments), settings.payments_file)
+            return payments
+        logger.warning("Payments file %r empty or missing, falling back to sample", settings.payments_file)
+        return _load_json_payments(_SAMPLE_FILE)
+
     # Default: sample
     return _load_json_payments(_SAMPLE_FILE)
+
+
+async def load_payments_from_datasource_async() -> List[Payment]:
+    """:func:`load_payments_from_datasource` without blocking the event loop.
+
+    The stripe datasource fetches over async HTTP. The file-based ones read
+    and parse on the CPU executor.
+    """
+    from app.config import settings
+
+    if settings.datasource.lower() != "stripe":
+        return await run_cpu(load_payments_from_datasource)
+
+    from app.services.stripe_datasource import load_payments_from_stripe_mock_async
+
+    with timed("load_payments_from_datasource"):
+        payments = await load_payments_from_stripe_mock_async()
+        if payments:
+            logger.info("Loaded %d payments from stripe-mock", len(payments))
+            return payments
+        logger.warning("stripe-mock returned no data, falling back to sample")
+        return await run_cpu(_load_json_payments, _SAMPLE_FILE)
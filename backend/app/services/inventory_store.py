@@ -1,32 +1,231 @@
-"""In-memory inventory store for pickleball clothing and equipment."""
-from typing import List, Optional, Tuple
+"""In-memory inventory store for pickleball clothing and equipment.
+
+When ``INVENTORY_DATA_DIR`` is set, stock changes are made durable through a
+write-ahead log with periodic snapshots (see ``inventory_wal``) and recovered
+on startup; otherwise the store starts from seed data on every boot.
+"""
+import atexit
+import threading
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from uuid import UUID, uuid4
 
+from app.concurrency import run_cpu
+from app.config import settings
 from app.models.inventory import InventoryItem
+from app.services import sales_ledger
+from app.services.inventory_wal import WALError, WriteAheadLog
+from app.services.low_stock_alerts import broadcaster
+
+
+class InsufficientStockError(Exception):
+    """Raised when an order asks for more units of an item than are in stock."""
+
+    def __init__(self, message: str, status_code: int = 409):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(message)
+
+
+class _ItemRecord:
+    """Compact mutable inventory row; converted to ``InventoryItem`` only at the API boundary.
+
+    Sales decrement ``quantity`` in place under ``lock`` instead of rebuilding
+    a validated Pydantic model per sale.
+    """
+
+    __slots__ = (
+        "id", "name", "category", "sku", "quantity", "low_stock_threshold", "unit_price_cents",
+        "lock", "json_parts",
+    )
+
+    def __init__(
+        self,
+        id: UUID,
+        name: str,
+        category: str,
+        sku: Optional[str],
+        quantity: int,
+        low_stock_threshold: int = 10,
+        unit_price_cents: int = 0,
+    ):
+        self.id = id
+        self.name = name
+        self.category = category
+        self.sku = sku
+        self.quantity = quantity
+        self.low_stock_threshold = low_stock_threshold
+        self.unit_price_cents = unit_price_cents
+        self.lock = threading.Lock()
+        self.json_parts = None  # encoded JSON around ``quantity``, filled by app.serialization
+
+    @classmethod
+    def from_model(cls, item: InventoryItem) -> "_ItemRecord":
+        return cls(
+            item.id, item.name, item.category, item.sku, item.quantity,
+            item.low_stock_threshold, item.unit_price_cents,
+        )
+
+    def to_row(self) -> list:
+        return [
+            str(self.id), self.name, self.category, self.sku, self.quantity,
+            self.low_stock_threshold, self.unit_price_cents,
+        ]
+
+    @classmethod
+    def from_row(cls, row: list) -> "_ItemRecord":
+        # Snapshots written before prices existed have six fields; the price defaults to 0.
+        return cls(UUID(row[0]), *row[1:])
+
+    def to_model(self, quantity: Optional[int] = None) -> InventoryItem:
+        # Fields were validated on the way in, so skip re-validation here.
+        return InventoryItem.model_construct(
+            id=self.id,
+            name=self.name,
+            category=self.category,
+            sku=self.sku,
+            quantity=self.quantity if quantity is None else quantity,
+            low_stock_threshold=self.low_stock_threshold,
+            unit_price_cents=self.unit_price_cents,
+        )
+
 
 # Seed data: pickleball clothing and equipment
-_INVENTORY: List[InventoryItem] = []
+_INVENTORY: List[_ItemRecord] = []
+
+# Constant-time lookup indexes, rebuilt and swapped in by _load_records().
+_BY_ID: Dict[UUID, _ItemRecord] = {}
+_BY_SKU: Dict[str, _ItemRecord] = {}
+
+# Items currently at or below their threshold, kept up to date on every sale
+# so low-stock queries never rescan the catalog. Insertion-ordered by id.
+_LOW_STOCK: Dict[UUID, _ItemRecord] = {}
+_LOW_STOCK_LOCK = threading.Lock()
+
+_SEED_LOCK = threading.Lock()
+
+# Durable log of stock changes; None when running purely in memory.
+_WAL: Optional[WriteAheadLog] = None
 
 
 def _seed() -> None:
-    global _INVENTORY
     if _INVENTORY:
         return
-    _INVENTORY.extend([
-        InventoryItem(id=uuid4(), name="Performance Shirt - Blue", category="Shirts", sku="PB-SHIRT-BLUE", quantity=25, low_stock_threshold=10),
-        InventoryItem(id=uuid4(), name="Performance Shirt - White", category="Shirts", sku="PB-SHIRT-WHT", quantity=18, low_stock_threshold=10),
-        InventoryItem(id=uuid4(), name="Performance Shirt - Black", category="Shirts", sku="PB-SHIRT-BLK", quantity=12, low_stock_threshold=10),
-        InventoryItem(id=uuid4(), name="Performance Shorts - Navy", category="Shorts", sku="PB-SHORT-NVY", quantity=15, low_stock_threshold=10),
-        InventoryItem(id=uuid4(), name="Performance Shorts - White", category="Shorts", sku="PB-SHORT-WHT", quantity=8, low_stock_threshold=10),
-        InventoryItem(id=uuid4(), name="Pickleball Skirt - Black", category="Skirts", sku="PB-SKIRT-BLK", quantity=11, low_stock_threshold=10),
-        InventoryItem(id=uuid4(), name="Pickleball Skirt - Teal", category="Skirts", sku="PB-SKIRT-TL", quantity=6, low_stock_threshold=10),
-        InventoryItem(id=uuid4(), name="Paddle - Graphite Pro", category="Equipment", sku="PB-PAD-GPRO", quantity=14, low_stock_threshold=10),
-        InventoryItem(id=uuid4(), name="Paddle - Beginner", category="Equipment", sku="PB-PAD-BEG", quantity=22, low_stock_threshold=10),
-        InventoryItem(id=uuid4(), name="Paddle - Tournament", category="Equipment", sku="PB-PAD-TRN", quantity=9, low_stock_threshold=10),
-        InventoryItem(id=uuid4(), name="Hat - Pickleball Logo", category="Accessories", sku="PB-HAT-LOGO", quantity=30, low_stock_threshold=10),
-        InventoryItem(id=uuid4(), name="Visor - Performance", category="Accessories", sku="PB-VISOR-PERF", quantity=19, low_stock_threshold=10),
-        InventoryItem(id=uuid4(), name="Dress - Athletic", category="Dresses", sku="PB-DRESS-ATH", quantity=7, low_stock_threshold=10),
-    ])
+    with _SEED_LOCK:
+        if _INVENTORY:
+            return
+        if settings.inventory_data_dir:
+            _open_durable(Path(settings.inventory_data_dir))
+        else:
+            _load_records(_seed_records())
+
+
+def _open_durable(directory: Path) -> None:
+    """Recover inventory from the snapshot and log in ``directory`` and start logging."""
+    global _WAL
+    wal = WriteAheadLog(
+        directory,
+        flush_interval=settings.inventory_wal_flush_ms / 1000,
+        snapshot_every=settings.inventory_snapshot_every,
+    )
+    rows, quantities, sales = wal.recover()
+    first_boot = rows is None
+    records = _seed_records() if first_boot else [_ItemRecord.from_row(row) for row in rows]
+    for record in records:
+        quantity = quantities.get(str(record.id))
+        if quantity is not None:
+            record.quantity = quantity
+    sales_ledger.restore(sales)
+    # Logging is running before the records become visible, so no sale can
+    # reach them while _WAL is still unset.
+    wal.start([record.to_row() for record in records], persist=first_boot)
+    atexit.register(wal.close)
+    _WAL = wal
+    _load_records(records)
+
+
+def _seed_records() -> List[_ItemRecord]:
+    return [
+        _ItemRecord(uuid4(), "Performance Shirt - Blue", "Shirts", "PB-SHIRT-BLUE", 25, 10, 3499),
+        _ItemRecord(uuid4(), "Performance Shirt - White", "Shirts", "PB-SHIRT-WHT", 18, 10, 3499),
+        _ItemRecord(uuid4(), "Performance Shirt - Black", "Shirts", "PB-SHIRT-BLK", 12, 10, 3499),
+        _ItemRecord(uuid4(), "Performance Shorts - Navy", "Shorts", "PB-SHORT-NVY", 15, 10, 3999),
+        _ItemRecord(uuid4(), "Performance Shorts - White", "Shorts", "PB-SHORT-WHT", 8, 10, 3999),
+        _ItemRecord(uuid4(), "Pickleball Skirt - Black", "Skirts", "PB-SKIRT-BLK", 11, 10, 4499),
+        _ItemRecord(uuid4(), "Pickleball Skirt - Teal", "Skirts", "PB-SKIRT-TL", 6, 10, 4499),
+        _ItemRecord(uuid4(), "Paddle - Graphite Pro", "Equipment", "PB-PAD-GPRO", 14, 10, 14999),
+        _ItemRecord(uuid4(), "Paddle - Beginner", "Equipment", "PB-PAD-BEG", 22, 10, 4999),
+        _ItemRecord(uuid4(), "Paddle - Tournament", "Equipment", "PB-PAD-TRN", 9, 10, 19999),
+        _ItemRecord(uuid4(), "Hat - Pickleball Logo", "Accessories", "PB-HAT-LOGO", 30, 10, 2499),
+        _ItemRecord(uuid4(), "Visor - Performance", "Accessories", "PB-VISOR-PERF", 19, 10, 2299),
+        _ItemRecord(uuid4(), "Dress - Athletic", "Dresses", "PB-DRESS-ATH", 7, 10, 6999),
+    ]
+
+
+def _load(items: List[InventoryItem]) -> None:
+    """Replace the store contents with ``items`` and rebuild the indexes."""
+    _load_records([_ItemRecord.from_model(item) for item in items])
+
+
+def _load_records(records: List[_ItemRecord]) -> None:
+    # Build fresh indexes and swap them in, so concurrent lookups see either
+    # the old contents or the new ones and never an emptied index mid-reload.
+    global _INVENTORY, _BY_ID, _BY_SKU, _LOW_STOCK
+    by_id = {record.id: record for record in records}
+    by_sku = {record.sku: record for record in records if record.sku}
+    low_stock = {record.id: record for record in records if record.quantity <= record.low_stock_threshold}
+    with _LOW_STOCK_LOCK:
+        _BY_ID, _BY_SKU, _LOW_STOCK = by_id, by_sku, low_stock
+    _INVENTORY = list(records)  # last: a non-empty _INVENTORY marks the store as loaded
+
+
+def _sale_rows(sold: Iterable[Tuple[_ItemRecord, int]], at: datetime) -> List[list]:
+    """Log rows for the ``(record, units)`` lines that took stock."""
+    day = at.date().isoformat()
+    return [
+        [day, str(record.id), units, units * record.unit_price_cents]
+        for record, units in sold
+        if units > 0
+    ]
+
+
+def _restore(taken: Sequence[Tuple[_ItemRecord, int]]) -> None:
+    """Give back the units of a sale whose log record never became durable.
+
+    Every later sale failed before changing stock, so adding the units back
+    (rather than resetting the old quantity) is exact.
+    """
+    with ExitStack() as stack:
+        for record, _ in taken:
+            stack.enter_context(record.lock)
+        for record, units in taken:
+            record.quantity += units
+
+
+def _record_in_ledger(record: _ItemRecord, units: int, at: datetime) -> None:
+    if units > 0:
+        sales_ledger.record_sale(record.id, units, record.unit_price_cents, at)
+
+
+def _after_sale(record: _ItemRecord, previous: int, quantity: int) -> Optional[dict]:
+    """Update the low-stock index after a sale and publish/return the alert, if any."""
+    if quantity > record.low_stock_threshold:
+        return None
+    crossed = previous > record.low_stock_threshold
+    if crossed:
+        with _LOW_STOCK_LOCK:
+            _LOW_STOCK[record.id] = record
+    alert = {"item_name": record.name, "quantity": quantity}
+    broadcaster.publish({
+        **alert,
+        "item_id": str(record.id),
+        "sku": record.sku,
+        "low_stock_threshold": record.low_stock_threshold,
+        "crossed_threshold": crossed,
+    })
+    return alert
 
 
 def get_inventory_store() -> "_InventoryStore":
@@ -34,41 +233,128 @@ def get_inventory_store() -> "_InventoryStore":
     return _InventoryStore()
 
 
-def _get_items() -> List[InventoryItem]:
+async def get_inventory_store_async() -> "_InventoryStore":
+    """:func:`get_inventory_store` for async callers: a first load (log recovery) runs on the CPU executor."""
+    if not _INVENTORY:
+        await run_cpu(_seed)
+    return _InventoryStore()
+
+
+def _get_items() -> List[_ItemRecord]:
     _seed()
     return _INVENTORY
 
 
 class _InventoryStore:
-    def list(self, category: Optional[str] = None) -> List[InventoryItem]:
-        items = list(_get_items())
+    def list(self, category: Optional[str] = None) -> Sequence[_ItemRecord]:
+        """Return item records. The result is the live, read-only store sequence when unfiltered."""
+        items = _get_items()
         if category:
-            items = [i for i in items if i.category.lower() == category.lower()]
+            category = category.lower()
+            return [i for i in items if i.category.lower() == category]
         return items
 
-    def get(self, item_id: UUID) -> Optional[InventoryItem]:
-        for item in _get_items():
-            if item.id == item_id:
-                return item
-        return None
+    def low_stock(self) -> List[_ItemRecord]:
+        """Items at or below their low-stock threshold, served from the maintained index."""
+        _seed()
+        with _LOW_STOCK_LOCK:
+            return list(_LOW_STOCK.values())
 
-    def record_sale(self, item_id: UUID, quantity_sold: int) -> Tuple[InventoryItem, Optional[dict]]:
-        """Reduce inventory and return (updated_item, low_stock_alert or None)."""
-        items = _get_items()
-        for i, item in enumerate(items):
-            if item.id == item_id:
-                new_qty = max(0, item.quantity - quantity_sold)
-                updated = InventoryItem(
-                    id=item.id,
-                    name=item.name,
-                    category=item.category,
-                    sku=item.sku,
-                    quantity=new_qty,
-                    low_stock_threshold=item.low_stock_threshold,
-                )
-                items[i] = updated
-                alert = None
-                if new_qty <= item.low_stock_threshold:
-                    alert = {"item_name": item.name, "quantity": new_qty}
-                return updated, alert
-        raise ValueError(f"Item {item_id} not found")
+    def get(self, item_id: UUID) -> Optional[_ItemRecord]:
+        return _BY_ID.get(item_id)
+
+    def get_by_sku(self, sku: str) -> Optional[_ItemRecord]:
+        return _BY_SKU.get(sku)
+
+    def record_sale(self, item_id: UUID, quantity_sold: int) -> Tuple[_ItemRecord, int, Optional[dict]]:
+        """Reduce inventory and return (item, new_quantity, low_stock_alert or None).
+
+        The decrement happens in place under the item's own lock, so concurrent
+        sales of the same SKU never lose a decrement. The units actually taken
+        from stock are appended to the sales ledger, and logged with the stock
+        change when the store is durable; if that log fails, ``WALError`` is
+        raised and the stock is left as it was.
+        """
+        record = _BY_ID.get(item_id)
+        if record is None:
+            raise ValueError(f"Item {item_id} not found")
+        lsn = None
+        with record.lock:
+            previous = record.quantity
+            new_qty = max(0, previous - quantity_sold)
+            at = datetime.now(timezone.utc)
+            if _WAL is not None:
+                lsn = _WAL.append([(str(record.id), new_qty)], _sale_rows([(record, previous - new_qty)], at))
+            record.quantity = new_qty
+        if lsn is not None:
+            try:
+                _WAL.wait(lsn)
+            except WALError:
+                _restore([(record, previous - new_qty)])
+                raise
+        _record_in_ledger(record, previous - new_qty, at)
+        return record, new_qty, _after_sale(record, previous, new_qty)
+
+    def record_sales(
+        self, lines: Sequence[Tuple[UUID, int]],
+    ) -> Tuple[List[Tuple[_ItemRecord, int]], List[dict]]:
+        """Apply a multi-line sale all-or-nothing.
+
+        Every item is resolved before anything changes, so an unknown item
+        rejects the whole order; so does a line asking for more units than
+        remain after the order's earlier lines (``InsufficientStockError``).
+        The affected items' locks are taken in a fixed order (sorted by id)
+        and held while all lines are applied, so no other sale of those items interleaves with the order and two
+        overlapping orders cannot deadlock. Readers take no locks and may see
+        some lines applied before the rest; the log records the order as one
+        all-or-nothing record, and stock changes only once it is buffered.
+        Each line is ``(item_id, quantity)``.
+        Returns (item, quantity after the line) for each line plus one
+        low-stock alert per distinct item left at or below its threshold.
+        Raises ``WALError``, with stock left as it was, if the order cannot be logged.
+        """
+        missing = [str(item_id) for item_id, _ in lines if item_id not in _BY_ID]
+        if missing:
+            raise ValueError(f"Items not found: {', '.join(missing)}")
+
+        touched = [_BY_ID[item_id] for item_id in sorted({item_id for item_id, _ in lines})]
+        after_line: List[Tuple[_ItemRecord, int]] = []
+        taken: List[int] = []
+        with ExitStack() as stack:
+            for record in touched:
+                stack.enter_context(record.lock)
+            # Worked out on the side and applied only once the record is logged.
+            remaining = {record.id: record.quantity for record in touched}
+            short = []
+            for item_id, quantity_sold in lines:
+                record = _BY_ID[item_id]
+                if quantity_sold > remaining[item_id]:
+                    short.append(f"{item_id} (requested {quantity_sold}, available {remaining[item_id]})")
+                remaining[item_id] -= quantity_sold
+                after_line.append((record, remaining[item_id]))
+                taken.append(quantity_sold)
+            if short:
+                raise InsufficientStockError(f"Insufficient stock: {', '.join(short)}")
+            final = [(record, record.quantity, remaining[record.id]) for record in touched]
+            at = datetime.now(timezone.utc)
+            sold = [(record, units) for (record, _), units in zip(after_line, taken)]
+            lsn = None
+            if _WAL is not None:
+                lsn = _WAL.append([(str(record.id), qty) for record, _, qty in final], _sale_rows(sold, at))
+            for record, _, qty in final:
+                record.quantity = qty
+        if lsn is not None:
+            try:
+                _WAL.wait(lsn)
+            except WALError:
+                _restore([(record, previous - qty) for record, previous, qty in final])
+                raise
+
+        for record, units in sold:
+            _record_in_ledger(record, units, at)
+        alerts = []
+        for record, previous, qty in final:
+            alert = _after_sale(record, previous, qty)
+            if alert is not None:
+                alerts.append(alert)
+        return after_line, alerts
@@ -0,0 +1,314 @@
+"""Write-ahead log and snapshots that make inventory stock counts and sales survive restarts."""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# snapshot.json: {"lsn", "items": [SnapshotRow], "sales": [SaleRow]};
+# wal-<first_lsn>.log: one {"lsn", "set": [[id, quantity]], "sales": [SaleRow]} record per line.
+_SNAPSHOT_FILE = "snapshot.json"
+_SEGMENT_PREFIX = "wal-"
+_SEGMENT_SUFFIX = ".log"
+
+SnapshotRow = list  # [id, name, category, sku, quantity, low_stock_threshold, unit_price_cents]
+SaleRow = list  # [day (ISO date), id, units, revenue_cents]
+
+
+class WALError(Exception):
+    """Raised when a stock change cannot be made durable: the log failed or was closed."""
+
+    def __init__(self, message: str, status_code: int = 503):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(message)
+
+
+class WriteAheadLog:
+    def __init__(
+        self,
+        directory: Path,
+        flush_interval: float = 0.005,
+        snapshot_every: int = 10_000,
+    ):
+        self._dir = Path(directory)
+        self._flush_interval = flush_interval
+        self._snapshot_every = snapshot_every
+
+        self._cond = threading.Condition()
+        self._buffer: List[str] = []
+        self._buffer_records: List[Tuple[Sequence[Tuple[str, int]], Sequence[SaleRow]]] = []  # parallel to _buffer
+        self._next_lsn = 1
+        self._durable_lsn = 0
+        self._since_snapshot = 0
+        # Item rows and their quantities as of _durable_lsn, which is what a snapshot
+        # at that LSN must contain; live quantities may include unfsynced sales.
+        self._rows: List[SnapshotRow] = []
+        self._quantities: Dict[str, int] = {}
+        # Sales fsynced since the last rotation, and the totals the snapshot
+        # thread folds them into (as of the last snapshot; only it touches _daily).
+        self._unsnapshotted_sales: List[SaleRow] = []
+        self._daily: Dict[Tuple[str, str], List[int]] = {}
+        self._segment = None
+        self._segment_name = ""
+        self._closed = False
+        self._failure: Optional[BaseException] = None  # set when a write or fsync fails; the log stops
+        self._flusher: Optional[threading.Thread] = None
+        self._snapshotter: Optional[threading.Thread] = None
+
+    # ── Recovery ──
+
+    def recover(self) -> Tuple[Optional[List[SnapshotRow]], dict, List[SaleRow]]:
+        """Read the last snapshot and replay newer log records.
+
+        Returns ``(snapshot_rows or None, {item_id: quantity}, sales)`` where
+        the dict holds the latest logged quantity of every item changed since
+        the snapshot and ``sales`` is the per-day, per-item total of every
+        durable sale. Must be called once, before ``start()``.
+        """
+        self._dir.mkdir(parents=True, exist_ok=True)
+        rows = None
+        snapshot_lsn = 0
+        snapshot_path = self._dir / _SNAPSHOT_FILE
+        if snapshot_path.exists():
+            snapshot = json.loads(snapshot_path.read_text())
+            rows = snapshot["items"]
+            snapshot_lsn = snapshot["lsn"]
+            _fold_sales(self._daily, snapshot.get("sales", ()))
+
+        quantities: dict = {}
+        last_lsn = snapshot_lsn
+        for segment in self._segments():
+            for record in self._read_segment(segment):
+                lsn = record["lsn"]
+                if lsn <= snapshot_lsn:
+                    continue
+                for item_id, quantity in record["set"]:
+                    quantities[item_id] = quantity
+                _fold_sales(self._daily, record.get("sales", ()))
+                last_lsn = max(last_lsn, lsn)
+
+        self._next_lsn = last_lsn + 1
+        self._durable_lsn = last_lsn
+        sales = _sales_rows(self._daily)
+        logger.info(
+            "Inventory WAL recovered: snapshot lsn %d, replayed up to lsn %d (%d items changed, %d daily sales totals)",
+            snapshot_lsn, last_lsn, len(quantities), len(sales),
+        )
+        return rows, quantities, sales
+
+    def start(self, rows: List[SnapshotRow], persist: bool = False) -> None:
+        """Open a fresh log segment and start the group-commit thread.
+
+        ``rows`` is the recovered inventory. With ``persist`` it is written
+        synchronously as the first snapshot, which is needed the first time
+        so item ids are stable across restarts.
+        """
+        self._rows = [list(row) for row in rows]
+        self._quantities = {row[0]: row[4] for row in rows}
+        if persist:
+            write_snapshot(self._dir, self._rows, self._durable_lsn)
+        self._open_segment(self._next_lsn)
+        self._flusher = threading.Thread(target=self._flush_loop, name="inventory-wal", daemon=True)
+        self._flusher.start()
+
+    # ── Writes ──
+
+    def append(self, changes: Sequence[Tuple[str, int]], sales: Sequence[SaleRow] = ()) -> int:
+        """Buffer a record of ``(item_id, new_quantity)`` pairs, plus the sales behind it, and return its LSN.
+
+        Call while holding the affected items' locks, before mutating them,
+        so log order matches the order in which each item was mutated; then
+        call ``wait()`` after releasing them. Raises ``WALError`` without
+        buffering anything once the log has failed or been closed.
+        """
+        with self._cond:
+            self._check()
+            lsn = self._next_lsn
+            self._next_lsn += 1
+            record = {"lsn": lsn, "set": changes, "sales": sales} if sales else {"lsn": lsn, "set": changes}
+            self._buffer.append(json.dumps(record, separators=(",", ":")))
+            self._buffer_records.append((changes, sales))
+            self._cond.notify_all()
+        return lsn
+
+    def wait(self, lsn: int) -> None:
+        """Block until the record with ``lsn`` has been fsynced.
+
+        Raises ``WALError`` if the log was closed or failed first, so the
+        caller gets an error instead of waiting forever.
+        """
+        with self._cond:
+            while self._durable_lsn < lsn:
+                self._check()
+                self._cond.wait()
+
+    def _check(self) -> None:
+        # Under _cond.
+        if self._failure is not None:
+            raise WALError(f"Inventory write-ahead log failed: {self._failure}") from self._failure
+        if self._closed:
+            raise WALError("Inventory write-ahead log is closed")
+
+    def close(self) -> None:
+        """Flush pending records and stop the background threads."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    # ── Internals ──
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if not self._buffer and self._closed:
+                    return
+            # Let concurrent writers pile in so one fsync covers all of them.
+            if self._flush_interval and not self._closed:
+                time.sleep(self._flush_interval)
+            with self._cond:
+                batch = self._buffer
+                self._buffer = []
+                records = self._buffer_records
+                self._buffer_records = []
+                batch_last_lsn = self._next_lsn - 1
+            try:
+                self._segment.write("\n".join(batch) + "\n")
+                self._segment.flush()
+                os.fsync(self._segment.fileno())
+            except OSError as e:
+                # ENOSPC, EIO, ...: nothing after this batch can be made durable.
+                # Fail every waiter, current and future, rather than leave them blocked.
+                logger.exception("Inventory WAL write failed; stock changes are no longer logged")
+                with self._cond:
+                    self._failure = e
+                    self._cond.notify_all()
+                return
+            for changes, sales in records:
+                for item_id, quantity in changes:
+                    self._quantities[item_id] = quantity
+                self._unsnapshotted_sales.extend(sales)
+            with self._cond:
+                self._durable_lsn = batch_last_lsn
+                self._since_snapshot += len(batch)
+                self._cond.notify_all()
+            if self._since_snapshot >= self._snapshot_every and not self._snapshot_running():
+                self._rotate_and_snapshot(batch_last_lsn)
+
+    def _snapshot_running(self) -> bool:
+        return self._snapshotter is not None and self._snapshotter.is_alive()
+
+    def _rotate_and_snapshot(self, lsn: int) -> None:
+        # Records up to ``lsn`` are durable in the current segment; newer ones
+        # go to a new segment so the old ones can be dropped once the snapshot lands.
+        self._segment.close()
+        self._open_segment(lsn + 1)
+        self._since_snapshot = 0
+        # Copied here, on the flusher thread, so it holds exactly the records up to ``lsn``.
+        quantities = dict(self._quantities)
+        sales, self._unsnapshotted_sales = self._unsnapshotted_sales, []
+        self._snapshotter = threading.Thread(
+            target=self._write_snapshot, args=(lsn, quantities, sales), name="inventory-snapshot", daemon=True,
+        )
+        self._snapshotter.start()
+
+    def _write_snapshot(self, lsn: int, quantities: Dict[str, int], sales: List[SaleRow]) -> None:
+        started = time.perf_counter()
+        rows = [row[:4] + [quantities[row[0]]] + row[5:] for row in self._rows]
+        _fold_sales(self._daily, sales)
+        write_snapshot(self._dir, rows, lsn, _sales_rows(self._daily))
+        for segment in self._segments():
+            if self._segment_first_lsn(segment) <= lsn and segment.name != self._segment_name:
+                segment.unlink()
+        logger.info(
+            "Inventory snapshot at lsn %d: %d items in %.1fms",
+            lsn, len(rows), (time.perf_counter() - started) * 1000,
+        )
+
+    def _open_segment(self, first_lsn: int) -> None:
+        self._segment_name = f"{_SEGMENT_PREFIX}{first_lsn:020d}{_SEGMENT_SUFFIX}"
+        self._segment = open(self._dir / self._segment_name, "a", encoding="utf-8")
+        self._fsync_dir()
+
+    def _segments(self) -> List[Path]:
+        return sorted(self._dir.glob(f"{_SEGMENT_PREFIX}*{_SEGMENT_SUFFIX}"))
+
+    @staticmethod
+    def _segment_first_lsn(segment: Path) -> int:
+        return int(segment.name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+
+    @staticmethod
+    def _read_segment(segment: Path):
+        with open(segment, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn write at the tail from a crash mid-flush; it was never acknowledged.
+                    logger.warning("Ignoring partial record at end of %s", segment.name)
+                    return
+
+    def _fsync_dir(self) -> None:
+        _fsync_dir(self._dir)
+
+
+def write_snapshot(directory: Path, rows: List[SnapshotRow], lsn: int = 0, sales: Sequence[SaleRow] = ()) -> None:
+    """Atomically write a snapshot of ``rows`` and daily ``sales`` totals at ``lsn`` into ``directory``.
+
+    Also used to pre-populate a data directory (e.g. with generated inventory)
+    before the service first starts.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / (_SNAPSHOT_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"lsn": lsn, "items": rows, "sales": sales}, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, directory / _SNAPSHOT_FILE)
+    _fsync_dir(directory)
+
+
+def clear_log(directory: Path) -> None:
+    """Delete all log segments in ``directory`` (they refer to a replaced snapshot)."""
+    for segment in Path(directory).glob(f"{_SEGMENT_PREFIX}*{_SEGMENT_SUFFIX}"):
+        segment.unlink()
+
+
+def _fold_sales(daily: Dict[Tuple[str, str], List[int]], sales: Iterable[SaleRow]) -> None:
+    for day, item_id, units, revenue in sales:
+        totals = daily.get((day, item_id))
+        if totals is None:
+            daily[(day, item_id)] = [units, revenue]
+        else:
+            totals[0] += units
+            totals[1] += revenue
+
+
+def _sales_rows(daily: Dict[Tuple[str, str], List[int]]) -> List[SaleRow]:
+    return [[day, item_id, units, revenue] for (day, item_id), (units, revenue) in daily.items()]
+
+
+def _fsync_dir(directory: Path) -> None:
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,49 @@
+"""Fan-out of low-stock alerts from the (threaded) inventory store to async stream subscribers."""
+import asyncio
+import logging
+import threading
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Per-subscriber buffer; a client that falls this far behind starts losing alerts.
+_QUEUE_SIZE = 256
+
+
+class _AlertBroadcaster:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a queue on the running event loop that receives every published alert."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = [(loop, q) for loop, q in self._subscribers if q is not queue]
+
+    def publish(self, alert: dict) -> None:
+        """Push ``alert`` to all subscribers. Safe to call from any thread; never blocks."""
+        subscribers = self._subscribers
+        if not subscribers:
+            return
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, alert)
+            except RuntimeError:
+                # Loop already closed; the subscriber is gone.
+                self.unsubscribe(queue)
+
+
+def _offer(queue: asyncio.Queue, alert: dict) -> None:
+    try:
+        queue.put_nowait(alert)
+    except asyncio.QueueFull:
+        logger.warning("Dropping low-stock alert for slow stream subscriber")
+
+
+broadcaster = _AlertBroadcaster()
@@ -0,0 +1,257 @@
+"""Payment file formats: JSON array, NDJSON and a compact columnar binary ledger.
+
+All three carry the same row shape as ``data/sample_payments.json``
+(``amount_cents``, ``currency``, ``direction``, ``counterparty``,
+``description``, ``status``, ``created_at``, ``external_id``). The format is
+picked from the file suffix: ``.json``, ``.ndjson``/``.jsonl`` or ``.ledger``.
+
+Binary ledger layout (little-endian, every section 8-byte aligned so the file
+can be memory-mapped and read column by column without parsing)::
+
+    header (64 bytes): magic b"CFLEDGR1", version u32, reserved u32,
+                       row_count u64, string_count u64, strings_offset u64
+    created_at   i64[row_count]  microseconds since the Unix epoch (UTC)
+    amount_cents i64[row_count]
+    direction    u8[row_count]   index into DIRECTIONS
+    status       u8[row_count]   index into STATUSES
+    currency, counterparty, description, external_id
+                 u32[row_count] each; index into the string table, NO_STRING for null
+    strings      u64[string_count + 1] byte offsets, then the UTF-8 blob
+"""
+import json
+import struct
+from array import array
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from app.models.payment import PaymentStatus
+
+MAGIC = b"CFLEDGR1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQ")
+HEADER_SIZE = 64
+NO_STRING = 0xFFFFFFFF
+
+DIRECTIONS = ("inbound", "outbound")
+STATUSES = tuple(s.value for s in PaymentStatus)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_STRING_COLUMNS = ("currency", "counterparty", "description", "external_id")
+
+JSON_SUFFIXES = (".json",)
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+LEDGER_SUFFIXES = (".ledger",)
+
+
+class PaymentRow(NamedTuple):
+    created_at: datetime
+    amount_cents: int
+    currency: str
+    direction: str
+    counterparty: Optional[str]
+    description: Optional[str]
+    status: str
+    external_id: Optional[str]
+
+    def to_json_dict(self) -> dict:
+        return {
+            "amount_cents": self.amount_cents,
+            "currency": self.currency,
+            "direction": self.direction,
+            "counterparty": self.counterparty,
+            "description": self.description,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "external_id": self.external_id,
+        }
+
+
+def row_from_json_dict(r: dict) -> PaymentRow:
+    return PaymentRow(
+        created_at=datetime.fromisoformat(r["created_at"].replace("Z", "+00:00")),
+        amount_cents=r["amount_cents"],
+        currency=r.get("currency", "USD"),
+        direction=r["direction"],
+        counterparty=r.get("counterparty"),
+        description=r.get("description"),
+        status=r.get("status", "completed"),
+        external_id=r.get("external_id"),
+    )
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def ledger_layout(row_count: int) -> Dict[str, int]:
+    """Byte offset of every column for a ledger with ``row_count`` rows, plus ``strings``."""
+    offsets = {}
+    offset = HEADER_SIZE
+    for name, size in (
+        ("created_at", 8), ("amount_cents", 8), ("direction", 1), ("status", 1),
+        ("currency", 4), ("counterparty", 4), ("description", 4), ("external_id", 4),
+    ):
+        offsets[name] = offset
+        offset = _align(offset + size * row_count)
+    offsets["strings"] = offset
+    return offsets
+
+
+# ── Writers ──
+
+def write_json(path: Path, rows: Iterable[PaymentRow]) -> int:
+    """Write a JSON array, streaming row by row. Returns the row count."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for row in rows:
+            if count:
+                f.write(",\n")
+            f.write("  " + json.dumps(row.to_json_dict()))
+            count += 1
+        f.write("\n]\n")
+    return count
+
+
+def write_ndjson(path: Path, rows: Iterable[PaymentRow]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row.to_json_dict()))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def encode_ledger(rows: Iterable[PaymentRow]) -> bytes:
+    """Encode rows into the binary ledger format."""
+    created = array("q")
+    amounts = array("q")
+    directions = array("B")
+    statuses = array("B")
+    string_cols = {name: array("I") for name in _STRING_COLUMNS}
+    strings: Dict[str, int] = {}
+    direction_index = {d: i for i, d in enumerate(DIRECTIONS)}
+    status_index = {s: i for i, s in enumerate(STATUSES)}
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        idx = strings.get(value)
+        if idx is None:
+            idx = strings[value] = len(strings)
+        return idx
+
+    for row in rows:
+        delta = row.created_at - _EPOCH
+        created.append((delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+        amounts.append(row.amount_cents)
+        directions.append(direction_index[row.direction])
+        statuses.append(status_index[row.status])
+        string_cols["currency"].append(intern(row.currency))
+        string_cols["counterparty"].append(intern(row.counterparty))
+        string_cols["description"].append(intern(row.description))
+        string_cols["external_id"].append(intern(row.external_id))
+
+    count = len(created)
+    layout = ledger_layout(count)
+    blob = bytearray()
+    string_offsets = array("Q", [0])
+    for value in strings:  # dicts keep insertion order == index order
+        blob += value.encode("utf-8")
+        string_offsets.append(len(blob))
+
+    out = bytearray(layout["strings"])
+    HEADER.pack_into(out, 0, MAGIC, VERSION, 0, count, len(strings), layout["strings"])
+    for name, column in (
+        ("created_at", created), ("amount_cents", amounts), ("direction", directions), ("status", statuses),
+        *string_cols.items(),
+    ):
+        data = column.tobytes()
+        out[layout[name]:layout[name] + len(data)] = data
+    out += string_offsets.tobytes()
+    out += blob
+    return bytes(out)
+
+
+def write_ledger(path: Path, rows: Iterable[PaymentRow]) -> int:
+    data = encode_ledger(rows)
+    Path(path).write_bytes(data)
+    return HEADER.unpack_from(data, 0)[3]
+
+
+def write_payments(path: Path, rows: Iterable[PaymentRow]) -> int:
+    """Write rows in the format implied by ``path``'s suffix. Returns the row count."""
+    suffix = Path(path).suffix.lower()
+    if suffix in NDJSON_SUFFIXES:
+        return write_ndjson(path, rows)
+    if suffix in LEDGER_SUFFIXES:
+        return write_ledger(path, rows)
+    return write_json(path, rows)
+
+
+# ── Readers ──
+
+class LedgerColumns:
+    """Zero-copy column views over an encoded ledger (bytes, mmap or shared memory)."""
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        magic, version, _, count, string_count, strings_offset = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a cash flow ledger file (bad magic or version)")
+        layout = ledger_layout(count)
+        self.view = view
+        self.row_count = count
+        self.created_at = view[layout["created_at"]:layout["created_at"] + 8 * count].cast("q")
+        self.amount_cents = view[layout["amount_cents"]:layout["amount_cents"] + 8 * count].cast("q")
+        self.direction = view[layout["direction"]:layout["direction"] + count]
+        self.status = view[layout["status"]:layout["status"] + count]
+        for name in _STRING_COLUMNS:
+            setattr(self, name, view[layout[name]:layout[name] + 4 * count].cast("I"))
+        self._string_offsets = view[strings_offset:strings_offset + 8 * (string_count + 1)].cast("Q")
+        self._blob = view[strings_offset + 8 * (string_count + 1):]
+        self._string_cache: Dict[int, str] = {}
+
+    def string(self, idx: int) -> Optional[str]:
+        if idx == NO_STRING:
+            return None
+        value = self._string_cache.get(idx)
+        if value is None:
+            value = str(self._blob[self._string_offsets[idx]:self._string_offsets[idx + 1]], "utf-8")
+            self._string_cache[idx] = value
+        return value
+
+    def row(self, i: int) -> PaymentRow:
+        return PaymentRow(
+            created_at=_EPOCH + timedelta(microseconds=self.created_at[i]),
+            amount_cents=self.amount_cents[i],
+            currency=self.string(self.currency[i]),
+            direction=DIRECTIONS[self.direction[i]],
+            counterparty=self.string(self.counterparty[i]),
+            description=self.string(self.description[i]),
+            status=STATUSES[self.status[i]],
+            external_id=self.string(self.external_id[i]),
+        )
+
+    def rows(self) -> Iterator[PaymentRow]:
+        for i in range(self.row_count):
+            yield self.row(i)
+
+    def release(self) -> None:
+        """Drop the column views so the underlying buffer (e.g. an mmap) can be closed."""
+        for name in ("created_at", "amount_cents", "direction", "status", "_string_offsets", "_blob", *_STRING_COLUMNS):
+            getattr(self, name).release()
+        self.view.release()
+
+
+def read_payment_rows(path: Path) -> List[PaymentRow]:
+    """Read every row from a JSON, NDJSON or binary ledger file."""
+    suffix = Path(path).suffix.lower()
+    if suffix in LEDGER_SUFFIXES:
+        return list(LedgerColumns(Path(path).read_bytes()).rows())
+    if suffix in NDJSON_SUFFIXES:
+        with open(path, encoding="utf-8") as f:
+            return [row_from_json_dict(json.loads(line)) for line in f if line.strip()]
+    return [row_from_json_dict(r) for r in json.loads(Path(path).read_text())]
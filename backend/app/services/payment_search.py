@@ -0,0 +1,201 @@
+"""Inverted index for searching payments by counterparty, description and external id."""
+import bisect
+import heapq
+import re
+import threading
+from array import array
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from app.models.payment import Payment, PaymentStatus
+from app.services.payment_store import ledger
+
+_TERM = re.compile(r"[a-z0-9]+(?:[_-][a-z0-9]+)*")
+_DIRECTIONS = {"inbound": 0, "outbound": 1}
+_OTHER_DIRECTION = 2
+_STATUSES = {s: i for i, s in enumerate(PaymentStatus)}
+_MIN_INFIX = 3
+
+# A posting is a bare position until a second document shares the term.
+Posting = Union[int, array]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TERM.findall(text.lower()) if text else []
+
+
+def _trigrams(term: str) -> Set[str]:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def _infix_term(term: str) -> bool:
+    return len(term) >= _MIN_INFIX and term.isalpha()
+
+
+def _matches(terms: Iterable[str], infix_terms: Iterable[str], query_term: str) -> bool:
+    if any(t.startswith(query_term) for t in terms):
+        return True
+    return len(query_term) >= _MIN_INFIX and any(query_term in t for t in infix_terms)
+
+
+class PaymentSearchIndex:
+    def __init__(self, version: int, payments: Sequence[Payment]):
+        self.version = version
+        # The ledger the positions refer to; searches resolve hits against it, never a newer one.
+        self.payments = payments
+        self.size = 0
+        self._postings: Dict[str, Posting] = {}
+        self._vocabulary: List[str] = []
+        self._trigrams: Dict[str, Set[str]] = {}
+        # Per position: direction and status codes, so filters skip non-matching rows cheaply.
+        self._directions = bytearray()
+        self._statuses = bytearray()
+        # Text fields repeat heavily (counterparties, descriptions); tokenize each once.
+        self._token_cache: Dict[str, Tuple[str, ...]] = {}
+
+    def _text_terms(self, text: Optional[str]) -> Tuple[str, ...]:
+        if not text:
+            return ()
+        terms = self._token_cache.get(text)
+        if terms is None:
+            terms = self._token_cache[text] = tuple(dict.fromkeys(tokenize(text)))
+        return terms
+
+    def add(self, payments: Iterable[Payment]) -> None:
+        """Index ``payments`` as the next positions after those already indexed."""
+        postings = self._postings
+        new_terms = []
+        position = self.size
+        directions, statuses = self._directions, self._statuses
+        for p in payments:
+            terms = set(self._text_terms(p.counterparty))
+            terms.update(self._text_terms(p.description))
+            terms.update(tokenize(p.external_id))
+            directions.append(_DIRECTIONS.get(p.direction, _OTHER_DIRECTION))
+            statuses.append(_STATUSES[PaymentStatus(p.status)])
+            for term in terms:
+                current = postings.get(term)
+                if current is None:
+                    postings[term] = position
+                    new_terms.append(term)
+                elif isinstance(current, int):
+                    postings[term] = array("I", (current, position))
+                else:
+                    current.append(position)
+            position += 1
+        self.size = position
+        if new_terms:
+            # Both inputs are sorted runs, which timsort merges in linear time.
+            new_terms.sort()
+            self._vocabulary = sorted(self._vocabulary + new_terms)
+            for term in new_terms:
+                if _infix_term(term):
+                    for gram in _trigrams(term):
+                        self._trigrams.setdefault(gram, set()).add(term)
+
+    def _expand(self, query_term: str) -> List[str]:
+        """Indexed terms matched by ``query_term``: prefix matches, plus infix matches for longer terms."""
+        vocabulary = self._vocabulary
+        start = bisect.bisect_left(vocabulary, query_term)
+        end = bisect.bisect_left(vocabulary, query_term + "\uffff", start)
+        matched = set(vocabulary[start:end])
+        if len(query_term) >= _MIN_INFIX:
+            grams = sorted((self._trigrams.get(g, set()) for g in _trigrams(query_term)), key=len)
+            if grams and grams[0]:
+                candidates = set.intersection(*grams)
+                matched.update(t for t in candidates if query_term in t)
+        return list(matched)
+
+    def _postings_for(self, terms: List[str]) -> Tuple[List[Posting], int]:
+        lists = [self._postings[t] for t in terms]
+        return lists, sum(1 if isinstance(p, int) else len(p) for p in lists)
+
+    def positions(self, query_terms: Sequence[str], first: int = 0) -> Tuple[Iterator[int], List[str]]:
+        """Ascending candidate positions from ``first`` for the most selective term, and the terms left to verify."""
+        expanded = []
+        for term in dict.fromkeys(query_terms):
+            lists, size = self._postings_for(self._expand(term))
+            if not size:
+                return iter(()), []
+            expanded.append((size, term, lists))
+        expanded.sort(key=lambda e: e[0])
+        lists = expanded[0][2]
+        # Terms seen once (ids, invoice numbers) merge as one sorted stream rather than one each.
+        singles = sorted(p for p in lists if isinstance(p, int) and p >= first)
+        streams = [
+            memoryview(p)[bisect.bisect_left(p, first):] if first else p
+            for p in lists if not isinstance(p, int)
+        ]
+        if singles:
+            streams.append(singles)
+        return _dedupe(heapq.merge(*streams)), [term for _, term, _ in expanded[1:]]
+
+
+def _dedupe(positions: Iterator[int]) -> Iterator[int]:
+    last = -1
+    for position in positions:
+        if position != last:
+            yield position
+            last = position
+
+
+_INDEX: Optional[PaymentSearchIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_search_index() -> PaymentSearchIndex:
+    """The index for the current ledger, (re)built when the ledger version changes."""
+    global _INDEX
+    version, payments = ledger()
+    index = _INDEX
+    if index is not None and index.version == version:
+        return index
+    with _INDEX_LOCK:
+        version, payments = ledger()
+        if _INDEX is None or _INDEX.version != version:
+            index = PaymentSearchIndex(version, payments)
+            index.add(payments)
+            _INDEX = index
+        return _INDEX
+
+
+def search_payments(
+    q: str,
+    limit: int = 50,
+    direction: Optional[str] = None,
+    status: Optional[PaymentStatus] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> List[Payment]:
+    """Payments matching every term of ``q`` (and the filters), newest first."""
+    query_terms = tokenize(q)
+    if not query_terms:
+        return []
+    index = get_search_index()
+    payments = index.payments
+    # Newest first: positions before ``first`` are all dated after ``end``.
+    first = bisect.bisect_left(payments, True, key=lambda p: p.created_at.date() <= end) if end else 0
+    candidates, remaining = index.positions(query_terms, first)
+
+    want_direction = _DIRECTIONS.get(direction, -1) if direction else None
+    want_status = _STATUSES[status] if status is not None else None
+    directions, statuses = index._directions, index._statuses
+
+    out: List[Payment] = []
+    for position in candidates:
+        if want_direction is not None and directions[position] != want_direction:
+            continue
+        if want_status is not None and statuses[position] != want_status:
+            continue
+        p = payments[position]
+        if start is not None and p.created_at.date() < start:
+            break  # newest first: everything after this is older still
+        if remaining:
+            terms = index._text_terms(p.counterparty) + index._text_terms(p.description) + tuple(tokenize(p.external_id))
+            infix_terms = [t for t in terms if _infix_term(t)]
+            if not all(_matches(terms, infix_terms, term) for term in remaining):
+                continue
+        out.append(p)
+        if len(out) >= limit:
+            break
+    return out
@@ -1,50 +1,89 @@
 """In-memory payment store. Loads from data/sample_payments.json when present, else fallback seed."""
+import asyncio
 import random
-from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+import threading
+from datetime import date, datetime, time, timezone
+from itertools import islice
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
 from uuid import uuid4
 
+from app.concurrency import run_cpu
+from app.config import settings
 from app.models.payment import Payment, PaymentStatus
-from app.services.datasource import load_payments_from_datasource
-
-_SAMPLE_PAYMENTS: List[Payment] = []
-
-# ── Data-generation pools (used by regenerate) ──
-_COUNTERPARTIES_INBOUND = [
-    "Stripe Payout", "Acme Corp", "Beta LLC", "Startup XYZ",
-    "GlobalTech Inc", "Refund Reversal", "Partner Revenue",
-    "Marketplace Settlement", "Subscription Revenue", "Invoice Payment",
-]
-_COUNTERPARTIES_OUTBOUND = [
-    "AWS", "Google Cloud", "Payroll", "Vendor A", "Vendor B",
-    "Tax Reserve", "Stripe Fees", "Domain Registrar", "SaaS Tools",
-    "Marketing Spend", "Office Supplies", "Insurance",
-]
-_DESCRIPTIONS_INBOUND = [
-    "Weekly payout", "Invoice payment", "Subscription revenue",
-    "Partner settlement", "Marketplace earnings", "Customer payment",
-    "Chargeback reversal", "Wire transfer received",
-]
-_DESCRIPTIONS_OUTBOUND = [
-    "Infrastructure costs", "Monthly SaaS subscription", "Contractor payment",
-    "Platform fees", "Quarterly estimated tax", "Annual renewal",
-    "Processing fees", "Marketing campaign", "Office rent", "Insurance premium",
-]
-_STATUSES = [
-    PaymentStatus.completed, PaymentStatus.completed,
-    PaymentStatus.completed, PaymentStatus.completed,
-    PaymentStatus.pending, PaymentStatus.failed,
-]
+from app.serialization import clear_payment_cache
+from app.services.datasource import (
+    _rows_to_payments,
+    load_payments_from_datasource,
+    load_payments_from_datasource_async,
+)
+from app.services.synthetic_data import generate_payment_rows
+
+# A list of models, or a LedgerPayments view when the ledger is shared across workers.
+_SAMPLE_PAYMENTS: Sequence[Payment] = []
+_SEED_LOCK = threading.Lock()
+_INSTALL_LOCK = threading.Lock()
+
+# Bumped whenever the ledger is replaced; caches derived from it key on this.
+_VERSION = 0
+
+# Shared mode (PAYMENTS_SHARED_DIR): the mapped ledger and the version attached in this worker.
+_SHARED = None
+_ATTACHED_VERSION = 0
+
+# The in-progress async load, shared by every request that arrives before the ledger is seeded.
+_SEED_TASK: Optional[asyncio.Future] = None
 
 
 def _seed() -> None:
-    global _SAMPLE_PAYMENTS
-    if _SAMPLE_PAYMENTS:
+    if settings.payments_shared_dir:
+        _sync_shared()
         return
-    _SAMPLE_PAYMENTS = load_payments_from_datasource()
     if _SAMPLE_PAYMENTS:
         return
-    # Fallback: minimal hardcoded sample
+    with _SEED_LOCK:
+        if _SAMPLE_PAYMENTS:
+            return
+        _install(load_payments_from_datasource() or _fallback_payments(), only_if_empty=True)
+
+
+async def _seed_async() -> None:
+    """:func:`_seed` without blocking the event loop; concurrent callers share one load."""
+    global _SEED_TASK
+    if settings.payments_shared_dir:
+        if _ATTACHED_VERSION and _shared_ledger().version() == _ATTACHED_VERSION:
+            return
+    elif _SAMPLE_PAYMENTS:
+        return
+    task = _SEED_TASK
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        task = _SEED_TASK = asyncio.ensure_future(_load_async())
+    # Shielded: one caller disconnecting must not cancel the load the others are waiting on.
+    await asyncio.shield(task)
+
+
+async def _load_async() -> None:
+    if settings.payments_shared_dir:
+        await run_cpu(_sync_shared)
+        return
+    # _SEED_LOCK is held for the whole load, as in _seed, so a load already
+    # running in a thread (boot warm-up, a sync route) is waited for rather
+    # than repeated, and one started meanwhile finds the store seeded.
+    if not _SEED_LOCK.acquire(blocking=False):
+        await asyncio.to_thread(_seed)
+        return
+    try:
+        if _SAMPLE_PAYMENTS:
+            return
+        payments = await load_payments_from_datasource_async()
+        _install(payments or _fallback_payments(), only_if_empty=True)
+    finally:
+        _SEED_LOCK.release()
+
+
+def _fallback_payments() -> List[Payment]:
+    """Minimal hardcoded sample for when the datasource returns nothing."""
+    payments = []
     base = datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
     for i, (amt, direction, counterparty) in enumerate([
         (100_00, "inbound", "Acme Corp"),
@@ -54,7 +93,7 @@ def _seed() -> None:
         (50_00, "inbound", "Refund reversal"),
         (-30_00, "outbound", "Fee"),
     ]):
-        _SAMPLE_PAYMENTS.append(
+        payments.append(
             Payment(
                 id=uuid4(),
                 amount_cents=amt,
@@ -68,70 +107,108 @@ def _seed() -> None:
                 external_id=f"ext_{i}",
             )
         )
-    _SAMPLE_PAYMENTS.sort(key=lambda p: p.created_at, reverse=True)
+    payments.sort(key=lambda p: p.created_at, reverse=True)
+    return payments
 
 
-def regenerate_payments(count: int = 28) -> List[Payment]:
-    """Replace the in-memory store with freshly randomised test payments."""
-    global _SAMPLE_PAYMENTS
-    now = datetime.now(timezone.utc)
-    payments: List[Payment] = []
+def _shared_ledger():
+    global _SHARED
+    if _SHARED is None:
+        from app.services.shared_ledger import SharedLedger
 
-    for i in range(count):
-        days_ago = random.randint(0, 59)
-        hour = random.randint(6, 22)
-        minute = random.randint(0, 59)
-        created = (now - timedelta(days=days_ago)).replace(
-            hour=hour, minute=minute, second=0, microsecond=0,
-        )
+        with _INSTALL_LOCK:
+            if _SHARED is None:
+                _SHARED = SharedLedger(Path(settings.payments_shared_dir))
+    return _SHARED
 
-        is_inbound = random.random() < 0.6
-        direction = "inbound" if is_inbound else "outbound"
-
-        if is_inbound:
-            amount_cents = random.choice([
-                random.randint(5_000, 50_000),
-                random.randint(50_000, 250_000),
-                random.randint(250_000, 500_000),
-            ])
-            counterparty = random.choice(_COUNTERPARTIES_INBOUND)
-            description = random.choice(_DESCRIPTIONS_INBOUND)
-        else:
-            amount_cents = random.choice([
-                random.randint(1_000, 15_000),
-                random.randint(15_000, 80_000),
-                random.randint(80_000, 250_000),
-            ])
-            counterparty = random.choice(_COUNTERPARTIES_OUTBOUND)
-            description = random.choice(_DESCRIPTIONS_OUTBOUND)
-
-        status = random.choice(_STATUSES)
 
-        payments.append(
-            Payment(
-                id=uuid4(),
-                amount_cents=amount_cents,
-                currency="USD",
-                direction=direction,
-                counterparty=counterparty,
-                description=f"{description} — {created.strftime('%b %d')}",
-                status=status,
-                created_at=created,
-                updated_at=None,
-                external_id=f"gen_{direction[:2]}_{i:04d}",
-            )
-        )
+def _sync_shared() -> None:
+    """Attach the latest published shared ledger, publishing the datasource first if no worker has."""
+    global _ATTACHED_VERSION
+    shared = _shared_ledger()
+    if shared.version() == _ATTACHED_VERSION and _ATTACHED_VERSION:
+        return
+    from app.services.shared_ledger import rows_from_payments
 
-    payments.sort(key=lambda p: p.created_at, reverse=True)
-    _SAMPLE_PAYMENTS = payments
+    with _SEED_LOCK:
+        shared.load_or_publish(lambda: rows_from_payments(load_payments_from_datasource() or _fallback_payments()))
+        if shared.version() != _ATTACHED_VERSION:
+            payments = shared.attach()
+            _install(payments)
+            _ATTACHED_VERSION = payments.version
+
+
+def _install(payments: Sequence[Payment], only_if_empty: bool = False) -> None:
+    """Make ``payments`` the current ledger and invalidate everything derived from the old one."""
+    global _SAMPLE_PAYMENTS, _VERSION
+    with _INSTALL_LOCK:
+        if only_if_empty and _SAMPLE_PAYMENTS:
+            return
+        clear_payment_cache()
+        _SAMPLE_PAYMENTS = payments
+        _VERSION += 1
+
+
+def data_version() -> int:
+    """Identifies the current ledger; changes every time it is replaced."""
+    return _VERSION
+
+
+def ledger() -> Tuple[int, Sequence[Payment]]:
+    """The current ledger and its version, read together."""
+    _seed()
+    with _INSTALL_LOCK:
+        return _VERSION, _SAMPLE_PAYMENTS
+
+
+async def ledger_async() -> Tuple[int, Sequence[Payment]]:
+    """:func:`ledger` for async callers: a first load runs off the event loop."""
+    await _seed_async()
+    with _INSTALL_LOCK:
+        return _VERSION, _SAMPLE_PAYMENTS
+
+
+def regenerate_payments(count: int = 28, seed: Optional[int] = None, end: Optional[date] = None) -> Sequence[Payment]:
+    """Replace the in-memory store with synthetic payments over the 60 days ending ``end`` (default: now).
+
+    The same ``seed`` and ``end`` always produce the same ledger, as with
+    ``scripts.generate_data --end``; without ``end`` the dates follow the
+    clock. ``seed=None`` picks a random one.
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+    anchor = datetime.combine(end, time(23, 59), tzinfo=timezone.utc) if end else None
+    rows = generate_payment_rows(count, seed=seed, end=anchor, days=60)
+    if settings.payments_shared_dir:
+        # Newest first, like every other ledger; other workers pick it up on their next request.
+        _shared_ledger().publish(sorted(rows, key=lambda r: r.created_at, reverse=True))
+        _sync_shared()
+        return _SAMPLE_PAYMENTS
+    payments = _rows_to_payments(rows, validate=False, seed=seed)
+    _install(payments)
     return payments
 
 
+def direction_totals(payments: Sequence[Payment]) -> Tuple[int, int]:
+    """Summed ``amount_cents`` of inbound and of outbound payments; a shared ledger sums its columns."""
+    totals = getattr(payments, "direction_totals", None)
+    if totals is not None:
+        return totals()
+    total_in = sum(p.amount_cents for p in payments if p.direction == "inbound")
+    total_out = sum(p.amount_cents for p in payments if p.direction == "outbound")
+    return total_in, total_out
+
+
 def get_payment_store():
     _seed()
     return _PaymentStore()
 
 
+async def get_payment_store_async():
+    await _seed_async()
+    return _PaymentStore()
+
+
 class _PaymentStore:
     def list(
         self,
@@ -139,9 +216,14 @@ class _PaymentStore:
         direction: Optional[str] = None,
         status: Optional[PaymentStatus] = None,
     ) -> List[Payment]:
-        out = list(_SAMPLE_PAYMENTS)
-        if direction:
-            out = [p for p in out if p.direction == direction]
-        if status is not None:
-            out = [p for p in out if p.status == status]
-        return out[:limit]
+        payments = _SAMPLE_PAYMENTS
+        if not direction and status is None:
+            return list(payments[:limit])
+        select = getattr(payments, "select", None)
+        if select is not None:
+            return select(direction or None, status, limit)
+        matches = (
+            p for p in payments
+            if (not direction or p.direction == direction) and (status is None or p.status == status)
+        )
+        return list(islice(matches, limit))
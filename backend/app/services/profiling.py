@@ -0,0 +1,294 @@
+"""On-demand profiling: cProfile the next N requests to a route, or sample the whole process.
+
+Nothing is installed until a capture is requested, so there is no per-request
+cost while profiling is idle (and with ``PROFILING_ENABLED`` off the admin
+routes are not even mounted).
+
+- A route capture profiles the next N calls to one route's endpoint with
+  ``cProfile`` and merges them into one ``pstats.Stats``. While any capture is
+  armed, ``fastapi.routing.run_endpoint_function`` (the single call site of
+  every endpoint) is replaced by a version that profiles the armed endpoints
+  and passes everything else straight through. The original is restored when
+  the last capture completes or is cancelled. Sync endpoints are profiled in
+  the worker thread that runs them. Async endpoints are profiled one request
+  at a time on the event loop, and concurrent requests to the same route pass
+  through unprofiled. Work they hand to the CPU executor
+  (``app.concurrency.run_cpu``) is profiled in its worker thread and merged
+  into the same capture.
+- From Python 3.12 only one profiler can run in the process at a time, and
+  it records every thread. Requests arriving while one is being profiled run
+  unprofiled, and the capture also includes whatever other threads ran
+  meanwhile. Profiling never fails a request: if a profiler cannot be
+  enabled, the request runs without one.
+- A process sample reads every thread's stack from ``sys._current_frames()``
+  at a fixed interval for a number of seconds. It returns collapsed stacks
+  (``thread;outer;...;inner count`` per line), the input format of
+  flamegraph.pl, speedscope and inferno.
+
+Captures are per process. Under ``--workers N`` each worker profiles only the
+requests it serves.
+"""
+import cProfile
+import contextvars
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import fastapi.routing
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+ARMED = "armed"
+COMPLETE = "complete"
+CANCELLED = "cancelled"
+
+_KEEP_FINISHED = 20  # finished captures kept for download
+_TEXT_LINES = 60  # functions listed in the text report
+
+
+class ProfilingError(Exception):
+    """Raised for capture requests that cannot be served."""
+
+    def __init__(self, message: str, status_code: int = 409):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(message)
+
+
+class RouteCapture:
+    """cProfile stats for the next ``requested`` calls to one route's endpoint."""
+
+    def __init__(self, path: str, method: str, endpoint: Callable, requested: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.method = method
+        self.endpoint = endpoint
+        self.requested = requested
+        self.captured = 0
+        self.status = ARMED
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.stats: Optional[pstats.Stats] = None
+        self._loop_busy = False  # async endpoints: one profiled request at a time on the loop
+
+    def _record(self, profile: cProfile.Profile, request: bool = True) -> None:
+        with _LOCK:
+            if self.status != ARMED:
+                return  # a request that was already in flight when the capture finished
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+            if request:
+                self.captured += 1
+                if self.captured >= self.requested:
+                    _finish(self, COMPLETE)
+
+    def _call_profiled(self, call: Callable, values: dict):
+        profile = _start_profile()
+        if profile is None:
+            return call(**values)
+        try:
+            return call(**values)
+        finally:
+            _stop_profile(profile)
+            self._record(profile)
+
+    async def run(self, call: Callable, values: dict, is_coroutine: bool):
+        if not is_coroutine:
+            return await run_in_threadpool(self._call_profiled, call, values)
+        if self._loop_busy:
+            return await call(**values)
+        profile = _start_profile()
+        if profile is None:
+            return await call(**values)
+        self._loop_busy = True
+        token = _CURRENT.set(self)
+        try:
+            return await call(**values)
+        finally:
+            _stop_profile(profile)
+            _CURRENT.reset(token)
+            self._loop_busy = False
+            self._record(profile)
+
+    def pstats_bytes(self) -> bytes:
+        """The merged stats in the ``.prof`` format read by ``pstats``, snakeviz and gprof2dot."""
+        with _LOCK:
+            return marshal.dumps(self.stats.stats)
+
+    def text_report(self, sort: str = "cumulative") -> str:
+        out = io.StringIO()
+        stats = pstats.Stats(stream=out)
+        with _LOCK:
+            stats.add(self.stats)
+        stats.sort_stats(sort).print_stats(_TEXT_LINES)
+        return out.getvalue()
+
+
+_LOCK = threading.RLock()
+_CAPTURES: Dict[str, RouteCapture] = {}
+_ARMED: Dict[Callable, RouteCapture] = {}  # endpoint function -> its armed capture
+_ORIGINAL_RUN = getattr(fastapi.routing, "run_endpoint_function", None)
+_SAMPLE_LOCK = threading.Lock()
+# The capture profiling the current async request, so executor work it hands off is included.
+_CURRENT: contextvars.ContextVar[Optional[RouteCapture]] = contextvars.ContextVar("profiling_capture", default=None)
+_STDLIB = os.path.dirname(os.__file__) + os.sep
+# From Python 3.12 cProfile is built on sys.monitoring, which is process-wide:
+# only one profiler can be enabled at a time, and it sees calls on every thread.
+_PROCESS_WIDE = sys.version_info >= (3, 12)
+_PROFILER_LOCK = threading.Lock()  # held while a profiler is enabled, when profilers are process-wide
+
+
+def _start_profile() -> Optional[cProfile.Profile]:
+    """An enabled profiler, or ``None`` when one cannot be started now (the call then runs unprofiled)."""
+    if _PROCESS_WIDE and not _PROFILER_LOCK.acquire(blocking=False):
+        return None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:  # another profiler or monitoring tool is active; never fail the request over it
+        if _PROCESS_WIDE:
+            _PROFILER_LOCK.release()
+        return None
+    return profile
+
+
+def _stop_profile(profile: cProfile.Profile) -> None:
+    profile.disable()
+    if _PROCESS_WIDE:
+        _PROFILER_LOCK.release()
+
+
+async def _run_endpoint_function(*, dependant, values: dict, is_coroutine: bool, **kwargs):
+    capture = _ARMED.get(dependant.call)
+    if capture is None:
+        return await _ORIGINAL_RUN(dependant=dependant, values=values, is_coroutine=is_coroutine, **kwargs)
+    return await capture.run(dependant.call, values, is_coroutine)
+
+
+def run_profiled(fn: Callable, *args, **kwargs):
+    """Call ``fn``, profiling it into the capture of the async request that handed it off, if any."""
+    capture = _CURRENT.get()
+    if capture is None:
+        return fn(*args, **kwargs)
+    profile = _start_profile()
+    if profile is None:  # Python 3.12+: the request's own profiler already sees this thread
+        return fn(*args, **kwargs)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _stop_profile(profile)
+        capture._record(profile, request=False)
+
+
+def _finish(capture: RouteCapture, status: str) -> None:
+    # Under _LOCK.
+    if capture.status != ARMED:
+        return
+    capture.status = status
+    capture.finished_at = datetime.now(timezone.utc)
+    del _ARMED[capture.endpoint]
+    if not _ARMED:
+        fastapi.routing.run_endpoint_function = _ORIGINAL_RUN
+
+
+def _api_routes(routes, prefix: str = "") -> Iterator[Tuple[str, APIRoute]]:
+    """(full path, route) for every APIRoute, including those in routers that are included lazily."""
+    for route in routes:
+        if isinstance(route, APIRoute):
+            yield prefix + route.path, route
+        original = getattr(route, "original_router", None)  # newer FastAPI keeps included routers as-is
+        if original is not None:
+            yield from _api_routes(original.routes, prefix + route.include_context.prefix)
+
+
+def start_route_capture(app: FastAPI, path: str, method: str, requests: int) -> RouteCapture:
+    """Profile the next ``requests`` calls to the route registered at ``path`` (a template, e.g. ``/items/{id}``)."""
+    if _ORIGINAL_RUN is None:
+        raise ProfilingError("Route profiling is not supported by this FastAPI version", status_code=501)
+    method = method.upper()
+    endpoint = next(
+        (route.endpoint for full_path, route in _api_routes(app.routes) if full_path == path and method in route.methods),
+        None,
+    )
+    if endpoint is None:
+        raise ProfilingError(f"No {method} route with path {path}", status_code=404)
+    with _LOCK:
+        armed = _ARMED.get(endpoint)
+        if armed is not None:
+            raise ProfilingError(f"Capture {armed.id} is already profiling {armed.method} {armed.path}")
+        capture = RouteCapture(path, method, endpoint, requests)
+        _ARMED[endpoint] = capture
+        fastapi.routing.run_endpoint_function = _run_endpoint_function
+        _CAPTURES[capture.id] = capture
+        finished = [c for c in _CAPTURES.values() if c.status != ARMED]
+        for old in finished[:-_KEEP_FINISHED]:
+            del _CAPTURES[old.id]
+    return capture
+
+
+def cancel_route_capture(capture: RouteCapture) -> None:
+    with _LOCK:
+        _finish(capture, CANCELLED)
+
+
+def get_capture(capture_id: str) -> RouteCapture:
+    capture = _CAPTURES.get(capture_id)
+    if capture is None:
+        raise ProfilingError(f"Capture {capture_id} not found", status_code=404)
+    return capture
+
+
+def list_captures() -> List[RouteCapture]:
+    with _LOCK:
+        return sorted(_CAPTURES.values(), key=lambda c: c.created_at, reverse=True)
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    for marker in ("site-packages" + os.sep, _STDLIB, os.getcwd() + os.sep):
+        head, sep, tail = filename.rpartition(marker)
+        if sep:
+            filename = tail
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def sample_process(seconds: float, interval: float) -> str:
+    """Collapsed stacks of every other thread, sampled every ``interval`` seconds for ``seconds``."""
+    if not _SAMPLE_LOCK.acquire(blocking=False):
+        raise ProfilingError("A process sample is already running")
+    try:
+        me = threading.get_ident()
+        counts: Dict[str, int] = {}
+        labels: Dict[object, str] = {}  # code objects repeat across samples; format each once
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                key = ";".join(reversed(stack))
+                counts[key] = counts.get(key, 0) + 1
+            time.sleep(interval)
+    finally:
+        _SAMPLE_LOCK.release()
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
@@ -0,0 +1,324 @@
+"""Reconcile Stripe charges, balance transactions and payouts.
+
+The three object lists refer to each other by id. A charge names its balance
+transaction. A balance transaction names its ``source`` (the charge, refund or
+payout behind it) and carries the fee. A payout names its own balance
+transaction, and ``GET /v1/balance_transactions?payout=`` lists the
+transactions it paid out. Balance transactions are hash-indexed by id and by
+source, then charges and payouts are each walked once, so the join is linear
+in the number of objects:
+
+- A charge and its balance transaction are the same money. The pair collapses
+  into one match carrying the gross, fee and net amounts, and the ledger keeps
+  only the charge.
+- Each payout's member transactions are summed and checked against the payout
+  amount.
+- Anything that does not join is reported as unmatched: a settled charge with
+  no transaction, a transaction whose charge or payout was not fetched, or a
+  payout whose members do not add up.
+
+The latest result is kept in memory. The Stripe datasource publishes it when
+it loads the ledger, and ``get_reconciliation`` fetches one on demand.
+"""
+import logging
+import threading
+from array import array
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+import httpx
+
+from app.config import settings
+from app.metrics import timed_function
+from app.models.reconciliation import PayoutReconciliation, ReconciliationReport, UnmatchedItem
+
+logger = logging.getLogger(__name__)
+
+_CHARGE_TYPES = frozenset({"charge", "payment"})
+_PAYOUT_TYPE = "payout"
+
+
+class ReconciliationError(Exception):
+    """Raised when the Stripe objects to reconcile cannot be fetched in full."""
+
+    def __init__(self, message: str, status_code: int = 503):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(message)
+
+
+class ChargeMatch(NamedTuple):
+    balance_transaction_id: str
+    amount_cents: int  # gross, in the settlement currency
+    fee_cents: int
+    net_cents: int
+    payout_id: Optional[str]
+
+
+class ChargeMatches:
+    """Charge id -> its balance transaction, fee and payout, stored column-wise.
+
+    Millions of matches as one tuple each would mostly be allocation and
+    garbage-collector work; the amounts go in ``array('q')`` columns instead
+    and :meth:`get` builds a :class:`ChargeMatch` on demand.
+    """
+
+    __slots__ = ("_positions", "transaction_ids", "payout_ids", "amount", "fee", "net")
+
+    def __init__(self):
+        self._positions: Dict[str, int] = {}
+        self.transaction_ids: List[str] = []
+        self.payout_ids: List[Optional[str]] = []
+        self.amount = array("q")
+        self.fee = array("q")
+        self.net = array("q")
+
+    def add(self, charge_id: str, bt_id: str, amount: int, fee: int, net: int, payout_id: Optional[str]) -> None:
+        self._positions[charge_id] = len(self.transaction_ids)
+        self.transaction_ids.append(bt_id)
+        self.payout_ids.append(payout_id)
+        self.amount.append(amount)
+        self.fee.append(fee)
+        self.net.append(net)
+
+    def __len__(self) -> int:
+        return len(self.transaction_ids)
+
+    def get(self, charge_id: str) -> Optional[ChargeMatch]:
+        i = self._positions.get(charge_id)
+        if i is None:
+            return None
+        return ChargeMatch(self.transaction_ids[i], self.amount[i], self.fee[i], self.net[i], self.payout_ids[i])
+
+
+class PayoutMatch(NamedTuple):
+    payout_id: str
+    status: str
+    currency: str
+    amount_cents: int
+    arrival_date: Optional[date]
+    transaction_count: int
+    gross_cents: int  # sums over the member transactions
+    fee_cents: int
+    net_cents: int
+
+
+class Unmatched(NamedTuple):
+    object: str  # "charge" | "balance_transaction" | "payout"
+    id: str
+    reason: str
+    amount_cents: int
+    currency: str
+    created_at: Optional[datetime]
+
+
+class Reconciliation(NamedTuple):
+    charges: ChargeMatches
+    payouts: List[PayoutMatch]  # most recent first
+    unmatched: List[Unmatched]
+    charge_count: int
+    duplicate_transactions: Set[str]  # balance transactions collapsed into their charge
+    fetched_at: datetime
+
+
+def stripe_id(ref) -> Optional[str]:
+    """The id behind a Stripe reference, which is an id string or an expanded object."""
+    if isinstance(ref, dict):
+        return ref.get("id")
+    return ref or None
+
+
+def _timestamp(ts) -> Optional[datetime]:
+    return datetime.fromtimestamp(ts, tz=timezone.utc) if ts else None
+
+
+def _same_currency(a: dict, b: dict) -> bool:
+    return (a.get("currency") or "").lower() == (b.get("currency") or "").lower()
+
+
+def _unmatched(kind: str, obj: dict, reason: str, amount: Optional[int] = None) -> Unmatched:
+    return Unmatched(
+        object=kind,
+        id=obj.get("id", ""),
+        reason=reason,
+        amount_cents=obj.get("amount", 0) if amount is None else amount,
+        currency=(obj.get("currency") or "usd").upper(),
+        created_at=_timestamp(obj.get("created")),
+    )
+
+
+def reconcile(
+    charges: Iterable[dict],
+    balance_transactions: List[dict],
+    payouts: Iterable[dict],
+    payout_members: Optional[Dict[str, str]] = None,
+) -> Reconciliation:
+    """Join the three lists on their ids. ``payout_members`` maps balance transaction id to payout id."""
+    payout_members = payout_members or {}
+    by_id: Dict[str, dict] = {}
+    by_source: Dict[str, dict] = {}
+    for bt in balance_transactions:
+        by_id[bt["id"]] = bt
+        source = bt.get("source")
+        if source:
+            by_source.setdefault(stripe_id(source), bt)
+
+    unmatched: List[Unmatched] = []
+    matches = ChargeMatches()
+    collapsed: Set[str] = set()
+    charge_count = 0
+    for charge in charges:
+        charge_count += 1
+        charge_id = charge.get("id")
+        bt = by_id.get(stripe_id(charge.get("balance_transaction"))) or by_source.get(charge_id)
+        if bt is None:
+            # Failed and uncaptured charges never reach the balance.
+            if charge.get("status") == "succeeded" and charge.get("captured", True):
+                unmatched.append(_unmatched("charge", charge, "no balance transaction"))
+            continue
+        bt_id = bt["id"]
+        collapsed.add(bt_id)
+        amount = bt.get("amount", 0)
+        fee = bt.get("fee", 0)
+        matches.add(
+            charge_id,
+            bt_id,
+            amount,
+            fee,
+            bt.get("net", amount - fee),
+            payout_members.get(bt_id) or stripe_id(bt.get("payout")),
+        )
+        if amount != charge.get("amount", amount) and _same_currency(bt, charge):
+            unmatched.append(_unmatched("charge", charge, f"balance transaction {bt_id} is for {amount}"))
+
+    # Per payout: [transaction_count, gross, fee, net] over its member transactions.
+    members: Dict[str, List[int]] = {}
+    for bt_id, payout_id in payout_members.items():
+        bt = by_id.get(bt_id)
+        if bt is None or bt.get("type") == _PAYOUT_TYPE:
+            continue
+        entry = members.get(payout_id)
+        if entry is None:
+            entry = members[payout_id] = [0, 0, 0, 0]
+        amount, fee = bt.get("amount", 0), bt.get("fee", 0)
+        entry[0] += 1
+        entry[1] += amount
+        entry[2] += fee
+        entry[3] += bt.get("net", amount - fee)
+
+    payout_matches: List[PayoutMatch] = []
+    payout_transactions: Set[str] = set()
+    for payout in payouts:
+        payout_id = payout.get("id")
+        status = payout.get("status", "paid")
+        own = by_id.get(stripe_id(payout.get("balance_transaction"))) or by_source.get(payout_id)
+        if own is None:
+            unmatched.append(_unmatched("payout", payout, "no balance transaction"))
+        else:
+            payout_transactions.add(own["id"])
+        count, gross, fee, net = members.get(payout_id, (0, 0, 0, 0))
+        amount = payout.get("amount", 0)
+        if count and status == "paid" and net != amount:
+            unmatched.append(_unmatched(
+                "payout", payout, f"member transactions net {net}, off by {amount - net}", amount,
+            ))
+        arrival = _timestamp(payout.get("arrival_date"))
+        payout_matches.append(PayoutMatch(
+            payout_id=payout_id,
+            status=status,
+            currency=(payout.get("currency") or "usd").upper(),
+            amount_cents=amount,
+            arrival_date=arrival.date() if arrival else None,
+            transaction_count=count,
+            gross_cents=gross,
+            fee_cents=fee,
+            net_cents=net,
+        ))
+    payout_matches.sort(key=lambda p: p.arrival_date or date.min, reverse=True)
+
+    for bt in balance_transactions:
+        bt_id = bt["id"]
+        if bt_id in collapsed or bt_id in payout_transactions:
+            continue
+        kind = bt.get("type")
+        if kind in _CHARGE_TYPES:
+            unmatched.append(_unmatched("balance_transaction", bt, "charge not found"))
+        elif kind == _PAYOUT_TYPE:
+            unmatched.append(_unmatched("balance_transaction", bt, "payout not found"))
+
+    return Reconciliation(
+        charges=matches,
+        payouts=payout_matches,
+        unmatched=unmatched,
+        charge_count=charge_count,
+        duplicate_transactions=collapsed,
+        fetched_at=datetime.now(timezone.utc),
+    )
+
+
+_LATEST: Optional[Reconciliation] = None
+_LOCK = threading.Lock()
+
+
+def publish(result: Reconciliation) -> None:
+    """Make ``result`` the reconciliation served by the API (called by the Stripe datasource on load)."""
+    global _LATEST
+    _LATEST = result
+
+
+def get_reconciliation(refresh: bool = False) -> Optional[Reconciliation]:
+    """The latest reconciliation, fetched from Stripe when there is none yet (or on ``refresh``).
+
+    ``None`` unless the datasource is ``stripe``: the file datasources carry no
+    balance transactions or payouts to join against. Raises
+    :class:`ReconciliationError` when Stripe is unreachable or a list page
+    fails, rather than reconciling a partial fetch.
+    """
+    global _LATEST
+    if settings.datasource.lower() != "stripe":
+        return None
+    if _LATEST is not None and not refresh:
+        return _LATEST
+    from app.services.stripe_datasource import fetch_stripe_objects
+
+    with _LOCK:
+        if _LATEST is None or refresh:
+            try:
+                objects = fetch_stripe_objects()
+            except httpx.HTTPError as e:
+                logger.warning("Reconciliation fetch from stripe-mock failed: %s", e)
+                raise ReconciliationError(f"Could not fetch Stripe objects from {settings.stripe_mock_url}: {e}")
+            _LATEST = reconcile(*objects)
+        return _LATEST
+
+
+@timed_function("get_reconciliation_report")
+def get_reconciliation_report(
+    refresh: bool = False,
+    object_type: Optional[str] = None,
+    limit: int = 100,
+) -> Optional[ReconciliationReport]:
+    result = get_reconciliation(refresh=refresh)
+    if result is None:
+        return None
+    charges = result.charges
+    unmatched = [u for u in result.unmatched if object_type is None or u.object == object_type]
+    return ReconciliationReport(
+        fetched_at=result.fetched_at,
+        charge_count=result.charge_count,
+        matched_charge_count=len(result.charges),
+        duplicates_collapsed=len(result.duplicate_transactions),
+        gross_cents=sum(charges.amount),
+        fee_cents=sum(charges.fee),
+        net_cents=sum(charges.net),
+        payout_count=len(result.payouts),
+        payouts=[
+            PayoutReconciliation(
+                **p._asdict(),
+                difference_cents=p.amount_cents - p.net_cents if p.transaction_count else None,
+            )
+            for p in result.payouts[:limit]
+        ],
+        unmatched_count=len(unmatched),
+        unmatched=[UnmatchedItem(**u._asdict()) for u in unmatched[:limit]],
+    )
@@ -0,0 +1,61 @@
+"""Sales analytics over the sales ledger rollups, joined to stock levels and cash flow."""
+from datetime import date
+from typing import List, Optional
+
+from app.models.inventory import SalesRevenueDay, SkuSalesStats
+from app.services import sales_ledger
+from app.services.cashflow_service import get_cashflow_summary
+from app.services.inventory_store import get_inventory_store
+
+
+def get_sku_stats(start: date, end: date, category: Optional[str] = None) -> List[SkuSalesStats]:
+    """Units, revenue, sell-through and days of stock remaining for every item."""
+    totals = sales_ledger.totals_by_item(start, end)
+    days = (end - start).days + 1
+    stats = []
+    for item in get_inventory_store().list(category=category):
+        units, revenue = totals.get(item.id, (0, 0))
+        on_hand = item.quantity
+        stats.append(
+            SkuSalesStats(
+                item_id=item.id,
+                name=item.name,
+                category=item.category,
+                sku=item.sku,
+                units_sold=units,
+                revenue_cents=revenue,
+                on_hand=on_hand,
+                sell_through_rate=units / (units + on_hand) if units + on_hand else 0.0,
+                days_of_stock_remaining=on_hand / (units / days) if units else None,
+            )
+        )
+    return stats
+
+
+def get_top_sellers(
+    start: date,
+    end: date,
+    limit: int = 10,
+    by: str = "units",
+    category: Optional[str] = None,
+) -> List[SkuSalesStats]:
+    """Best-selling items by ``units`` or ``revenue`` over the range."""
+    key = (lambda s: s.revenue_cents) if by == "revenue" else (lambda s: s.units_sold)
+    sold = [s for s in get_sku_stats(start, end, category=category) if s.units_sold]
+    sold.sort(key=key, reverse=True)
+    return sold[:limit]
+
+
+def get_sales_revenue_by_day(start: date, end: date) -> List[SalesRevenueDay]:
+    """Daily inventory sales alongside that day's cash inflow from payments."""
+    inflow = {p.period_start: p.inflow_cents for p in get_cashflow_summary(start=start, end=end).periods}
+    sales = {day: (units, revenue) for day, units, revenue in sales_ledger.totals_by_day(start, end)}
+    return [
+        SalesRevenueDay(
+            day=day,
+            units_sold=sales.get(day, (0, 0))[0],
+            revenue_cents=sales.get(day, (0, 0))[1],
+            cash_inflow_cents=inflow.get(day, 0),
+        )
+        for day in sorted(set(inflow) | set(sales))
+    ]
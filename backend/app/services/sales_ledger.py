@@ -0,0 +1,75 @@
+"""Time-indexed ledger of inventory sales, kept as per-day, per-item rollups.
+
+Every sale is folded into a ``day -> item -> [units, revenue]`` rollup at
+write time, with the days kept sorted so range queries bisect on them.
+Analytics read the rollups, touching one entry per (day, item sold) in the
+range. Days are UTC.
+
+With ``INVENTORY_DATA_DIR`` set the sales are also logged by the inventory
+write-ahead log, whose snapshots keep these same totals, and :func:`restore`
+reloads them on recovery.
+"""
+import bisect
+import threading
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+_LOCK = threading.Lock()
+_DAILY: Dict[date, Dict[UUID, List[int]]] = {}  # day -> item_id -> [units, revenue_cents]
+_DAYS: List[date] = []  # sorted keys of _DAILY
+
+
+def record_sale(item_id: UUID, quantity: int, unit_price_cents: int, at: Optional[datetime] = None) -> None:
+    """Fold a sale into the daily rollup.
+
+    ``at`` is the time already logged for the sale; by default it is now.
+    """
+    day = (at or datetime.now(timezone.utc)).date()
+    with _LOCK:
+        _add(day, item_id, quantity, quantity * unit_price_cents)
+
+
+def restore(rows: Iterable[list]) -> None:
+    """Fold recovered ``[day, item_id, units, revenue_cents]`` totals (see ``inventory_wal.SaleRow``)."""
+    with _LOCK:
+        for day, item_id, units, revenue in rows:
+            _add(date.fromisoformat(day), UUID(item_id), units, revenue)
+
+
+def _add(day: date, item_id: UUID, units: int, revenue: int) -> None:
+    # Under _LOCK.
+    by_item = _DAILY.get(day)
+    if by_item is None:
+        by_item = _DAILY[day] = {}
+        bisect.insort(_DAYS, day)
+    totals = by_item.get(item_id)
+    if totals is None:
+        by_item[item_id] = [units, revenue]
+    else:
+        totals[0] += units
+        totals[1] += revenue
+
+
+def totals_by_item(start: date, end: date) -> Dict[UUID, Tuple[int, int]]:
+    """(units, revenue_cents) per item over the inclusive day range."""
+    out: Dict[UUID, List[int]] = {}
+    with _LOCK:
+        for day in _DAYS[bisect.bisect_left(_DAYS, start):bisect.bisect_right(_DAYS, end)]:
+            for item_id, (units, revenue) in _DAILY[day].items():
+                acc = out.get(item_id)
+                if acc is None:
+                    out[item_id] = [units, revenue]
+                else:
+                    acc[0] += units
+                    acc[1] += revenue
+    return {item_id: (units, revenue) for item_id, (units, revenue) in out.items()}
+
+
+def totals_by_day(start: date, end: date) -> List[Tuple[date, int, int]]:
+    """(day, units, revenue_cents) for each day in the range that had sales, ascending."""
+    with _LOCK:
+        return [
+            (day, sum(t[0] for t in _DAILY[day].values()), sum(t[1] for t in _DAILY[day].values()))
+            for day in _DAYS[bisect.bisect_left(_DAYS, start):bisect.bisect_right(_DAYS, end)]
+        ]
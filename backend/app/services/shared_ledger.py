@@ -0,0 +1,228 @@
+"""Payment ledger shared by every uvicorn worker through memory-mapped files.
+
+With ``PAYMENTS_SHARED_DIR`` set (ideally on tmpfs, e.g. ``/dev/shm/cashflow``),
+the first worker to need payments loads the datasource and writes them as a
+binary ledger segment (the ``.ledger`` format from ``payment_files``); every
+worker, that one included, maps the segment read-only. The kernel keeps one
+copy of the pages however many workers attach, and Payment models are built
+only for the rows a request actually touches.
+
+Updates are published by version bump: the publisher writes a new segment
+``ledger-<version>.ledger`` and then stores ``version`` in the 8-byte
+``version`` file, which every worker also keeps mapped. Workers compare it
+with the version they have attached on each store access (one memory read)
+and remap when it has moved. Superseded segments are unlinked; a worker that
+still maps one keeps a valid view until it moves on.
+
+A ledger left in the directory by an earlier run is never served: every
+worker holds a shared lock on the ``members`` file while it runs, and the
+first worker of a new run (the only one that can lock it exclusively)
+publishes the datasource afresh.
+
+Only the ledger rows are shared. Structures derived from them are still
+built per worker: the cash flow rollups (folded from the columns; one entry
+per counterparty and day), the search index (postings over every row, the
+largest of these) and the bounded cache of encoded rows.
+"""
+import fcntl
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from datetime import timezone
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+
+from app.models.payment import Payment, PaymentStatus
+from app.services.payment_files import DIRECTIONS, STATUSES, LedgerColumns, PaymentRow, encode_ledger
+
+_VERSION = struct.Struct("<Q")
+_STATUS_MODELS = tuple(PaymentStatus(s) for s in STATUSES)
+# Attempts to map the current segment when publishers race ahead of a reader.
+_ATTACH_ATTEMPTS = 5
+
+
+def rows_from_payments(payments: Iterable[Payment]) -> Iterator[PaymentRow]:
+    """Payment models as ledger rows, in the same order."""
+    for p in payments:
+        created = p.created_at if p.created_at.tzinfo else p.created_at.replace(tzinfo=timezone.utc)
+        yield PaymentRow(
+            created_at=created,
+            amount_cents=p.amount_cents,
+            currency=p.currency,
+            direction=p.direction,
+            counterparty=p.counterparty,
+            description=p.description,
+            status=PaymentStatus(p.status).value,
+            external_id=p.external_id,
+        )
+
+
+class LedgerPayments(Sequence):
+    """Read-only sequence of Payment models over a mapped ledger; models are built on access.
+
+    Ids are derived from the ledger version and row index, so every worker
+    hands out the same id for the same row.
+    """
+
+    def __init__(self, columns: LedgerColumns, version: int):
+        self.columns = columns
+        self.version = version
+
+    def __len__(self) -> int:
+        return self.columns.row_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._payment(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ledger index out of range")
+        return self._payment(index)
+
+    def __iter__(self) -> Iterator[Payment]:
+        for i in range(len(self)):
+            yield self._payment(i)
+
+    def _payment(self, i: int) -> Payment:
+        row = self.columns.row(i)
+        return Payment.model_construct(
+            id=UUID(int=(self.version << 64) | i),
+            amount_cents=row.amount_cents,
+            currency=row.currency,
+            direction=row.direction,
+            counterparty=row.counterparty,
+            description=row.description,
+            status=_STATUS_MODELS[self.columns.status[i]],
+            created_at=row.created_at,
+            updated_at=None,
+            external_id=row.external_id,
+        )
+
+    def direction_totals(self) -> Tuple[int, int]:
+        """Summed ``amount_cents`` of inbound and of outbound rows, straight from the columns."""
+        amounts = np.frombuffer(self.columns.amount_cents, dtype=np.int64)
+        directions = np.frombuffer(self.columns.direction, dtype=np.uint8)
+        return tuple(int(amounts[directions == DIRECTIONS.index(d)].sum()) for d in ("inbound", "outbound"))
+
+    def select(self, direction: Optional[str], status: Optional[PaymentStatus], limit: int) -> List[Payment]:
+        """First ``limit`` payments matching the filters, scanning the enum columns without building models."""
+        if direction is not None and direction not in DIRECTIONS:
+            return []
+        want_direction = DIRECTIONS.index(direction) if direction is not None else None
+        want_status = STATUSES.index(PaymentStatus(status).value) if status is not None else None
+        directions, statuses = self.columns.direction, self.columns.status
+        out = []
+        for i in range(len(self)):
+            if want_direction is not None and directions[i] != want_direction:
+                continue
+            if want_status is not None and statuses[i] != want_status:
+                continue
+            out.append(self._payment(i))
+            if len(out) >= limit:
+                break
+        return out
+
+
+class SharedLedger:
+    """A directory of versioned ledger segments plus the mapped ``version`` word."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock_path = self.directory / "lock"
+        self._members_path = self.directory / "members"
+        self._member = None  # open ``members`` file, share-locked while this worker runs
+        version_path = self.directory / "version"
+        with self._exclusive():
+            if not version_path.exists() or version_path.stat().st_size < _VERSION.size:
+                version_path.write_bytes(_VERSION.pack(0))
+        with open(version_path, "r+b") as f:
+            self._version_map = mmap.mmap(f.fileno(), _VERSION.size)
+
+    def version(self) -> int:
+        """Latest published version; 0 when nothing has been published yet."""
+        return _VERSION.unpack_from(self._version_map, 0)[0]
+
+    def publish(self, rows: Iterable[PaymentRow]) -> int:
+        """Publish ``rows`` as the next version and return it."""
+        data = encode_ledger(rows)
+        with self._exclusive():
+            self._join_locked()
+            return self._publish_locked(data)
+
+    def load_or_publish(self, load: Callable[[], Iterable[PaymentRow]]) -> int:
+        """Current version, first publishing ``load()`` if no worker of this run has yet. Only one worker loads."""
+        if self._member is not None:
+            return self.version()
+        with self._exclusive():
+            if self._join_locked() or not self.version():
+                try:
+                    return self._publish_locked(encode_ledger(load()))
+                except BaseException:
+                    self._leave()  # so the next attempt still replaces the stale ledger
+                    raise
+            return self.version()
+
+    def attach(self) -> LedgerPayments:
+        """Map the latest published segment read-only."""
+        for _ in range(_ATTACH_ATTEMPTS):
+            version = self.version()
+            try:
+                with open(self._segment(version), "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                continue  # superseded while we were opening it; read the version again
+            return LedgerPayments(LedgerColumns(mapped), version)
+        raise RuntimeError(f"Could not attach a ledger segment in {self.directory}")
+
+    def _join_locked(self) -> bool:
+        """Register this worker as running; True if no other worker is, i.e. any ledger here is stale."""
+        if self._member is not None:
+            return False
+        member = open(self._members_path, "a+b")
+        try:
+            fcntl.flock(member, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            first = True
+        except BlockingIOError:
+            first = False
+        # Every running worker holds it shared; the exclusive lock above only
+        # succeeds once all of them (e.g. the previous run's) have exited.
+        fcntl.flock(member, fcntl.LOCK_SH)
+        self._member = member
+        return first
+
+    def _leave(self) -> None:
+        if self._member is not None:
+            self._member.close()
+            self._member = None
+
+    def _publish_locked(self, data: bytes) -> int:
+        version = self.version() + 1
+        path = self._segment(version)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        _VERSION.pack_into(self._version_map, 0, version)
+        # Keep the previous segment so a reader that just read the old version can still open it.
+        for old in self.directory.glob("ledger-*.ledger"):
+            if int(old.stem.split("-")[1]) < version - 1:
+                old.unlink(missing_ok=True)
+        return version
+
+    def _segment(self, version: int) -> Path:
+        return self.directory / f"ledger-{version:010d}.ledger"
+
+    @contextmanager
+    def _exclusive(self):
+        """Cross-process lock so only one worker publishes at a time."""
+        with open(self._lock_path, "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
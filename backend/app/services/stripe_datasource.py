@@ -1,13 +1,17 @@
 """Load payments from stripe-mock and map to our Payment model."""
+import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 from uuid import uuid4
 
 import httpx
 
+from app.concurrency import run_cpu
 from app.config import settings
 from app.models.payment import Payment, PaymentStatus
+from app.services import reconciliation
 
 logger = logging.getLogger(__name__)
 
@@ -82,33 +86,163 @@ def _map_balance_transaction(bt: dict) -> Payment:
     )
 
 
-def load_payments_from_stripe_mock() -> List[Payment]:
-    """Fetch charges and balance transactions from stripe-mock and map to Payment objects."""
-    base = settings.stripe_mock_url
-    headers = {"Authorization": "Bearer sk_test_mock"}
-    payments: List[Payment] = []
+_PAGE_SIZE = 100  # Stripe's maximum page size
+_CONCURRENT_REQUESTS = 8  # payout listings in flight at once
+
+
+class StripeObjects(NamedTuple):
+    charges: List[dict]
+    balance_transactions: List[dict]
+    payouts: List[dict]
+    payout_members: Dict[str, str]  # balance transaction id -> payout id
 
-    try:
-        # Fetch charges
-        resp = httpx.get(f"{base}/v1/charges", headers=headers, timeout=5.0)
-        if resp.status_code == 200:
-            data = resp.json().get("data", [])
-            for charge in data:
-                payments.append(_map_charge(charge))
-
-        # Fetch balance transactions
-        resp = httpx.get(f"{base}/v1/balance_transactions", headers=headers, timeout=5.0)
-        if resp.status_code == 200:
-            data = resp.json().get("data", [])
-            for bt in data:
-                payments.append(_map_balance_transaction(bt))
 
+def _client_options() -> dict:
+    return {
+        "base_url": settings.stripe_mock_url,
+        "headers": {"Authorization": "Bearer sk_test_mock"},
+        "timeout": 5.0,
+    }
+
+
+def _next_page(path: str, resp: httpx.Response, params: dict) -> Tuple[List[dict], bool]:
+    """The objects on one list page, and whether to fetch another (``params`` is advanced in place).
+
+    A failed page raises ``httpx.HTTPStatusError``: stopping quietly would
+    hand back a truncated list, which reconciles into spurious unmatched items.
+    """
+    if resp.status_code != 200:
+        raise httpx.HTTPStatusError(
+            f"stripe-mock {path} returned {resp.status_code}", request=resp.request, response=resp,
+        )
+    body = resp.json()
+    data = body.get("data", [])
+    if not body.get("has_more") or not data or data[-1].get("id") == params.get("starting_after"):
+        return data, False
+    params["starting_after"] = data[-1]["id"]
+    return data, True
+
+
+def _list_all(client: httpx.Client, path: str, params: Optional[dict] = None) -> Iterator[dict]:
+    """Every object of a Stripe list endpoint, following ``starting_after`` cursors."""
+    params = {**(params or {}), "limit": _PAGE_SIZE}
+    more = True
+    while more:
+        data, more = _next_page(path, client.get(path, params=params), params)
+        yield from data
+
+
+async def _list_all_async(client: httpx.AsyncClient, path: str, params: Optional[dict] = None) -> List[dict]:
+    params = {**(params or {}), "limit": _PAGE_SIZE}
+    out: List[dict] = []
+    more = True
+    while more:
+        data, more = _next_page(path, await client.get(path, params=params), params)
+        out.extend(data)
+    return out
+
+
+def _itemized(payouts: List[dict]) -> List[str]:
+    """Ids of the payouts whose member transactions can be listed.
+
+    Stripe lists the transactions behind automatic payouts only, and has no
+    listing across payouts, so each of these costs its own (paginated) request.
+    """
+    return [payout["id"] for payout in payouts if payout.get("automatic", True)]
+
+
+def _members(listings: Iterable[Tuple[str, List[dict]]]) -> Dict[str, str]:
+    payout_members: Dict[str, str] = {}
+    for payout_id, bts in listings:
+        for bt in bts:
+            payout_members[bt["id"]] = payout_id
+    return payout_members
+
+
+def fetch_stripe_objects() -> StripeObjects:
+    """Fetch charges, balance transactions and payouts, plus which transactions each payout paid out.
+
+    The per-payout listings run ``_CONCURRENT_REQUESTS`` at a time on one client.
+    """
+    with httpx.Client(**_client_options()) as client:
+        charges = list(_list_all(client, "/v1/charges"))
+        balance_transactions = list(_list_all(client, "/v1/balance_transactions"))
+        payouts = list(_list_all(client, "/v1/payouts"))
+
+        def members(payout_id: str) -> Tuple[str, List[dict]]:
+            return payout_id, list(_list_all(client, "/v1/balance_transactions", {"payout": payout_id}))
+
+        with ThreadPoolExecutor(max_workers=_CONCURRENT_REQUESTS, thread_name_prefix="stripe-payouts") as pool:
+            payout_members = _members(pool.map(members, _itemized(payouts)))
+    return StripeObjects(charges, balance_transactions, payouts, payout_members)
+
+
+async def fetch_stripe_objects_async() -> StripeObjects:
+    """:func:`fetch_stripe_objects` without blocking: the three lists and the payout listings run concurrently."""
+    async with httpx.AsyncClient(**_client_options()) as client:
+        charges, balance_transactions, payouts = await asyncio.gather(
+            _list_all_async(client, "/v1/charges"),
+            _list_all_async(client, "/v1/balance_transactions"),
+            _list_all_async(client, "/v1/payouts"),
+        )
+        in_flight = asyncio.Semaphore(_CONCURRENT_REQUESTS)
+
+        async def members(payout_id: str) -> Tuple[str, List[dict]]:
+            async with in_flight:
+                return payout_id, await _list_all_async(client, "/v1/balance_transactions", {"payout": payout_id})
+
+        listings = await asyncio.gather(*(members(payout_id) for payout_id in _itemized(payouts)))
+    return StripeObjects(charges, balance_transactions, payouts, _members(listings))
+
+
+def _payments_from_objects(objects: StripeObjects) -> List[Payment]:
+    """Reconcile ``objects`` (publishing the result) and map them to payments, newest first.
+
+    A charge's own balance transaction is the same money as the charge, so it
+    is collapsed into the charge rather than counted as a second inflow.
+    """
+    result = reconciliation.reconcile(*objects)
+    reconciliation.publish(result)
+    payments = [_map_charge(charge) for charge in objects.charges]
+    payments.extend(
+        _map_balance_transaction(bt)
+        for bt in objects.balance_transactions
+        if bt["id"] not in result.duplicate_transactions
+    )
+    if result.duplicate_transactions:
+        logger.info("Collapsed %d balance transactions into their charges", len(result.duplicate_transactions))
+
+    payments.sort(key=lambda p: p.created_at, reverse=True)
+    return payments
+
+
+def load_payments_from_stripe_mock() -> List[Payment]:
+    """Fetch Stripe objects from stripe-mock, reconcile them and map to Payment objects."""
+    try:
+        objects = fetch_stripe_objects()
     except httpx.ConnectError:
-        logger.warning("Could not connect to stripe-mock at %s. Is it running?", base)
+        logger.warning("Could not connect to stripe-mock at %s. Is it running?", settings.stripe_mock_url)
+        return []
+    except httpx.HTTPStatusError as e:
+        logger.warning("Incomplete fetch from stripe-mock: %s", e)
         return []
     except Exception:
         logger.exception("Error fetching from stripe-mock")
         return []
+    return _payments_from_objects(objects)
 
-    payments.sort(key=lambda p: p.created_at, reverse=True)
-    return payments
+
+async def load_payments_from_stripe_mock_async() -> List[Payment]:
+    """:func:`load_payments_from_stripe_mock` with non-blocking fetches; mapping runs on the CPU executor."""
+    try:
+        objects = await fetch_stripe_objects_async()
+    except httpx.ConnectError:
+        logger.warning("Could not connect to stripe-mock at %s. Is it running?", settings.stripe_mock_url)
+        return []
+    except httpx.HTTPStatusError as e:
+        logger.warning("Incomplete fetch from stripe-mock: %s", e)
+        return []
+    except Exception:
+        logger.exception("Error fetching from stripe-mock")
+        return []
+    return await run_cpu(_payments_from_objects, objects)
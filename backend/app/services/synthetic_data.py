@@ -0,0 +1,230 @@
+"""Deterministic synthetic payments and inventory for demos and load testing.
+
+The same seed always yields the same data. Payments follow a simple but
+realistic business calendar:
+
+- recurring outflows on fixed days: rent, cloud bills, SaaS, semi-monthly
+  payroll, quarterly insurance and tax reserve
+- recurring inflows: weekly Stripe payouts and monthly subscription revenue
+- day-to-day customer invoices and vendor spend, weighted by month
+  (seasonality) and weekday, from a long-tailed set of repeat counterparties
+
+Recurring amounts are sized from the organic volume, so the ledger keeps a
+plausible margin at any scale. Rows are produced day by day as
+``PaymentRow`` tuples (no Pydantic), so millions can be streamed straight
+to a file writer.
+"""
+import calendar
+import math
+import random
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from app.services.payment_files import PaymentRow
+
+# Relative activity by month (Jan..Dec) and weekday (Mon..Sun).
+_MONTH_WEIGHT = (0.85, 0.8, 0.95, 1.0, 1.0, 0.9, 0.85, 0.9, 1.05, 1.1, 1.3, 1.45)
+_WEEKDAY_WEIGHT = (1.1, 1.15, 1.15, 1.1, 1.05, 0.35, 0.25)
+
+_CUSTOMER_NAMES = (
+    "Acme Corp", "Beta LLC", "Startup XYZ", "GlobalTech Inc", "Partner Revenue",
+    "Marketplace Settlement", "Northwind Traders", "Initech", "Umbrella Group", "Globex",
+)
+_VENDOR_NAMES = (
+    "Vendor A", "Vendor B", "Marketing Spend", "Office Supplies", "Domain Registrar",
+    "Contractor Services", "Shipping Co", "Legal Counsel", "Travel", "Hardware Supplier",
+)
+_VENDOR_DESCRIPTIONS = (
+    "Contractor payment", "Marketing campaign", "Office supplies", "Platform fees",
+    "Processing fees", "Shipping", "Professional services", "Equipment purchase",
+)
+
+# (counterparty, direction, description, share of 30 days of organic inflow, schedule)
+# schedule: ("monthly", day) | ("semimonthly",) | ("quarterly", day, months) | ("weekly", weekday)
+_RECURRING = (
+    ("Office Rent", "outbound", "Office rent", 0.06, ("monthly", 1)),
+    ("AWS", "outbound", "Infrastructure costs", 0.05, ("monthly", 3)),
+    ("Google Cloud", "outbound", "Infrastructure costs", 0.02, ("monthly", 5)),
+    ("SaaS Tools", "outbound", "Monthly SaaS subscription", 0.015, ("monthly", 10)),
+    ("Payroll", "outbound", "Payroll", 0.2, ("semimonthly",)),
+    ("Insurance", "outbound", "Insurance premium", 0.03, ("quarterly", 20, (1, 4, 7, 10))),
+    ("Tax Reserve", "outbound", "Quarterly estimated tax", 0.08, ("quarterly", 15, (1, 4, 6, 9))),
+    ("Stripe Payout", "inbound", "Weekly payout", 0.12, ("weekly", 0)),
+    ("Subscription Revenue", "inbound", "Subscription revenue", 0.15, ("monthly", 1)),
+)
+
+_INBOUND_SHARE = 0.7
+_INBOUND_MEDIAN_CENTS = 45_000
+_OUTBOUND_MEDIAN_CENTS = 12_000
+_AMOUNT_SIGMA = 0.9
+
+
+def _recurring_on(day: date) -> List[Tuple[str, str, str, float]]:
+    out = []
+    last_day = calendar.monthrange(day.year, day.month)[1]
+    for name, direction, description, share, schedule in _RECURRING:
+        kind = schedule[0]
+        if kind == "monthly":
+            hit = day.day == min(schedule[1], last_day)
+        elif kind == "semimonthly":
+            hit = day.day in (15, last_day)
+        elif kind == "quarterly":
+            hit = day.month in schedule[2] and day.day == schedule[1]
+        else:  # weekly
+            hit = day.weekday() == schedule[1]
+        if hit:
+            # Monthly share spread over the number of occurrences per month.
+            per_month = {"monthly": 1, "semimonthly": 2, "quarterly": 1 / 3, "weekly": 4.33}[kind]
+            out.append((name, direction, description, share / per_month))
+    return out
+
+
+def _day_weight(day: date) -> float:
+    return _MONTH_WEIGHT[day.month - 1] * _WEEKDAY_WEIGHT[day.weekday()]
+
+
+def _quotas(total: int, days: List[date]) -> List[int]:
+    """Split ``total`` across ``days`` proportionally to their weight, exactly (largest remainder)."""
+    if not days:
+        return []
+    weights = [_day_weight(d) for d in days]
+    scale = total / sum(weights)
+    raw = [w * scale for w in weights]
+    quotas = [int(r) for r in raw]
+    short = total - sum(quotas)
+    by_remainder = sorted(range(len(days)), key=lambda i: raw[i] - quotas[i], reverse=True)
+    for i in by_remainder[:short]:
+        quotas[i] += 1
+    return quotas
+
+
+def _counterparty_pool(names: Tuple[str, ...], size: int, prefix: str) -> List[str]:
+    return list(names) + [f"{prefix} {i:05d}" for i in range(max(0, size - len(names)))]
+
+
+def generate_payment_rows(
+    count: int,
+    seed: int = 0,
+    end: Optional[datetime] = None,
+    days: int = 730,
+) -> Iterator[PaymentRow]:
+    """Yield exactly ``count`` payments over the ``days`` ending at ``end`` (default: now), oldest first."""
+    rng = random.Random(seed)
+    end = end or datetime.now(timezone.utc)
+    end_day = end.date()
+    calendar_days = [end_day - timedelta(days=days - 1 - i) for i in range(days)]
+
+    recurring = [(day, r) for day in calendar_days for r in _recurring_on(day)]
+    # Small ledgers keep a mix: recurring payments never take more than half.
+    if len(recurring) > count // 2:
+        keep = sorted(rng.sample(range(len(recurring)), count // 2))
+        recurring = [recurring[i] for i in keep]
+    organic_quotas = _quotas(count - len(recurring), calendar_days)
+
+    # Recurring amounts scale with the organic inflow they are a share of.
+    organic_per_day = (count - len(recurring)) / max(1, days)
+    mean_inflow = _INBOUND_MEDIAN_CENTS * math.exp(_AMOUNT_SIGMA ** 2 / 2)
+    monthly_inflow = max(100_000, organic_per_day * _INBOUND_SHARE * mean_inflow * 30)
+
+    customers = _counterparty_pool(_CUSTOMER_NAMES, max(50, count // 400), "Customer")
+    vendors = _counterparty_pool(_VENDOR_NAMES, max(20, count // 2000), "Vendor")
+    # Zipf-like weights: a few big repeat customers, a long tail.
+    customer_weights = [1 / (i + 1) for i in range(len(customers))]
+    vendor_weights = [1 / (i + 1) for i in range(len(vendors))]
+    customer_cum = _cumulative(customer_weights)
+    vendor_cum = _cumulative(vendor_weights)
+
+    recurring_by_day: dict = {}
+    for day, r in recurring:
+        recurring_by_day.setdefault(day, []).append(r)
+
+    seq = 0
+    invoice = 1000
+    recent_cutoff = end_day - timedelta(days=3)
+    for day, organic in zip(calendar_days, organic_quotas):
+        day_start = datetime.combine(day, time(), tzinfo=timezone.utc)
+        label = day.strftime("%b %d")
+        rows = []
+        for name, direction, description, share in recurring_by_day.get(day, ()):
+            amount = int(monthly_inflow * share * rng.uniform(0.97, 1.03))
+            at = day_start + timedelta(hours=9, minutes=rng.randrange(60))
+            rows.append((at, amount, direction, name, f"{description} — {label}"))
+        for _ in range(organic):
+            at = day_start + timedelta(seconds=rng.randrange(6 * 3600, 22 * 3600))
+            if rng.random() < _INBOUND_SHARE:
+                amount = int(rng.lognormvariate(math.log(_INBOUND_MEDIAN_CENTS), _AMOUNT_SIGMA))
+                invoice += 1
+                rows.append((at, amount, "inbound", _pick(rng, customers, customer_cum), f"Invoice #{invoice}"))
+            else:
+                amount = int(rng.lognormvariate(math.log(_OUTBOUND_MEDIAN_CENTS), _AMOUNT_SIGMA))
+                rows.append((at, amount, "outbound", _pick(rng, vendors, vendor_cum), rng.choice(_VENDOR_DESCRIPTIONS)))
+        rows.sort(key=lambda r: r[0])
+        for at, amount, direction, counterparty, description in rows:
+            yield PaymentRow(
+                created_at=min(at, end),
+                amount_cents=max(100, amount),
+                currency="USD",
+                direction=direction,
+                counterparty=counterparty,
+                description=description,
+                status=_status(rng, day >= recent_cutoff),
+                external_id=f"syn_{seed}_{seq:08d}",
+            )
+            seq += 1
+
+
+def _cumulative(weights: List[float]) -> List[float]:
+    total = 0.0
+    out = []
+    for w in weights:
+        total += w
+        out.append(total)
+    return out
+
+
+def _pick(rng: random.Random, values: List[str], cumulative: List[float]) -> str:
+    return rng.choices(values, cum_weights=cumulative)[0]
+
+
+def _status(rng: random.Random, recent: bool) -> str:
+    roll = rng.random()
+    if recent and roll < 0.3:
+        return "pending"
+    if roll < 0.93:
+        return "completed"
+    if roll < 0.97:
+        return "failed"
+    if roll < 0.99:
+        return "refunded"
+    return "pending"
+
+
+# ── Inventory ──
+
+_CATEGORIES = (
+    ("Shirts", 3499), ("Shorts", 3999), ("Skirts", 4499), ("Dresses", 6999), ("Equipment", 8999),
+    ("Accessories", 2499), ("Paddles", 12999), ("Balls", 1299), ("Bags", 5999), ("Shoes", 10999),
+)
+_COLORS = ("Blue", "White", "Black", "Navy", "Teal", "Red", "Green", "Grey", "Pink", "Orange")
+
+
+def generate_inventory_rows(count: int, seed: int = 0) -> List[list]:
+    """``count`` items as inventory snapshot rows:
+    ``[id, name, category, sku, quantity, low_stock_threshold, unit_price_cents]``."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        category, base_price = _CATEGORIES[i % len(_CATEGORIES)]
+        color = _COLORS[(i // len(_CATEGORIES)) % len(_COLORS)]
+        threshold = rng.choice((5, 10, 10, 15, 20))
+        rows.append([
+            str(UUID(int=rng.getrandbits(128), version=4)),
+            f"{category[:-1] if category.endswith('s') else category} {i:06d} - {color}",
+            category,
+            f"SYN-{category[:3].upper()}-{i:06d}",
+            max(0, int(rng.lognormvariate(math.log(threshold * 3), 0.8))),
+            threshold,
+            int(base_price * rng.uniform(0.7, 1.5)),
+        ])
+    return rows
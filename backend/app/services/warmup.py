@@ -0,0 +1,129 @@
+"""Startup warm-up and the readiness state behind ``/ready``.
+
+Stores load lazily on first use, which with the Stripe datasource means the
+first request waits out the HTTP fetches and a full parse. Warm-up does that
+work in a background thread at boot: it loads the payment and inventory
+stores (building their indexes), builds the cash flow rollups (which also
+serve the summary) with the anomalies and forecast cached on them,
+pre-encodes the default payments page, builds the payment search index and
+pre-renders the copilot context. ``/ready`` reports not-ready until every
+step has finished.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+_LOCK = threading.Lock()
+_STATE: Dict[str, object] = {"status": PENDING, "steps": {}, "error": None, "started_at": None, "seconds": None}
+
+
+def _load_payments() -> None:
+    from app.services.payment_store import get_payment_store
+
+    get_payment_store()
+
+
+def _load_inventory() -> None:
+    from app.services.inventory_store import get_inventory_store
+
+    get_inventory_store()
+
+
+def _cashflow_anomalies() -> None:
+    from app.services.cashflow_anomalies import get_anomalies
+
+    get_anomalies(limit=0)  # builds the rollups, then runs detection over them
+
+
+def _cashflow_forecast() -> None:
+    from app.services.cashflow_forecast import get_forecast
+
+    get_forecast(90)  # the API and copilot default horizon
+
+
+def _payments_page() -> None:
+    from app.serialization import payments_response
+    from app.services.payment_store import get_payment_store
+
+    payments_response(get_payment_store().list(limit=500))
+
+
+def _payment_search() -> None:
+    from app.services.payment_search import get_search_index
+
+    get_search_index()
+
+
+def _copilot_context() -> None:
+    from app.services.copilot_service import _build_inventory_context, _build_payments_context
+
+    _build_payments_context()
+    _build_inventory_context()
+
+
+# Run in order; later steps reuse what earlier ones loaded.
+_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("payments", _load_payments),
+    ("inventory", _load_inventory),
+    ("cashflow_anomalies", _cashflow_anomalies),
+    ("cashflow_forecast", _cashflow_forecast),
+    ("payments_page", _payments_page),
+    ("payment_search", _payment_search),
+    ("copilot_context", _copilot_context),
+]
+
+
+def run() -> None:
+    """Run every warm-up step in this thread, recording per-step timings."""
+    with _LOCK:
+        if _STATE["status"] in (WARMING, READY):
+            return
+        _STATE.update(status=WARMING, steps={}, error=None, started_at=time.time(), seconds=None)
+    started = time.perf_counter()
+    step: Optional[str] = None
+    try:
+        for step, fn in _STEPS:
+            step_started = time.perf_counter()
+            with timed(f"warmup_{step}"):
+                fn()
+            _STATE["steps"][step] = round(time.perf_counter() - step_started, 4)
+    except Exception as e:
+        logger.exception("Warm-up failed at step %s", step)
+        with _LOCK:
+            _STATE.update(status=FAILED, error=f"{step}: {e}", seconds=round(time.perf_counter() - started, 4))
+        return
+    with _LOCK:
+        _STATE.update(status=READY, seconds=round(time.perf_counter() - started, 4))
+    logger.info("Warm-up finished in %.2fs", _STATE["seconds"])
+
+
+def start() -> threading.Thread:
+    """Run warm-up in a background daemon thread so the server starts accepting connections at once."""
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def mark_ready() -> None:
+    """Skip warm-up (stores keep loading lazily on first request)."""
+    with _LOCK:
+        _STATE.update(status=READY, seconds=0.0)
+
+
+def is_ready() -> bool:
+    return _STATE["status"] == READY
+
+
+def status() -> dict:
+    with _LOCK:
+        return {**_STATE, "steps": dict(_STATE["steps"])}
@@ -0,0 +1 @@
+# Reproducible performance benchmarks (run: python -m benchmarks.run)
@@ -0,0 +1,92 @@
+"""Seeded synthetic payments and inventory for benchmarks."""
+import random
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+from uuid import UUID
+
+from app.models.inventory import InventoryItem
+from app.models.payment import Payment
+from app.services.datasource import _rows_to_payments
+from app.services.synthetic_data import generate_payment_rows
+
+LEDGER_END = datetime(2025, 12, 31, 23, 59, 59, tzinfo=timezone.utc)
+
+
+def make_payments(count: int, days: int = 730, seed: int = 0) -> List[Payment]:
+    """``count`` synthetic payments over the ``days`` ending 2025-12-31, newest first."""
+    rows = generate_payment_rows(count, seed=seed, end=LEDGER_END, days=days)
+    return _rows_to_payments(rows, validate=False)
+
+
+def payments_to_json_rows(payments: List[Payment]) -> list:
+    """Rows in the shape of data/sample_payments.json."""
+    return [
+        {
+            "amount_cents": p.amount_cents,
+            "currency": p.currency,
+            "direction": p.direction,
+            "counterparty": p.counterparty,
+            "description": p.description,
+            "status": p.status.value,
+            "created_at": p.created_at.isoformat(),
+            "external_id": p.external_id,
+        }
+        for p in payments
+    ]
+
+
+def make_inventory(count: int, quantity: int, seed: int = 0) -> List[InventoryItem]:
+    rng = random.Random(seed)
+    return [
+        InventoryItem(
+            id=UUID(int=rng.getrandbits(128), version=4),
+            name=f"Benchmark Item {i:06d}",
+            category=f"Category {i % 20}",
+            sku=f"BN-{i:06d}",
+            quantity=quantity,
+            low_stock_threshold=10,
+            unit_price_cents=rng.randint(500, 20_000),
+        )
+        for i in range(count)
+    ]
+
+
+def make_stripe_objects(charges: int, per_payout: int = 1_000, seed: int = 0) -> Tuple[list, list, list, Dict[str, str]]:
+    """Charges, balance transactions, payouts and payout membership in Stripe's list shapes.
+
+    Every charge has its balance transaction and every ``per_payout`` of them
+    are paid out together; a few charges and payouts are left unmatched.
+    """
+    rng = random.Random(seed)
+    end = int(LEDGER_END.timestamp())
+    charge_list, bts, payouts, members = [], [], [], {}
+    for i in range(charges):
+        amount = rng.randint(500, 50_000)
+        fee = amount * 29 // 1000 + 30
+        created = end - (charges - i) * 60
+        charge_list.append({
+            "id": f"ch_{i:08d}", "object": "charge", "amount": amount, "currency": "usd",
+            "status": "succeeded", "captured": True, "created": created, "balance_transaction": f"txn_ch_{i:08d}",
+        })
+        if i % 10_000 == 9_999:
+            continue  # settled charge whose transaction is missing
+        bts.append({
+            "id": f"txn_ch_{i:08d}", "object": "balance_transaction", "type": "charge", "source": f"ch_{i:08d}",
+            "amount": amount, "fee": fee, "net": amount - fee, "currency": "usd", "created": created,
+        })
+    settled = list(bts)
+    for start in range(0, len(settled), per_payout):
+        batch = settled[start:start + per_payout]
+        payout_id = f"po_{start // per_payout:06d}"
+        net = sum(bt["net"] for bt in batch)
+        for bt in batch:
+            members[bt["id"]] = payout_id
+        payouts.append({
+            "id": payout_id, "object": "payout", "amount": net, "currency": "usd", "status": "paid",
+            "arrival_date": batch[-1]["created"] + 2 * 86_400, "balance_transaction": f"txn_{payout_id}",
+        })
+        bts.append({
+            "id": f"txn_{payout_id}", "object": "balance_transaction", "type": "payout", "source": payout_id,
+            "amount": -net, "fee": 0, "net": -net, "currency": "usd", "created": batch[-1]["created"],
+        })
+    return charge_list, bts, payouts, members
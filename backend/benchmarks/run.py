@@ -0,0 +1,315 @@
+"""Benchmark suite for the stores, cash flow aggregation, copilot context and HTTP layer.
+
+Generates seeded ledgers and inventories, times the hot paths and writes the
+results as JSON so runs can be compared across commits.
+
+Usage (from backend/):
+    python -m benchmarks.run                          # 10k, 100k and 1M payments
+    python -m benchmarks.run --sizes 10000 --repeat 3 # quick run
+    python -m benchmarks.run --compare benchmarks/results/<old>.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from benchmarks.data import LEDGER_END, make_inventory, make_payments, make_stripe_objects, payments_to_json_rows
+
+_RESULTS_DIR = Path(__file__).resolve().parent / "results"
+_LEDGER_END = LEDGER_END.date()
+
+
+def measure(fn: Callable[[], object], repeat: int, number: int = 1) -> Dict[str, float]:
+    """Time ``number`` calls of ``fn`` ``repeat`` times after one warm-up call; per-call milliseconds."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) * 1000 / number)
+    return {
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "runs": repeat,
+        "calls_per_run": number,
+    }
+
+
+def _install_payments(payments) -> None:
+    from app.services import payment_store
+
+    payment_store._install(payments)
+
+
+def bench_payments(results: dict, size: int, repeat: int) -> None:
+    from app.models.payment import PaymentStatus
+    from app.services.cashflow_service import get_cashflow_summary
+    from app.services.copilot_service import _render_payments_context
+    from app.services.datasource import _load_json_payments
+    from app.services.payment_store import get_payment_store
+
+    payments = make_payments(size)
+    _install_payments(payments)
+    store = get_payment_store()
+    prefix = f"payments_{size}"
+
+    filters = {
+        "none": {},
+        "direction": {"direction": "outbound"},
+        "status": {"status": PaymentStatus.pending},
+        "direction_status": {"direction": "inbound", "status": PaymentStatus.completed},
+    }
+    for name, kwargs in filters.items():
+        results[f"{prefix}.store_list.{name}"] = measure(lambda: store.list(limit=500, **kwargs), repeat)
+
+    short_start = _LEDGER_END.replace(day=24)
+    long_start = _LEDGER_END.replace(year=_LEDGER_END.year - 1)
+    results[f"{prefix}.cashflow_summary.7d"] = measure(
+        lambda: get_cashflow_summary(start=short_start, end=_LEDGER_END), repeat,
+    )
+    results[f"{prefix}.cashflow_summary.365d"] = measure(
+        lambda: get_cashflow_summary(start=long_start, end=_LEDGER_END), repeat,
+    )
+    results[f"{prefix}.build_payments_context"] = measure(_render_payments_context, repeat)
+
+    from app.services.cashflow_rollups import CashFlowRollups
+
+    results[f"{prefix}.rollups_build"] = measure(lambda: CashFlowRollups(0, payments), max(1, repeat // 2))
+    rollups = CashFlowRollups(0, payments)
+    from app.services.cashflow_anomalies import _daily, detect, find_recurring
+
+    recurring = find_recurring(rollups)
+    results[f"{prefix}.anomalies.daily"] = measure(lambda: _daily(rollups, recurring), repeat)
+    results[f"{prefix}.anomalies.detect_all"] = measure(lambda: detect(rollups), max(1, repeat // 2))
+    from app.services.cashflow_forecast import build_forecast
+
+    results[f"{prefix}.forecast.90d"] = measure(lambda: build_forecast(rollups, 90, None), repeat)
+    results[f"{prefix}.top_counterparties.90d"] = measure(
+        lambda: rollups.top_counterparties(_LEDGER_END.replace(month=10, day=1), _LEDGER_END, "outbound", 10), repeat,
+    )
+
+    from app.services.payment_search import PaymentSearchIndex, search_payments
+
+    def build_index():
+        PaymentSearchIndex(0, payments).add(payments)
+
+    results[f"{prefix}.search_index_build"] = measure(build_index, max(1, repeat // 2))
+    for name, kwargs in {
+        "word": {"q": "payroll"},
+        "prefix": {"q": "inv"},
+        "infix": {"q": "voice"},
+        "two_terms_filtered": {"q": "customer 0001", "status": PaymentStatus.completed},
+        "no_match_filtered": {"q": "vendor", "direction": "inbound"},
+    }.items():
+        results[f"{prefix}.search.{name}"] = measure(lambda: search_payments(**kwargs), repeat, number=20)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "payments.json"
+        path.write_text(json.dumps(payments_to_json_rows(payments)))
+        results[f"{prefix}.load_json_payments"] = measure(lambda: _load_json_payments(path), max(1, repeat // 2))
+
+    bench_serialization(results, prefix, payments[:500], repeat)
+    bench_http(results, prefix, repeat)
+    bench_reconciliation(results, size, repeat)
+
+
+def bench_reconciliation(results: dict, charges: int, repeat: int) -> None:
+    from app.services.reconciliation import reconcile
+
+    objects = make_stripe_objects(charges)
+    results[f"payments_{charges}.reconcile"] = measure(lambda: reconcile(*objects), max(1, repeat // 2))
+
+
+def bench_serialization(results: dict, prefix: str, payments, repeat: int) -> None:
+    """Per-row cost of rendering a payments page: FastAPI's response_model path vs app.serialization."""
+    from typing import List
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from app.models.payment import Payment
+    from app.serialization import clear_payment_cache, payments_response
+
+    adapter = TypeAdapter(List[Payment])
+    rows = len(payments)
+
+    def response_model_path():
+        # What FastAPI does for a ``response_model`` route: validate, dump, encode, render.
+        return JSONResponse(jsonable_encoder(adapter.dump_python(adapter.validate_python(payments), mode="json")))
+
+    def fast_cold():
+        clear_payment_cache()
+        return payments_response(payments)
+
+    for name, fn in (
+        ("response_model", response_model_path),
+        ("fast_cold", fast_cold),
+        ("fast_cached", lambda: payments_response(payments)),
+    ):
+        entry = measure(fn, repeat, number=5)
+        entry["rows"] = rows
+        entry["us_per_row"] = entry["median_ms"] * 1000 / rows
+        results[f"{prefix}.serialize_500.{name}"] = entry
+
+
+def bench_http(results: dict, prefix: str, repeat: int) -> None:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    start = _LEDGER_END.replace(year=_LEDGER_END.year - 1).isoformat()
+    routes = {
+        "health": "/health",
+        "payments_500": "/api/v1/payments?limit=500",
+        "cashflow_summary_365d": f"/api/v1/cashflow/summary?start_date={start}&end_date={_LEDGER_END.isoformat()}",
+    }
+    for name, url in routes.items():
+        results[f"{prefix}.http.{name}"] = measure(lambda: client.get(url).raise_for_status(), repeat, number=5)
+
+
+def bench_inventory(results: dict, skus: int, threads: int, sales_per_thread: int, repeat: int) -> None:
+    from app.services import inventory_store
+
+    items = make_inventory(skus, quantity=threads * sales_per_thread * 4 + 1)
+    inventory_store._load(items)
+    store = inventory_store.get_inventory_store()
+    ids = [item.id for item in items]
+    prefix = f"inventory_{skus}"
+
+    results[f"{prefix}.get"] = measure(lambda: store.get(ids[len(ids) // 2]), repeat, number=10_000)
+    results[f"{prefix}.get_by_sku"] = measure(lambda: store.get_by_sku("BN-000042"), repeat, number=10_000)
+    results[f"{prefix}.list"] = measure(lambda: store.list(), repeat)
+
+    def run_threads(target) -> float:
+        barrier = threading.Barrier(threads + 1)
+
+        def worker(offset: int) -> None:
+            barrier.wait()
+            target(offset)
+
+        pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+        for t in pool:
+            t.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for t in pool:
+            t.join()
+        return time.perf_counter() - started
+
+    def sell(offset: int) -> None:
+        for i in range(sales_per_thread):
+            store.record_sale(ids[(offset * 7919 + i) % len(ids)], 1)
+
+    def sell_hot(offset: int) -> None:
+        for i in range(sales_per_thread):
+            store.record_sale(ids[i % 4], 1)
+
+    def sell_orders(offset: int) -> None:
+        for i in range(0, sales_per_thread, 5):
+            base = offset * 7919 + i
+            store.record_sales([(ids[(base + k) % len(ids)], 1) for k in range(5)])
+
+    total = threads * sales_per_thread
+    for name, target in (("record_sale.spread", sell), ("record_sale.hot", sell_hot), ("record_sales.5_lines", sell_orders)):
+        seconds = min(run_threads(target) for _ in range(repeat))
+        results[f"{prefix}.{name}"] = {
+            "threads": threads,
+            "lines": total,
+            "best_seconds": seconds,
+            "lines_per_sec": total / seconds,
+        }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _headline(entry: dict) -> Optional[float]:
+    """The number to compare across runs: median latency, or throughput for threaded runs."""
+    if "median_ms" in entry:
+        return entry["median_ms"]
+    return entry.get("lines_per_sec")
+
+
+def compare(current: dict, baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text())["results"]
+    print(f"\nComparison against {baseline_path}:")
+    for name, entry in current.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        new_value, old_value = _headline(entry), _headline(old)
+        if not new_value or not old_value:
+            continue
+        higher_is_better = "lines_per_sec" in entry
+        change = (new_value / old_value - 1) * 100
+        better = change > 0 if higher_is_better else change < 0
+        print(f"  {name:<55} {old_value:>12.3f} -> {new_value:>12.3f}  {change:+7.1f}% {'✓' if better else ''}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cash Flow Copilot benchmark suite")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated ledger sizes")
+    parser.add_argument("--skus", type=int, default=10_000, help="Inventory size")
+    parser.add_argument("--threads", type=int, default=8, help="Threads for record_sale throughput")
+    parser.add_argument("--sales", type=int, default=5_000, help="Sales per thread")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--out", type=Path, default=None, help="Result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    results: dict = {}
+    for size in (int(s) for s in args.sizes.split(",") if s):
+        print(f"Benchmarking ledger of {size:,} payments...", flush=True)
+        bench_payments(results, size, args.repeat)
+    print(f"Benchmarking inventory of {args.skus:,} SKUs...", flush=True)
+    bench_inventory(results, args.skus, args.threads, args.sales, args.repeat)
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "args": {k: str(v) for k, v in vars(args).items()},
+        },
+        "results": results,
+    }
+    out = args.out or _RESULTS_DIR / f"{commit or 'local'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+
+    for name, entry in results.items():
+        if "us_per_row" in entry:
+            print(f"  {name:<55} {entry['median_ms']:>12.3f} ms  ({entry['us_per_row']:.2f} us/row)")
+        elif "median_ms" in entry:
+            print(f"  {name:<55} {entry['median_ms']:>12.3f} ms")
+        else:
+            print(f"  {name:<55} {entry['lines_per_sec']:>12,.0f} lines/s")
+    print(f"Results written to {out}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Generate deterministic synthetic payments and inventory for load testing.
+
+Works offline (no stripe-mock). The same --seed always produces the same data.
+Payments are streamed to JSON, NDJSON or the binary ledger format depending on
+the output suffix; inventory is written as a snapshot into an inventory data
+directory, which the service loads on startup when INVENTORY_DATA_DIR points at it.
+
+Usage:
+    python -m scripts.generate_data --payments 1000000 --out data/payments_1m.ledger
+    python -m scripts.generate_data --payments 50000 --days 365 --out data/payments.ndjson --seed 7
+    python -m scripts.generate_data --inventory 10000 --inventory-dir data/inventory
+
+Then, in backend/.env:
+    DATASOURCE=file
+    PAYMENTS_FILE=data/payments_1m.ledger
+    INVENTORY_DATA_DIR=data/inventory
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.inventory_wal import clear_log, write_snapshot  # noqa: E402
+from app.services.payment_files import write_payments  # noqa: E402
+from app.services.synthetic_data import generate_inventory_rows, generate_payment_rows  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic payments and inventory")
+    parser.add_argument("--payments", type=int, default=0, help="Number of payments to generate")
+    parser.add_argument("--days", type=int, default=730, help="Days of history to spread payments over")
+    parser.add_argument("--end", default=None, help="Last day of the ledger (YYYY-MM-DD, default: today)")
+    parser.add_argument("--out", type=Path, default=None, help="Payments file: .json, .ndjson/.jsonl or .ledger")
+    parser.add_argument("--inventory", type=int, default=0, help="Number of inventory items to generate")
+    parser.add_argument("--inventory-dir", type=Path, default=None, help="Inventory data directory to write")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.payments and not args.out:
+        parser.error("--out is required with --payments")
+    if args.inventory and not args.inventory_dir:
+        parser.error("--inventory-dir is required with --inventory")
+    if not args.payments and not args.inventory:
+        parser.error("nothing to do: pass --payments and/or --inventory")
+
+    if args.payments:
+        end = datetime.now(timezone.utc)
+        if args.end:
+            end = datetime.fromisoformat(args.end).replace(hour=23, minute=59, tzinfo=timezone.utc)
+        started = time.perf_counter()
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        rows = generate_payment_rows(args.payments, seed=args.seed, end=end, days=args.days)
+        written = write_payments(args.out, rows)
+        size = args.out.stat().st_size
+        print(f"Wrote {written:,} payments to {args.out} ({size / 1e6:,.1f} MB) "
+              f"in {time.perf_counter() - started:.1f}s")
+
+    if args.inventory:
+        started = time.perf_counter()
+        rows = generate_inventory_rows(args.inventory, seed=args.seed)
+        # A fresh catalog invalidates any log written against the previous one.
+        clear_log(args.inventory_dir)
+        write_snapshot(args.inventory_dir, rows)
+        print(f"Wrote {len(rows):,} inventory items to {args.inventory_dir} "
+              f"in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
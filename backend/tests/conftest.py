@@ -0,0 +1,46 @@
+"""Shared fixtures: import the backend package and isolate the module-level stores per test."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.services import inventory_store, sales_ledger  # noqa: E402
+
+
+@pytest.fixture
+def fresh_inventory(monkeypatch):
+    """An empty, in-memory inventory store and sales ledger.
+
+    Returns a ``restart()`` callable that closes the write-ahead log (if any)
+    and empties the store again, as a process restart would; the next store
+    access then reloads from ``settings.inventory_data_dir``.
+    """
+    monkeypatch.setattr(settings, "inventory_data_dir", "")
+
+    def restart() -> None:
+        if inventory_store._WAL is not None:
+            inventory_store._WAL.close()
+        monkeypatch.setattr(inventory_store, "_WAL", None)
+        monkeypatch.setattr(inventory_store, "_INVENTORY", [])
+        monkeypatch.setattr(inventory_store, "_BY_ID", {})
+        monkeypatch.setattr(inventory_store, "_BY_SKU", {})
+        monkeypatch.setattr(inventory_store, "_LOW_STOCK", {})
+        monkeypatch.setattr(sales_ledger, "_DAILY", {})
+        monkeypatch.setattr(sales_ledger, "_DAYS", [])
+
+    restart()
+    yield restart
+    if inventory_store._WAL is not None:
+        inventory_store._WAL.close()
+
+
+@pytest.fixture
+def durable_inventory(fresh_inventory, monkeypatch, tmp_path):
+    """:func:`fresh_inventory` backed by a write-ahead log in a temporary directory."""
+    monkeypatch.setattr(settings, "inventory_data_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "inventory_wal_flush_ms", 1)
+    monkeypatch.setattr(settings, "inventory_snapshot_every", 25)
+    return fresh_inventory
@@ -0,0 +1,122 @@
+"""Concurrency and atomicity of the inventory store."""
+import random
+import threading
+from uuid import uuid4
+
+import pytest
+
+from app.models.inventory import InventoryItem
+from app.services import inventory_store
+from app.services.inventory_store import InsufficientStockError
+
+
+def _catalog(count: int, quantity: int) -> list:
+    return [
+        InventoryItem(
+            id=uuid4(),
+            name=f"Stress Item {i:06d}",
+            category=f"Category {i % 12}",
+            sku=f"ST-{i:06d}",
+            quantity=quantity,
+            low_stock_threshold=10,
+            unit_price_cents=100,
+        )
+        for i in range(count)
+    ]
+
+
+def _run(threads: int, target) -> None:
+    barrier = threading.Barrier(threads)
+
+    def worker(n: int) -> None:
+        barrier.wait()
+        target(n)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+
+def test_concurrent_sales_lose_no_decrements(fresh_inventory):
+    threads, sales, hot = 16, 2_000, 8
+    # Large enough that no item ever clamps at zero, so totals must match exactly.
+    start = threads * sales * 3 + 1
+    catalog = _catalog(2_000, start)
+    inventory_store._load(catalog)
+    store = inventory_store.get_inventory_store()
+    ids = [item.id for item in catalog]
+    sold = [dict() for _ in range(threads)]
+
+    def seller(n: int) -> None:
+        rng = random.Random(n)
+        for _ in range(sales):
+            item_id = rng.choice(ids[:hot]) if rng.random() < 0.8 else rng.choice(ids)
+            qty = rng.randint(1, 3)
+            store.record_sale(item_id, qty)
+            sold[n][item_id] = sold[n].get(item_id, 0) + qty
+
+    _run(threads, seller)
+
+    for item in catalog:
+        expected = start - sum(counts.get(item.id, 0) for counts in sold)
+        assert store.get(item.id).quantity == expected
+        assert store.get_by_sku(item.sku).id == item.id
+
+
+def test_overlapping_orders_neither_deadlock_nor_lose_lines(fresh_inventory):
+    threads, orders = 8, 500
+    catalog = _catalog(6, threads * orders * 3)
+    inventory_store._load(catalog)
+    store = inventory_store.get_inventory_store()
+    ids = [item.id for item in catalog]
+
+    def buyer(n: int) -> None:
+        rng = random.Random(n)
+        for _ in range(orders):
+            # Lines in random order, so lock acquisition order would differ without sorting.
+            store.record_sales([(item_id, 1) for item_id in rng.sample(ids, 3)])
+
+    _run(threads, buyer)
+
+    assert sum(store.get(item_id).quantity for item_id in ids) == 6 * threads * orders * 3 - threads * orders * 3
+
+
+def test_order_exceeding_stock_changes_nothing(fresh_inventory):
+    catalog = _catalog(2, 10)
+    inventory_store._load(catalog)
+    store = inventory_store.get_inventory_store()
+    a, b = (item.id for item in catalog)
+
+    with pytest.raises(InsufficientStockError):
+        store.record_sales([(a, 4), (b, 11)])
+    # Two lines of one item count against the same stock.
+    with pytest.raises(InsufficientStockError):
+        store.record_sales([(a, 6), (a, 6)])
+
+    assert store.get(a).quantity == 10
+    assert store.get(b).quantity == 10
+
+
+def test_order_with_unknown_item_changes_nothing(fresh_inventory):
+    catalog = _catalog(1, 10)
+    inventory_store._load(catalog)
+    store = inventory_store.get_inventory_store()
+
+    with pytest.raises(ValueError):
+        store.record_sales([(catalog[0].id, 1), (uuid4(), 1)])
+
+    assert store.get(catalog[0].id).quantity == 10
+
+
+def test_order_applies_every_line(fresh_inventory):
+    catalog = _catalog(2, 10)
+    inventory_store._load(catalog)
+    store = inventory_store.get_inventory_store()
+    a, b = (item.id for item in catalog)
+
+    after_line, alerts = store.record_sales([(a, 4), (b, 1), (a, 6)])
+
+    assert [qty for _, qty in after_line] == [6, 9, 0]
+    assert sorted(alert["quantity"] for alert in alerts) == [0, 9]
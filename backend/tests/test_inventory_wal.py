@@ -0,0 +1,109 @@
+"""Recovery of stock counts and sales from the inventory write-ahead log."""
+import errno
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services import inventory_store, inventory_wal, sales_ledger
+from app.services.inventory_wal import WALError, WriteAheadLog
+
+
+def _state(store) -> dict:
+    return {item.id: item.quantity for item in store.list()}
+
+
+def _sales() -> dict:
+    today = datetime.now(timezone.utc).date()
+    return sales_ledger.totals_by_item(today - timedelta(days=1), today + timedelta(days=1))
+
+
+def test_restart_recovers_stock_and_sales(durable_inventory):
+    store = inventory_store.get_inventory_store()
+    ids = [item.id for item in store.list()]
+    store.record_sale(ids[0], 3)
+    store.record_sales([(ids[1], 2), (ids[2], 1)])
+    before, sold = _state(store), _sales()
+
+    durable_inventory()
+    store = inventory_store.get_inventory_store()
+
+    assert _state(store) == before
+    assert _sales() == sold
+    assert sold[ids[0]][0] == 3
+
+
+def test_restart_after_compaction_replays_one_interval(durable_inventory, tmp_path):
+    store = inventory_store.get_inventory_store()
+    ids = [item.id for item in store.list()]
+
+    def seller(n: int) -> None:
+        for i in range(60):
+            item_id = ids[(n + i) % len(ids)]
+            if store.get(item_id).quantity:
+                store.record_sale(item_id, 1)
+
+    pool = [threading.Thread(target=seller, args=(n,)) for n in range(4)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    before, sold = _state(store), _sales()
+
+    durable_inventory()
+    # Older segments are dropped once a snapshot covers them.
+    assert len(list(tmp_path.glob("wal-*.log"))) <= 2
+    store = inventory_store.get_inventory_store()
+
+    assert _state(store) == before
+    assert _sales() == sold
+
+
+def test_torn_tail_is_ignored(durable_inventory, tmp_path):
+    store = inventory_store.get_inventory_store()
+    item = store.list()[0]
+    store.record_sale(item.id, 1)
+    durable_inventory()
+    segment = sorted(tmp_path.glob("wal-*.log"))[-1]
+    with open(segment, "a", encoding="utf-8") as f:
+        f.write('{"lsn":999,"set":[["%s",0]' % item.id)  # crash mid-write
+
+    store = inventory_store.get_inventory_store()
+
+    assert store.get(item.id).quantity == item.quantity
+
+
+def test_failed_log_leaves_stock_unchanged(durable_inventory, monkeypatch):
+    store = inventory_store.get_inventory_store()
+    item = store.list()[0]
+    quantity = item.quantity
+
+    def no_space(fd):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(inventory_wal.os, "fsync", no_space)
+    for _ in range(3):
+        with pytest.raises(WALError):
+            store.record_sale(item.id, 1)
+    with pytest.raises(WALError):
+        store.record_sales([(item.id, 1)])
+
+    assert store.get(item.id).quantity == quantity
+    assert _sales() == {}
+
+
+def test_snapshot_folds_records_up_to_its_lsn(tmp_path):
+    rows = [["a", "Item A", "Cat", "A-1", 10, 2, 100]]
+    wal = WriteAheadLog(tmp_path, flush_interval=0, snapshot_every=1)
+    wal.recover()
+    wal.start(rows, persist=True)
+    lsn = wal.append([("a", 7)], [["2026-01-01", "a", 3, 300]])
+    wal.wait(lsn)
+    wal.close()
+
+    recovered = WriteAheadLog(tmp_path)
+    snapshot_rows, quantities, sales = recovered.recover()
+
+    assert snapshot_rows[0][4] == 7
+    assert quantities == {}
+    assert sales == [["2026-01-01", "a", 3, 300]]
@@ -0,0 +1,86 @@
+"""The fast JSON path renders exactly what FastAPI's ``response_model`` path would."""
+from datetime import datetime, timezone
+from typing import List
+from uuid import uuid4
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app import serialization
+from app.models.inventory import InventoryItem
+from app.models.payment import Payment, PaymentStatus
+from app.serialization import clear_payment_cache, inventory_response, payments_response
+from app.services.datasource import _rows_to_payments
+from app.services.inventory_store import _ItemRecord
+from app.services.synthetic_data import generate_payment_rows
+
+_END = datetime(2025, 12, 31, 23, 59, 59, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True, params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """Run every test with orjson (when installed) and with the stdlib fallback."""
+    if request.param == "orjson" and serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    clear_payment_cache()
+
+
+def _response_model_body(model, rows) -> bytes:
+    # What FastAPI does for a ``response_model`` route: validate, dump, encode, render.
+    adapter = TypeAdapter(List[model])
+    return JSONResponse(jsonable_encoder(adapter.dump_python(adapter.validate_python(rows), mode="json"))).body
+
+
+def _payments() -> List[Payment]:
+    payments = _rows_to_payments(generate_payment_rows(300, seed=7, end=_END, days=90), validate=False)
+    payments.append(Payment(
+        id=uuid4(),
+        amount_cents=1250,
+        currency="EUR",
+        direction="outbound",
+        counterparty="Café Zürich \"Ünïcode\"",
+        description=None,
+        status=PaymentStatus.failed,
+        created_at=datetime(2025, 6, 1, 12, 30, 0, 123456),
+        updated_at=datetime(2025, 6, 2, 8, 0, tzinfo=timezone.utc),
+        external_id=None,
+    ))
+    return payments
+
+
+def test_payments_match_response_model():
+    payments = _payments()
+
+    expected = _response_model_body(Payment, payments)
+
+    assert payments_response(payments).body == expected
+    assert payments_response(payments).body == expected  # served from the row cache
+
+
+def test_payment_row_cache_is_bounded(monkeypatch):
+    payments = _payments()
+    monkeypatch.setattr(serialization, "_PAYMENT_ROWS_MAX", 50)
+
+    body = payments_response(payments).body
+
+    assert len(serialization._PAYMENT_ROWS) == 50
+    assert payments_response(payments).body == body == _response_model_body(Payment, payments)
+
+
+def test_inventory_matches_response_model():
+    items = [
+        InventoryItem(id=uuid4(), name="Skirt – Teal", category="Skirts", sku=None, quantity=6, unit_price_cents=4499),
+        InventoryItem(id=uuid4(), name="Paddle", category="Equipment", sku="PB-PAD", quantity=14, low_stock_threshold=3),
+    ]
+    records = [_ItemRecord.from_model(item) for item in items]
+
+    assert inventory_response(records).body == _response_model_body(InventoryItem, items)
+
+    # Only the quantity is rendered per call; the cached parts must still line up.
+    records[0].quantity = 5
+    items[0] = items[0].model_copy(update={"quantity": 5})
+    assert inventory_response(records).body == _response_model_body(InventoryItem, items)